@@ -0,0 +1,275 @@
+"""Concurrent end-to-end benchmark for the Brolife API.
+
+Drives every endpoint with a weighted request mix at a fixed concurrency and
+reports throughput and p50/p95/p99 latency per endpoint. By default it runs
+against the in-process ASGI app with the fake LLM provider and in-memory
+database, so results are reproducible offline; pass --url to benchmark a
+running deployment instead.
+
+    python benchmark.py --requests 2000 --concurrency 50 --output bench.json
+    python benchmark.py --url http://localhost:8001 --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_MIX = "chat=35,chat_stream=10,generate_timetable=10,get_user=20,user_setup=5,chat_history=12,timetables=8"
+
+GOALS = ["Learn Python", "Get fit", "Build a startup", "Read more books", "Ship the side project", "Sleep by midnight"]
+MESSAGES = [
+    "Hey bro, how do I stay focused this afternoon?",
+    "I keep procrastinating on my side project, any tips?",
+    "Thanks bro!",
+    "What should I do after my workout tonight?",
+    "I only got half my tasks done today, help me plan tomorrow.",
+    "Give me some motivation to start studying."
+]
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in mix: {name}")
+        weights.append((name.strip(), float(weight or 1)))
+    return weights
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.first_token: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, seconds: float, status: int, first_token: Optional[float] = None) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        statuses = self.statuses.setdefault(endpoint, {})
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if status >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        if first_token is not None:
+            self.first_token.setdefault(endpoint, []).append(first_token)
+
+    def summary(self, elapsed: float) -> Dict:
+        def stats(values: List[float]) -> Dict:
+            ordered = sorted(values)
+            return {
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2)
+            }
+
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "statuses": self.statuses[endpoint],
+                **stats(values)
+            }
+            if endpoint in self.first_token:
+                endpoints[endpoint]["first_token"] = stats(self.first_token[endpoint])
+
+        all_values = [value for values in self.latencies.values() for value in values]
+        overall = {
+            "requests": len(all_values),
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(len(all_values) / elapsed, 2),
+            **(stats(all_values) if all_values else {})
+        }
+        return {"elapsed_seconds": round(elapsed, 3), "overall": overall, "endpoints": endpoints}
+
+# Each endpoint builds one request from a random user and returns (status, seconds to first token)
+async def call_chat(client: httpx.AsyncClient, user_id: str, rng: random.Random) -> Tuple[int, Optional[float]]:
+    response = await client.post("/api/chat", json={"message": rng.choice(MESSAGES), "user_id": user_id})
+    return response.status_code, None
+
+async def call_chat_stream(client: httpx.AsyncClient, user_id: str, rng: random.Random) -> Tuple[int, Optional[float]]:
+    started = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/api/chat/stream", json={"message": rng.choice(MESSAGES), "user_id": user_id}) as response:
+        async for line in response.aiter_lines():
+            if first_token is None and line.startswith("data: {\"token\""):
+                first_token = time.perf_counter() - started
+    return response.status_code, first_token
+
+async def call_generate_timetable(client: httpx.AsyncClient, user_id: str, rng: random.Random) -> Tuple[int, Optional[float]]:
+    payload = {"goals": rng.sample(GOALS, 3), "preferences": "I work best in the morning", "user_id": user_id}
+    response = await client.post("/api/generate-timetable", json=payload)
+    return response.status_code, None
+
+async def call_get_user(client: httpx.AsyncClient, user_id: str, rng: random.Random) -> Tuple[int, Optional[float]]:
+    response = await client.get(f"/api/user/{user_id}")
+    return response.status_code, None
+
+async def call_user_setup(client: httpx.AsyncClient, user_id: str, rng: random.Random) -> Tuple[int, Optional[float]]:
+    payload = {"user_id": user_id, "bro_name": rng.choice(["Bro", "Max", "Coach"]), "goals": rng.sample(GOALS, 3)}
+    response = await client.post("/api/user/setup", json=payload)
+    return response.status_code, None
+
+async def call_chat_history(client: httpx.AsyncClient, user_id: str, rng: random.Random) -> Tuple[int, Optional[float]]:
+    response = await client.get(f"/api/chat-history/{user_id}", params={"limit": 20})
+    return response.status_code, None
+
+async def call_timetables(client: httpx.AsyncClient, user_id: str, rng: random.Random) -> Tuple[int, Optional[float]]:
+    response = await client.get(f"/api/timetables/{user_id}", params={"limit": 10})
+    return response.status_code, None
+
+ENDPOINTS: Dict[str, Callable] = {
+    "chat": call_chat,
+    "chat_stream": call_chat_stream,
+    "generate_timetable": call_generate_timetable,
+    "get_user": call_get_user,
+    "user_setup": call_user_setup,
+    "chat_history": call_chat_history,
+    "timetables": call_timetables
+}
+
+@asynccontextmanager
+async def open_client(url: Optional[str], timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+            yield client
+        return
+
+    # In-process run: offline providers unless the caller configured others
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ.setdefault("DB_BACKEND", "memory")
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=timeout) as client:
+            yield client
+
+async def seed_users(client: httpx.AsyncClient, user_ids: List[str], rng: random.Random) -> None:
+    users = [{"user_id": user_id, "bro_name": "Bro", "goals": rng.sample(GOALS, 3)} for user_id in user_ids]
+    response = await client.post("/api/users/bulk", json={"users": users})
+    response.raise_for_status()
+
+async def run_benchmark(args: argparse.Namespace) -> Dict:
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    user_ids = [f"bench_user_{index}" for index in range(args.users)]
+    recorder = Recorder()
+
+    async with open_client(args.url, args.timeout) as client:
+        await seed_users(client, user_ids, rng)
+        remaining = args.warmup + args.requests
+        started = None
+
+        async def worker(worker_rng: random.Random) -> None:
+            nonlocal remaining, started
+            while remaining > 0:
+                remaining -= 1
+                measured = remaining < args.requests
+                if measured and started is None:
+                    started = time.perf_counter()
+                endpoint = worker_rng.choices(names, weights)[0]
+                request_started = time.perf_counter()
+                try:
+                    status, first_token = await ENDPOINTS[endpoint](client, worker_rng.choice(user_ids), worker_rng)
+                except httpx.HTTPError:
+                    status, first_token = 599, None
+                # ASGITransport buffers whole responses, so first-token timing is only real over --url
+                if not args.url:
+                    first_token = None
+                if measured:
+                    recorder.record(endpoint, time.perf_counter() - request_started, status, first_token)
+
+        await asyncio.gather(*(worker(random.Random(rng.random())) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - (started or time.perf_counter())
+
+    return {
+        "started_at": datetime.utcnow().isoformat(),
+        "target": args.url or "in-process",
+        "config": {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "mix": args.mix,
+            "seed": args.seed,
+            "llm_provider": os.environ.get("LLM_PROVIDER"),
+            "db_backend": os.environ.get("DB_BACKEND")
+        },
+        **recorder.summary(elapsed)
+    }
+
+def print_report(result: Dict, baseline: Optional[Dict] = None) -> None:
+    header = f"{'endpoint':<20}{'reqs':>7}{'errs':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(f"\nTarget: {result['target']}  elapsed: {result['elapsed_seconds']}s")
+    print(header)
+    print("-" * len(header))
+    rows = list(result["endpoints"].items()) + [("overall", result["overall"])]
+    for name, stats in rows:
+        print(f"{name:<20}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput_rps']:>9}"
+              f"{stats.get('p50_ms', 0):>10}{stats.get('p95_ms', 0):>10}{stats.get('p99_ms', 0):>10}")
+        if "first_token" in stats:
+            ttft = stats["first_token"]
+            print(f"{'  first token':<42}{ttft['p50_ms']:>10}{ttft['p95_ms']:>10}{ttft['p99_ms']:>10}")
+
+    if not baseline:
+        return
+    print(f"\nChange vs baseline from {baseline.get('started_at')} (negative latency is faster):")
+    baseline_rows = dict(baseline.get("endpoints", {}), overall=baseline.get("overall", {}))
+    for name, stats in rows:
+        before = baseline_rows.get(name)
+        if not before:
+            continue
+        deltas = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before.get(key):
+                deltas.append(f"{key} {(stats.get(key, 0) - before[key]) / before[key] * 100:+.1f}%")
+        print(f"{name:<20}{'  '.join(deltas)}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Concurrent Brolife API benchmark")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests sent first")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50, help="size of the simulated user pool")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted endpoint mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --output run")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_benchmark(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+    return 1 if result["overall"]["errors"] else 0
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
@@ -1,21 +1,90 @@
 import os
+import asyncio
+import logging
+import time
+from functools import partial
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 # Import routes
-from routes import user_router, chat_router, timetable_router
+from routes import user_router, chat_router, timetable_router, llm_router, metrics_router, job_router
+from routes.timetable_routes import run_timetable_job
+from services import ChatMemoryIndex, ConversationContextManager, IndexManager, JobQueue, LLMService, TimetableNarrator, TimetablePrecomputer, create_database_service
+from utils import CompressionMiddleware, DocumentResponse
+from services.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, monitor_event_loop_lag
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared services once per process and close them on shutdown"""
+    db_service = create_database_service()
+    # Reported by /api/health; None until the bootstrap has run
+    app.state.index_status = None
+    try:
+        await db_service.connect()
+    except Exception as e:
+        logger.warning("MongoDB warm-up ping failed, connecting lazily: %s", e)
+    else:
+        try:
+            indexes = await IndexManager(db_service).ensure_indexes()
+            app.state.index_status = {"failed": indexes["failed"], "duplicates": indexes["duplicates"]}
+            if indexes["failed"]:
+                logger.warning("MongoDB indexes missing after bootstrap: %s", indexes["failed"])
+        except Exception as e:
+            logger.warning("MongoDB index bootstrap failed: %s", e)
+            app.state.index_status = {"failed": {"*": [str(e)]}, "duplicates": {}}
+
+    llm_service = LLMService()
+    context_manager = ConversationContextManager(db_service, llm_service, ChatMemoryIndex(db_service))
+    precomputer = TimetablePrecomputer(db_service, llm_service)
+    timetable_narrator = TimetableNarrator(db_service, llm_service)
+    job_queue = JobQueue(db_service)
+    job_queue.register(
+        "timetable",
+        partial(run_timetable_job, db_service=db_service, llm_service=llm_service, narrator=timetable_narrator)
+    )
+    await job_queue.start()
+    app.state.db_service = db_service
+    app.state.llm_service = llm_service
+    app.state.context_manager = context_manager
+    app.state.precomputer = precomputer
+    app.state.job_queue = job_queue
+    app.state.timetable_narrator = timetable_narrator
+    loop_monitor = asyncio.create_task(monitor_event_loop_lag())
+    # Run the overnight precompute in one process only, e.g. a single worker or a dedicated instance
+    precompute_task = None
+    if os.environ.get("PRECOMPUTE_ENABLED", "false").lower() == "true":
+        precompute_task = asyncio.create_task(precomputer.run_forever())
+    try:
+        yield
+    finally:
+        loop_monitor.cancel()
+        if precompute_task:
+            precompute_task.cancel()
+        await job_queue.close()
+        await timetable_narrator.close()
+        await context_manager.close()
+        await llm_service.close()
+        await db_service.close()
+
 app = FastAPI(
     title="Brolife API",
     description="Your AI productivity companion API",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=DocumentResponse
 )
 
+# Compress large JSON responses such as chat and timetable history
+app.add_middleware(CompressionMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -25,18 +94,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Per-route latency histogram and status counter, labelled by route template"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route else "unmatched"
+        HTTP_REQUEST_DURATION.labels(request.method, path).observe(time.perf_counter() - started)
+        HTTP_REQUESTS.labels(request.method, path, str(status)).inc()
+
 # Include routers
 app.include_router(user_router)
 app.include_router(chat_router)
 app.include_router(timetable_router)
+app.include_router(llm_router)
+app.include_router(metrics_router)
+app.include_router(job_router)
 
 @app.get("/")
 async def root():
     return {"message": "Brolife API is running! 🎯", "version": "2.0.0"}
 
 @app.get("/api/health")
-async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
+async def health_check(request: Request):
+    health = {"status": "healthy", "timestamp": datetime.utcnow()}
+    index_status = getattr(request.app.state, "index_status", None)
+    # Missing unique indexes leave upserts open to duplicate rows, so surface them instead of only logging
+    if index_status and index_status["failed"]:
+        health["status"] = "degraded"
+        health["indexes"] = index_status
+    return health
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,9 +1,15 @@
-from .user import User, UserResponse
+from .user import User, UserResponse, BulkUserRequest, BulkUserResult, BulkUserResponse
 from .chat import ChatMessage, ChatHistory, ChatResponse
-from .timetable import TimetableRequest, Timetable, TimetableResponse
+from .timetable import (
+    TimetableRequest, TimetableSlot, Timetable, TimetableResponse, TimetableSlotMatch,
+    WeekTimetableRequest, TimetableRangeRequest, DayTimetableResult, BatchTimetableResponse
+)
+from .job import Job, JobAccepted
 
 __all__ = [
-    "User", "UserResponse",
+    "User", "UserResponse", "BulkUserRequest", "BulkUserResult", "BulkUserResponse",
     "ChatMessage", "ChatHistory", "ChatResponse", 
-    "TimetableRequest", "Timetable", "TimetableResponse"
+    "TimetableRequest", "TimetableSlot", "Timetable", "TimetableResponse", "TimetableSlotMatch",
+    "WeekTimetableRequest", "TimetableRangeRequest", "DayTimetableResult", "BatchTimetableResponse",
+    "Job", "JobAccepted"
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
 from datetime import datetime
 import uuid
 
@@ -11,8 +11,9 @@ class ChatHistory(BaseModel):
     user_id: str
     message: str
     response: str
-    timestamp: datetime = datetime.utcnow()
-    message_id: str = str(uuid.uuid4())
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    message_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    usage: Optional[Dict[str, int]] = None
 
 class ChatResponse(BaseModel):
     response: str
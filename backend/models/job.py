@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Dict, Literal, Optional
+from datetime import datetime
+
+class Job(BaseModel):
+    job_id: str
+    kind: str
+    user_id: Optional[str] = None
+    status: Literal["queued", "running", "succeeded", "failed"]
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    events_url: str
@@ -1,20 +1,78 @@
-from pydantic import BaseModel
-from typing import List, Dict, Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Dict, Literal, Optional
+from datetime import date, datetime
 import uuid
 
 class TimetableRequest(BaseModel):
     goals: List[str]
     preferences: Optional[str] = ""
     user_id: Optional[str] = "default_user"
+    force_refresh: bool = False
+
+class TimetableSlot(BaseModel):
+    start_minute: int
+    end_minute: int
+    category: str
+    activity: str
+    goal: Optional[str] = None
 
 class Timetable(BaseModel):
     user_id: str
     date: str
     schedule: Dict
-    created_at: datetime = datetime.utcnow()
-    timetable_id: str = str(uuid.uuid4())
+    slots: List[TimetableSlot] = []
+    schedule_text: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    timetable_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    input_key: Optional[str] = None
+    goals: List[str] = []
+    preferences: str = ""
+    precomputed: bool = False
+    # Set the first time a precomputed timetable is handed to the user
+    served_at: Optional[datetime] = None
+    narrative: Optional[str] = None
+
+    @classmethod
+    def from_schedule(cls, user_id: str, schedule: Dict, **fields) -> "Timetable":
+        """Store a generated schedule as metadata, compact slots and separately loaded text"""
+        metadata = {key: value for key, value in schedule.items() if key not in ("slots", "schedule_text")}
+        return cls(
+            user_id=user_id,
+            date=schedule["date"],
+            schedule=metadata,
+            slots=schedule.get("slots", []),
+            schedule_text=schedule.get("schedule_text"),
+            **fields
+        )
 
 class TimetableResponse(BaseModel):
     timetable: Dict
-    message: str
\ No newline at end of file
+    message: str
+    timetable_id: Optional[str] = None
+    narrative: Optional[str] = None
+    narrative_pending: bool = False
+
+class WeekTimetableRequest(TimetableRequest):
+    start_date: Optional[date] = None
+
+class TimetableRangeRequest(TimetableRequest):
+    start_date: date
+    end_date: date
+
+class DayTimetableResult(BaseModel):
+    date: str
+    day: str
+    status: Literal["generated", "cached", "error"]
+    timetable: Optional[Dict] = None
+    error: Optional[str] = None
+
+class TimetableSlotMatch(BaseModel):
+    date: str
+    timetable_id: str
+    slot: Dict
+
+class BatchTimetableResponse(BaseModel):
+    timetables: List[DayTimetableResult]
+    generated: int
+    failed: int
+    message: str
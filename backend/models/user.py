@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from datetime import datetime
 import uuid
 
@@ -8,11 +8,26 @@ class User(BaseModel):
     bro_name: Optional[str] = "Bro"
     goals: List[str] = []
     preferences: Optional[str] = ""
-    created_at: datetime = datetime.utcnow()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class UserResponse(BaseModel):
     user_id: str
     bro_name: str
     goals: List[str]
     preferences: str
-    created_at: Optional[str] = None
\ No newline at end of file
+    created_at: Optional[str] = None
+
+class BulkUserRequest(BaseModel):
+    users: List[User]
+
+class BulkUserResult(BaseModel):
+    index: int
+    user_id: str
+    status: Literal["created", "updated", "error"]
+    error: Optional[str] = None
+
+class BulkUserResponse(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    results: List[BulkUserResult]
\ No newline at end of file
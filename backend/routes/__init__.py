@@ -1,5 +1,8 @@
 from .user_routes import router as user_router
 from .chat_routes import router as chat_router
 from .timetable_routes import router as timetable_router
+from .llm_routes import router as llm_router
+from .metrics_routes import router as metrics_router
+from .job_routes import router as job_router
 
-__all__ = ["user_router", "chat_router", "timetable_router"]
\ No newline at end of file
+__all__ = ["user_router", "chat_router", "timetable_router", "llm_router", "metrics_router", "job_router"]
\ No newline at end of file
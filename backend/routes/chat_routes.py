@@ -1,39 +1,159 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from models import ChatMessage, ChatHistory, ChatResponse
-from services import DatabaseService, LLMService
+from services import ConversationContextManager, DatabaseService, LLMService
+from utils import CHAT_HISTORY_DTO, DocumentResponse, InvalidCursorError, format_sse, parse_fields
+from .dependencies import get_context_manager, get_db_service, get_llm_service
 
 router = APIRouter(prefix="/api", tags=["chat"])
-db_service = DatabaseService()
-llm_service = LLMService()
+
+async def get_bro_name(db_service: DatabaseService, user_id: str) -> str:
+    """Look up the user's bro name, falling back to the default"""
+    user = await db_service.get_user(user_id)
+    return user.get("bro_name", "Bro") if user else "Bro"
+
+async def save_streamed_chat(
+    db_service: DatabaseService,
+    llm_service: LLMService,
+    context_manager: ConversationContextManager,
+    chat_msg: ChatMessage,
+    bro_name: str,
+    context: str,
+    tokens: list
+) -> None:
+    """Persist a streamed exchange once its stream has closed"""
+    if not tokens:
+        return
+    response = "".join(tokens)
+    chat_history = ChatHistory(
+        user_id=chat_msg.user_id,
+        message=chat_msg.message,
+        response=response,
+        usage=llm_service.chat_usage(chat_msg.message, bro_name, context, response)
+    )
+    # Shield the write so a client disconnect cannot cancel it halfway
+    await asyncio.shield(db_service.save_chat_history(context_manager.remember(chat_history.model_dump())))
+    context_manager.schedule_compaction(chat_msg.user_id)
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_with_bro(chat_msg: ChatMessage):
+async def chat_with_bro(
+    chat_msg: ChatMessage,
+    db_service: DatabaseService = Depends(get_db_service),
+    llm_service: LLMService = Depends(get_llm_service),
+    context_manager: ConversationContextManager = Depends(get_context_manager)
+):
     """Send message to AI bro and get response"""
-    try:
+    async def chat():
         # Get user info to personalize response
         user = await db_service.get_user(chat_msg.user_id)
         bro_name = user.get("bro_name", "Bro") if user else "Bro"
         
-        # Get LLM response
-        response = await llm_service.get_llm_response(chat_msg.message, chat_msg.user_id, bro_name)
+        # Get LLM response with a bounded window of earlier conversation
+        context = await context_manager.build_context(chat_msg.user_id, chat_msg.message)
+        response = await llm_service.get_llm_response(chat_msg.message, chat_msg.user_id, bro_name, context)
         
         # Save chat history
         chat_history = ChatHistory(
             user_id=chat_msg.user_id,
             message=chat_msg.message,
-            response=response
+            response=response,
+            usage=llm_service.chat_usage(chat_msg.message, bro_name, context, response)
         )
-        await db_service.save_chat_history(chat_history.dict())
+        await db_service.save_chat_history(context_manager.remember(chat_history.model_dump()))
+        context_manager.schedule_compaction(chat_msg.user_id)
         
         return ChatResponse(response=response, bro_name=bro_name)
+
+    try:
+        # Double-clicks and retries share one LLM call and one history write
+        return await llm_service.single_flight.do(("route:chat", chat_msg.user_id, chat_msg.message), chat)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+
+@router.post("/chat/stream")
+async def stream_chat_with_bro(
+    chat_msg: ChatMessage,
+    db_service: DatabaseService = Depends(get_db_service),
+    llm_service: LLMService = Depends(get_llm_service),
+    context_manager: ConversationContextManager = Depends(get_context_manager)
+):
+    """Stream the AI bro's response as Server-Sent Events"""
+    try:
+        bro_name = await get_bro_name(db_service, chat_msg.user_id)
+        context = await context_manager.build_context(chat_msg.user_id, chat_msg.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+    async def event_stream():
+        tokens = []
+        try:
+            yield format_sse({"bro_name": bro_name}, event="start")
+            async for token in llm_service.stream_llm_response(chat_msg.message, chat_msg.user_id, bro_name, context):
+                tokens.append(token)
+                yield format_sse({"token": token})
+            yield format_sse({"response": "".join(tokens), "bro_name": bro_name}, event="done")
+        finally:
+            await save_streamed_chat(db_service, llm_service, context_manager, chat_msg, bro_name, context, tokens)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/chat/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    db_service: DatabaseService = Depends(get_db_service),
+    llm_service: LLMService = Depends(get_llm_service),
+    context_manager: ConversationContextManager = Depends(get_context_manager)
+):
+    """Stream AI bro responses over a WebSocket, one message per request frame"""
+    await websocket.accept()
+    try:
+        while True:
+            chat_msg = ChatMessage(**await websocket.receive_json())
+            bro_name = await get_bro_name(db_service, chat_msg.user_id)
+            context = await context_manager.build_context(chat_msg.user_id, chat_msg.message)
+            tokens = []
+            try:
+                await websocket.send_json({"type": "start", "bro_name": bro_name})
+                async for token in llm_service.stream_llm_response(chat_msg.message, chat_msg.user_id, bro_name, context):
+                    tokens.append(token)
+                    await websocket.send_json({"type": "token", "token": token})
+                await websocket.send_json({"type": "done", "response": "".join(tokens), "bro_name": bro_name})
+            finally:
+                await save_streamed_chat(db_service, llm_service, context_manager, chat_msg, bro_name, context, tokens)
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/chat-memory/stats")
+async def get_chat_memory_stats(context_manager: ConversationContextManager = Depends(get_context_manager)):
+    """Get counters for the per-user chat memory index"""
+    return context_manager.memory.stats() if context_manager.memory else {"enabled": False}
+
 @router.get("/chat-history/{user_id}")
-async def get_chat_history(user_id: str, limit: int = 20):
-    """Get chat history for user"""
+async def get_chat_history(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Get a page of chat history for user, newest first"""
     try:
-        history = await db_service.get_chat_history(user_id, limit)
-        return {"history": history}
+        # Turns still in the write-behind queue must show up right after they were posted
+        await db_service.chat_history_writer.flush()
+        page = await db_service.get_chat_history(user_id, limit, before=before, after=after, fields=parse_fields(fields))
+        return DocumentResponse({
+            "history": CHAT_HISTORY_DTO.dump_many(page["items"]),
+            "next_cursor": page["next_cursor"],
+            "prev_cursor": page["prev_cursor"]
+        })
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat history error: {str(e)}")
\ No newline at end of file
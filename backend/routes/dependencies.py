@@ -0,0 +1,26 @@
+from fastapi.requests import HTTPConnection
+from services import ConversationContextManager, DatabaseService, JobQueue, LLMService, TimetableNarrator, TimetablePrecomputer
+
+def get_db_service(connection: HTTPConnection) -> DatabaseService:
+    """Application-scoped database service created in the lifespan hook"""
+    return connection.app.state.db_service
+
+def get_llm_service(connection: HTTPConnection) -> LLMService:
+    """Application-scoped LLM service created in the lifespan hook"""
+    return connection.app.state.llm_service
+
+def get_context_manager(connection: HTTPConnection) -> ConversationContextManager:
+    """Application-scoped conversation context manager created in the lifespan hook"""
+    return connection.app.state.context_manager
+
+def get_precomputer(connection: HTTPConnection) -> TimetablePrecomputer:
+    """Application-scoped timetable precompute scheduler created in the lifespan hook"""
+    return connection.app.state.precomputer
+
+def get_job_queue(connection: HTTPConnection) -> JobQueue:
+    """Application-scoped background job queue created in the lifespan hook"""
+    return connection.app.state.job_queue
+
+def get_timetable_narrator(connection: HTTPConnection) -> TimetableNarrator:
+    """Application-scoped timetable narrative writer created in the lifespan hook"""
+    return connection.app.state.timetable_narrator
\ No newline at end of file
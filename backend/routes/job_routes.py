@@ -0,0 +1,64 @@
+import time
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from models import Job
+from services import JobQueue
+from services.job_queue import FINISHED_STATUSES
+from utils import format_sse
+from .dependencies import get_job_queue
+
+router = APIRouter(prefix="/api", tags=["jobs"])
+
+# Comment frames keep idle SSE connections open through proxies
+KEEP_ALIVE_SECONDS = 15
+
+@router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, job_queue: JobQueue = Depends(get_job_queue)):
+    """Get a background job's status and, once finished, its result"""
+    try:
+        job = await job_queue.get(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Job fetch error: {str(e)}")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, job_queue: JobQueue = Depends(get_job_queue)):
+    """Stream a background job's status changes as Server-Sent Events until it finishes"""
+    try:
+        job = await job_queue.get(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Job fetch error: {str(e)}")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        current = job
+        last_status = None
+        last_sent = time.monotonic()
+        while True:
+            if current["status"] in FINISHED_STATUSES:
+                yield format_sse(Job(**current), event="done")
+                return
+            if current["status"] != last_status:
+                last_status = current["status"]
+                last_sent = time.monotonic()
+                yield format_sse({"job_id": job_id, "status": last_status}, event="status")
+            elif time.monotonic() - last_sent >= KEEP_ALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            await job_queue.wait(job_id, job_queue.poll_interval)
+            current = await job_queue.get(job_id) or current
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/job-queue/stats")
+async def get_job_queue_stats(job_queue: JobQueue = Depends(get_job_queue)):
+    """Get worker, queue depth and outcome counters for background jobs"""
+    return job_queue.stats()
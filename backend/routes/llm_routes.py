@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from services import LLMService
+from .dependencies import get_llm_service
+
+router = APIRouter(prefix="/api", tags=["llm"])
+
+@router.get("/llm/stats")
+async def get_llm_stats(llm_service: LLMService = Depends(get_llm_service)):
+    """Get counters for scheduled, coalesced and cached LLM calls"""
+    return {
+        "scheduler": llm_service.scheduler.stats(),
+        "single_flight": llm_service.single_flight.stats(),
+        "timetable_cache": llm_service.timetable_cache.stats(),
+        "incremental_timetables": {"runs": llm_service.incremental_runs, "blocks": llm_service.incremental_blocks},
+        "semantic_cache": llm_service.semantic_cache.stats(),
+        "resilience": llm_service.resilience_stats(),
+        "routing": llm_service.router.stats()
+    }
\ No newline at end of file
@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+from services.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus exposition of route, MongoDB and LLM metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
\ No newline at end of file
@@ -1,47 +1,319 @@
-from fastapi import APIRouter, HTTPException
-from models import TimetableRequest, Timetable, TimetableResponse
-from services import DatabaseService, LLMService
-from utils import get_response_message
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+import os
+from models import (
+    TimetableRequest, Timetable, TimetableResponse, TimetableSlotMatch,
+    WeekTimetableRequest, TimetableRangeRequest, DayTimetableResult, BatchTimetableResponse,
+    JobAccepted
+)
+from services import DatabaseService, JobQueue, JobQueueFullError, LLMService, TimetableNarrator, TimetablePrecomputer
+from services.timetable_engine import expand_slots, parse_clock_minute
+from utils import TIMETABLE_DTO, DocumentResponse, InvalidCursorError, get_response_message, parse_fields
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from .dependencies import get_db_service, get_job_queue, get_llm_service, get_precomputer, get_timetable_narrator
 
 router = APIRouter(prefix="/api", tags=["timetables"])
-db_service = DatabaseService()
-llm_service = LLMService()
 
-@router.post("/generate-timetable", response_model=TimetableResponse)
-async def create_timetable(timetable_req: TimetableRequest):
-    """Generate personalized daily timetable"""
-    try:
+def stored_schedule(timetable: Dict) -> Dict:
+    """Reassemble the schedule the generate endpoints return from a stored timetable"""
+    schedule = dict(timetable.get("schedule", {}))
+    if timetable.get("slots"):
+        schedule["slots"] = expand_slots(timetable["slots"])
+    if timetable.get("schedule_text"):
+        schedule["schedule_text"] = timetable["schedule_text"]
+    return schedule
+
+async def generate_today(
+    timetable_req: TimetableRequest,
+    db_service: DatabaseService,
+    llm_service: LLMService,
+    narrator: TimetableNarrator
+) -> TimetableResponse:
+    """Generate and save today's timetable, sharing one run between identical requests"""
+    async def generate():
         # Get user info
         user = await db_service.get_user(timetable_req.user_id)
         bro_name = user.get("bro_name", "Bro") if user else "Bro"
+
+        # Serve the overnight precomputed timetable when it was built from the same inputs
+        today = date.today()
+        input_key = llm_service.timetable_input_key(timetable_req.goals, timetable_req.preferences, bro_name, today)
+        if not timetable_req.force_refresh:
+            precomputed = await db_service.get_precomputed_timetable(timetable_req.user_id, today.isoformat(), input_key)
+            if precomputed:
+                await db_service.mark_timetable_served(precomputed["timetable_id"])
+                return TimetableResponse(
+                    timetable=stored_schedule(precomputed),
+                    message=get_response_message("timetable_ready", bro_name),
+                    timetable_id=precomputed["timetable_id"],
+                    narrative=precomputed.get("narrative")
+                )
+
+        # An earlier timetable for today lets a small change rewrite only the blocks it touches
+        previous = None
+        if llm_service.incremental_timetables and not timetable_req.force_refresh:
+            previous = await db_service.get_latest_timetable(timetable_req.user_id, today.isoformat())
         
         # Generate timetable
         schedule = await llm_service.generate_timetable(
             timetable_req.goals, 
             timetable_req.preferences, 
             timetable_req.user_id,
-            bro_name
+            bro_name,
+            force_refresh=timetable_req.force_refresh,
+            day=today,
+            previous=previous
         )
         
-        # Save timetable
-        timetable = Timetable(
-            user_id=timetable_req.user_id,
-            date=schedule.get("date", datetime.now().strftime("%Y-%m-%d")),
-            schedule=schedule
+        # Save timetable with the inputs it was built from
+        timetable = Timetable.from_schedule(
+            timetable_req.user_id,
+            schedule,
+            input_key=input_key,
+            goals=timetable_req.goals,
+            preferences=timetable_req.preferences or ""
         )
-        await db_service.save_timetable(timetable.dict())
+        await db_service.save_timetable(timetable.model_dump())
+        narrative_pending = narrator.schedule(timetable.timetable_id, schedule, timetable_req.goals, timetable_req.user_id, bro_name)
         
         message = get_response_message("timetable_ready", bro_name)
-        return TimetableResponse(timetable=schedule, message=message)
+        return TimetableResponse(
+            timetable=schedule,
+            message=message,
+            timetable_id=timetable.timetable_id,
+            narrative_pending=narrative_pending
+        )
+
+    # Double-clicks and retries share one generation and one saved timetable
+    key = (
+        "route:timetable",
+        timetable_req.user_id,
+        tuple(timetable_req.goals),
+        timetable_req.preferences,
+        timetable_req.force_refresh
+    )
+    return await llm_service.single_flight.do(key, generate)
+
+@router.post("/generate-timetable", response_model=TimetableResponse)
+async def create_timetable(
+    timetable_req: TimetableRequest,
+    db_service: DatabaseService = Depends(get_db_service),
+    llm_service: LLMService = Depends(get_llm_service),
+    narrator: TimetableNarrator = Depends(get_timetable_narrator)
+):
+    """Generate personalized daily timetable"""
+    try:
+        return await generate_today(timetable_req, db_service, llm_service, narrator)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Timetable generation error: {str(e)}")
+
+async def run_timetable_job(
+    payload: Dict,
+    db_service: DatabaseService,
+    llm_service: LLMService,
+    narrator: TimetableNarrator
+) -> Dict:
+    """Job handler for POST /api/generate-timetable/jobs"""
+    response = await generate_today(TimetableRequest(**payload), db_service, llm_service, narrator)
+    return response.model_dump()
+
+@router.post("/generate-timetable/jobs", response_model=JobAccepted, status_code=202)
+async def submit_timetable_job(
+    timetable_req: TimetableRequest,
+    response: Response,
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    """Queue timetable generation and return a job to poll or subscribe to"""
+    try:
+        job = await job_queue.submit("timetable", timetable_req.model_dump(), timetable_req.user_id)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Timetable job error: {str(e)}")
+
+    status_url = f"/api/jobs/{job['job_id']}"
+    response.headers["Location"] = status_url
+    return JobAccepted(job_id=job["job_id"], status=job["status"], status_url=status_url, events_url=f"{status_url}/events")
+
+async def generate_days(
+    timetable_req: TimetableRequest,
+    days: List[date],
+    db_service: DatabaseService,
+    llm_service: LLMService,
+    narrator: TimetableNarrator
+) -> BatchTimetableResponse:
+    """Generate timetables for several days concurrently and save them with one bulk write"""
+    async def generate():
+        user = await db_service.get_user(timetable_req.user_id)
+        bro_name = user.get("bro_name", "Bro") if user else "Bro"
+
+        schedules = await llm_service.generate_timetables(
+            timetable_req.goals,
+            timetable_req.preferences,
+            timetable_req.user_id,
+            days,
+            bro_name,
+            force_refresh=timetable_req.force_refresh
+        )
+
+        # One day failing doesn't fail the batch; it's reported in its own result
+        results = []
+        timetables = []
+        generated = []
+        for day, schedule in zip(days, schedules):
+            if "error" in schedule:
+                results.append(DayTimetableResult(date=day.isoformat(), day=day.strftime("%A"), status="error", error=schedule["error"]))
+                continue
+            status = "cached" if schedule.get("cached") else "generated"
+            results.append(DayTimetableResult(date=schedule["date"], day=schedule["day"], status=status, timetable=schedule))
+            input_key = llm_service.timetable_input_key(timetable_req.goals, timetable_req.preferences, bro_name, day)
+            timetable = Timetable.from_schedule(
+                timetable_req.user_id,
+                schedule,
+                input_key=input_key,
+                goals=timetable_req.goals,
+                preferences=timetable_req.preferences or ""
+            )
+            timetables.append(timetable.model_dump())
+            generated.append((timetable.timetable_id, schedule))
+        await db_service.save_timetables(timetables)
+        for timetable_id, schedule in generated:
+            narrator.schedule(timetable_id, schedule, timetable_req.goals, timetable_req.user_id, bro_name)
+
+        return BatchTimetableResponse(
+            timetables=results,
+            generated=len(timetables),
+            failed=len(results) - len(timetables),
+            message=get_response_message("timetable_ready", bro_name)
+        )
+
+    key = (
+        "route:timetables",
+        timetable_req.user_id,
+        tuple(timetable_req.goals),
+        timetable_req.preferences,
+        timetable_req.force_refresh,
+        tuple(days)
+    )
+    return await llm_service.single_flight.do(key, generate)
+
+@router.post("/generate-timetable/week", response_model=BatchTimetableResponse)
+async def create_week_timetable(
+    timetable_req: WeekTimetableRequest,
+    db_service: DatabaseService = Depends(get_db_service),
+    llm_service: LLMService = Depends(get_llm_service),
+    narrator: TimetableNarrator = Depends(get_timetable_narrator)
+):
+    """Generate timetables for the seven days starting at start_date (default today)"""
+    start_date = timetable_req.start_date or date.today()
+    days = [start_date + timedelta(days=offset) for offset in range(7)]
+    try:
+        return await generate_days(timetable_req, days, db_service, llm_service, narrator)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Timetable generation error: {str(e)}")
+
+@router.post("/generate-timetable/range", response_model=BatchTimetableResponse)
+async def create_range_timetable(
+    timetable_req: TimetableRangeRequest,
+    db_service: DatabaseService = Depends(get_db_service),
+    llm_service: LLMService = Depends(get_llm_service),
+    narrator: TimetableNarrator = Depends(get_timetable_narrator)
+):
+    """Generate timetables for every day from start_date to end_date inclusive"""
+    max_days = int(os.environ.get("TIMETABLE_RANGE_MAX_DAYS", "31"))
+    day_count = (timetable_req.end_date - timetable_req.start_date).days + 1
+    if day_count < 1:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if day_count > max_days:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {max_days} days")
+
+    days = [timetable_req.start_date + timedelta(days=offset) for offset in range(day_count)]
+    try:
+        return await generate_days(timetable_req, days, db_service, llm_service, narrator)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Timetable generation error: {str(e)}")
 
 @router.get("/timetables/{user_id}")
-async def get_user_timetables(user_id: str, limit: int = 10):
-    """Get user's timetable history"""
+async def get_user_timetables(
+    user_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Get a page of the user's timetable history, newest first"""
+    try:
+        # Timetables still in the write-behind queue must show up right after they were generated
+        await db_service.timetable_writer.flush()
+        page = await db_service.get_user_timetables(user_id, limit, before=before, after=after, fields=parse_fields(fields))
+        return DocumentResponse({
+            "timetables": TIMETABLE_DTO.dump_many(page["items"]),
+            "next_cursor": page["next_cursor"],
+            "prev_cursor": page["prev_cursor"]
+        })
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Timetable fetch error: {str(e)}")
+
+@router.get("/timetables/{user_id}/slots")
+async def get_timetable_slots_at(
+    user_id: str,
+    at: str = Query(..., description="Clock time, e.g. 21:00"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """What's scheduled at a given time on each day of a date range (default: the coming week)"""
+    try:
+        minute = parse_clock_minute(at)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    start_date = start_date or date.today()
+    end_date = end_date or start_date + timedelta(days=6)
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    try:
+        matches = await db_service.get_timetable_slots_at(user_id, start_date.isoformat(), end_date.isoformat(), minute)
+        slots = [TimetableSlotMatch(**{**match, "slot": expand_slots([match["slot"]])[0]}) for match in matches]
+        return DocumentResponse({"at": at, "slots": slots})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Timetable fetch error: {str(e)}")
+
+@router.get("/timetable/{timetable_id}")
+async def get_timetable(timetable_id: str, db_service: DatabaseService = Depends(get_db_service)):
+    """Get one timetable including its full text and narrative"""
+    try:
+        timetable = await db_service.get_timetable(timetable_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Timetable fetch error: {str(e)}")
+    if not timetable:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    return DocumentResponse({**TIMETABLE_DTO.dump(timetable), "schedule": stored_schedule(timetable)})
+
+@router.get("/timetable/{timetable_id}/narrative")
+async def get_timetable_narrative(timetable_id: str, db_service: DatabaseService = Depends(get_db_service)):
+    """Get the encouraging note written for a timetable once it is ready"""
+    try:
+        timetable = await db_service.get_timetable_narrative(timetable_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Timetable fetch error: {str(e)}")
+    if not timetable:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    narrative = timetable.get("narrative")
+    return {"timetable_id": timetable_id, "narrative": narrative, "pending": narrative is None}
+
+@router.get("/timetable-cache/stats")
+async def get_timetable_cache_stats(llm_service: LLMService = Depends(get_llm_service)):
+    """Get hit/miss counters for the generated timetable cache"""
+    return llm_service.timetable_cache.stats()
+
+@router.get("/timetable-precompute/stats")
+async def get_timetable_precompute_stats(precomputer: TimetablePrecomputer = Depends(get_precomputer)):
+    """Get the off-peak window and progress of the overnight timetable precompute"""
     try:
-        timetables = await db_service.get_user_timetables(user_id, limit)
-        return {"timetables": timetables}
+        return await precomputer.stats()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Timetable fetch error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Precompute stats error: {str(e)}")
\ No newline at end of file
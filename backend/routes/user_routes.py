@@ -1,36 +1,48 @@
-from fastapi import APIRouter, HTTPException
-from models import User, UserResponse
+import os
+from fastapi import APIRouter, Depends, HTTPException
+from models import User, UserResponse, BulkUserRequest, BulkUserResponse
 from services import DatabaseService
 from utils import serialize_user_document, get_response_message
+from .dependencies import get_db_service
 
 router = APIRouter(prefix="/api", tags=["users"])
-db_service = DatabaseService()
 
 @router.post("/user/setup")
-async def setup_user(user_data: User):
+async def setup_user(user_data: User, db_service: DatabaseService = Depends(get_db_service)):
     """Setup or update user profile"""
     try:
-        # Check if user exists
-        existing_user = await db_service.get_user(user_data.user_id)
-        
-        if existing_user:
-            # Update existing user
-            await db_service.update_user(user_data.user_id, user_data.dict())
-            message = get_response_message("update", user_data.bro_name)
-        else:
-            # Create new user
-            await db_service.create_user(user_data.dict())
-            message = get_response_message("welcome", user_data.bro_name)
-            
+        # Single atomic upsert; created_at is only set when the user is new
+        created = await db_service.upsert_user(user_data.model_dump())
+        message = get_response_message("welcome" if created else "update", user_data.bro_name)
         return {"message": message}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"User setup error: {str(e)}")
 
+@router.post("/users/bulk", response_model=BulkUserResponse)
+async def bulk_setup_users(bulk_request: BulkUserRequest, db_service: DatabaseService = Depends(get_db_service)):
+    """Create or update many user profiles at once"""
+    try:
+        chunk_size = int(os.environ.get("BULK_USER_CHUNK_SIZE", "1000"))
+        results = await db_service.bulk_upsert_users([user.model_dump() for user in bulk_request.users], chunk_size)
+        return BulkUserResponse(
+            created=sum(1 for row in results if row["status"] == "created"),
+            updated=sum(1 for row in results if row["status"] == "updated"),
+            failed=sum(1 for row in results if row["status"] == "error"),
+            results=results
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk user setup error: {str(e)}")
+
 @router.get("/user/{user_id}", response_model=UserResponse)
-async def get_user(user_id: str):
+async def get_user(user_id: str, db_service: DatabaseService = Depends(get_db_service)):
     """Get user profile"""
     try:
         user = await db_service.get_user(user_id)
         return serialize_user_document(user, user_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Get user error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Get user error: {str(e)}")
+
+@router.get("/user-cache/stats")
+async def get_user_cache_stats(db_service: DatabaseService = Depends(get_db_service)):
+    """Get hit/miss counters for the user profile cache"""
+    return db_service.user_cache.stats()
\ No newline at end of file
@@ -1,4 +1,14 @@
 from .llm_service import LLMService
-from .database_service import DatabaseService
+from .database_service import DatabaseService, create_database_service
+from .index_manager import IndexManager
+from .chat_memory import ChatMemoryIndex
+from .context_manager import ConversationContextManager
+from .precompute import TimetablePrecomputer
+from .timetable_narrator import TimetableNarrator
+from .job_queue import JobQueue, JobQueueFullError
 
-__all__ = ["LLMService", "DatabaseService"]
\ No newline at end of file
+__all__ = [
+    "LLMService", "DatabaseService", "create_database_service", "IndexManager",
+    "ChatMemoryIndex", "ConversationContextManager", "TimetablePrecomputer", "TimetableNarrator",
+    "JobQueue", "JobQueueFullError"
+]
\ No newline at end of file
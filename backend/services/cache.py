@@ -0,0 +1,230 @@
+import os
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from utils import dumps_tagged, loads_tagged
+
+# Only write the value when the key's generation still matches the one read before the fill
+SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[2] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+class TTLCache:
+    """In-process LRU cache whose entries expire after ttl_seconds"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisCache:
+    """Shared cache tier storing orjson-encoded values in Redis
+
+    Each key has a generation counter bumped on delete; fills carrying the
+    generation read before the database lookup are dropped once it has moved,
+    so a slow read cannot write back a value a concurrent update invalidated.
+    """
+
+    def __init__(self, url: str, prefix: str, ttl_seconds: float = 3600):
+        import redis.asyncio as redis
+
+        # A stalled Redis must fail fast so callers fall back to the local tier and the database
+        self.client = redis.from_url(
+            url,
+            socket_timeout=float(os.environ.get("REDIS_SOCKET_TIMEOUT_SECONDS", "0.25")),
+            socket_connect_timeout=float(os.environ.get("REDIS_CONNECT_TIMEOUT_SECONDS", "0.5"))
+        )
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self._set_if_generation = self.client.register_script(SET_IF_GENERATION)
+
+    def _generation_key(self, key: str) -> str:
+        return f"{self.prefix}:gen:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.client.get(f"{self.prefix}:{key}")
+        return loads_tagged(value) if value is not None else None
+
+    async def generation(self, key: str) -> str:
+        value = await self.client.get(self._generation_key(key))
+        return value.decode() if value is not None else "0"
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None, generation: Optional[str] = None) -> bool:
+        """Store value; with a generation, only if the key has not been deleted since it was read"""
+        ttl = max(1, int(self.ttl_seconds if ttl_seconds is None else ttl_seconds))
+        if generation is None:
+            await self.client.set(f"{self.prefix}:{key}", dumps_tagged(value), ex=ttl)
+            return True
+        stored = await self._set_if_generation(
+            keys=[f"{self.prefix}:{key}", self._generation_key(key)],
+            args=[dumps_tagged(value), generation, ttl]
+        )
+        return bool(stored)
+
+    async def delete(self, key: str) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(self._generation_key(key))
+            # Outlive any value filled under the previous generation
+            pipe.expire(self._generation_key(key), max(1, int(self.ttl_seconds)) * 2)
+            pipe.delete(f"{self.prefix}:{key}")
+            await pipe.execute()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+class TieredCache:
+    """In-process LRU in front of an optional Redis tier, with hit/miss counters
+
+    Read-through callers take fill_token() before loading a missed value and
+    pass it to set(); a delete in between turns that set into a no-op. Redis
+    errors and timeouts count as misses, and after one the Redis tier is left
+    alone for REDIS_RETRY_AFTER_SECONDS (deletes are still attempted) so a
+    stalled server doesn't add its timeout to every request.
+    """
+
+    GENERATION_STRIPES = 1024
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600,
+        redis_url: Optional[str] = None,
+        local_ttl_seconds: Optional[float] = None
+    ):
+        self.name = name
+        # A shorter local TTL bounds how long one worker can serve a value another worker invalidated
+        self.local = TTLCache(max_entries, ttl_seconds if local_ttl_seconds is None else local_ttl_seconds)
+        self.remote = RedisCache(redis_url, f"brolife:{name}", ttl_seconds) if redis_url else None
+        self.hits = 0
+        self.misses = 0
+        self.remote_hits = 0
+        self.remote_errors = 0
+        self.stale_fills = 0
+        self.retry_after_seconds = float(os.environ.get("REDIS_RETRY_AFTER_SECONDS", "5"))
+        self._remote_down_until = 0.0
+        # Striped local generations keep the counters bounded however many keys are cached
+        self._generations = [0] * self.GENERATION_STRIPES
+
+    def _remote_available(self) -> bool:
+        return self.remote is not None and time.monotonic() >= self._remote_down_until
+
+    def _remote_failed(self) -> None:
+        self.remote_errors += 1
+        self._remote_down_until = time.monotonic() + self.retry_after_seconds
+
+    def _stripe(self, key: str) -> int:
+        return zlib.crc32(key.encode()) % self.GENERATION_STRIPES
+
+    async def fill_token(self, key: str) -> Tuple[int, Optional[str]]:
+        """Generations to pass to set() when filling key after a miss"""
+        local = self._generations[self._stripe(key)]
+        remote = None
+        if self._remote_available():
+            try:
+                remote = await self.remote.generation(key)
+            except Exception:
+                self._remote_failed()
+        return local, remote
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self._remote_available():
+            generation = self._generations[self._stripe(key)]
+            try:
+                value = await self.remote.get(key)
+            except Exception:
+                self._remote_failed()
+                value = None
+            if value is not None:
+                if generation == self._generations[self._stripe(key)]:
+                    self.local.set(key, value)
+                self.hits += 1
+                self.remote_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None, token: Optional[Tuple[int, Optional[str]]] = None) -> None:
+        if token is not None and token[0] != self._generations[self._stripe(key)]:
+            self.stale_fills += 1
+            return
+
+        if self._remote_available() and not (token is not None and token[1] is None):
+            # Without a remote generation on the token the shared fill cannot be checked, so only cache locally
+            try:
+                if not await self.remote.set(key, value, ttl_seconds, generation=token[1] if token else None):
+                    self.stale_fills += 1
+                    return
+            except Exception:
+                self._remote_failed()
+            if token is not None and token[0] != self._generations[self._stripe(key)]:
+                self.stale_fills += 1
+                return
+
+        local_ttl = self.local.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.local.ttl_seconds)
+        self.local.set(key, value, local_ttl)
+
+    async def delete(self, key: str) -> None:
+        self._generations[self._stripe(key)] += 1
+        self.local.delete(key)
+        if self.remote:
+            try:
+                await self.remote.delete(key)
+            except Exception:
+                self._remote_failed()
+
+    async def close(self) -> None:
+        if self.remote:
+            await self.remote.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "remote_hits": self.remote_hits,
+            "remote_errors": self.remote_errors,
+            "stale_fills": self.stale_fills,
+            "local_entries": len(self.local),
+            "redis_enabled": self.remote is not None
+        }
\ No newline at end of file
@@ -0,0 +1,207 @@
+import logging
+import os
+import numpy as np
+from bson import ObjectId
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from .database_service import DatabaseService
+from .embeddings import embed, normalize_message
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+class UserMemory:
+    """One user's message embeddings, in a matrix that grows by doubling
+
+    Rows are mostly in chat order, but turns another worker saved are appended
+    when they are synced, so rows are never assumed to be chronological.
+    """
+
+    def __init__(self, dimensions: int, capacity: int = 64):
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.ids: List[ObjectId] = []
+        self.rows: Dict[ObjectId, int] = {}
+        # Newest timestamp read back from the database, where the next re-sync starts
+        self.synced_at: Optional[datetime] = None
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def append(self, doc_id: ObjectId, vector: np.ndarray) -> None:
+        if doc_id in self.rows:
+            return
+        if self.count == len(self.vectors):
+            grown = np.zeros((len(self.vectors) * 2, self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.count] = self.vectors
+            self.vectors = grown
+        self.rows[doc_id] = self.count
+        self.vectors[self.count] = vector
+        self.ids.append(doc_id)
+
+    def search(self, query: np.ndarray, k: int, min_similarity: float, exclude: Iterable[ObjectId] = ()) -> List[ObjectId]:
+        """Ids of the k most similar messages, leaving out the ones in exclude"""
+        if self.count == 0 or k <= 0:
+            return []
+        similarities = self.vectors[:self.count] @ query
+        excluded = [self.rows[doc_id] for doc_id in exclude if doc_id in self.rows]
+        similarities[excluded] = -np.inf
+        top = np.argpartition(-similarities, k - 1)[:k] if self.count > k else np.arange(self.count)
+        top = top[np.argsort(-similarities[top])]
+        return [self.ids[i] for i in top if similarities[i] >= min_similarity]
+
+class ChatMemoryIndex:
+    """Finds the past chat turns most relevant to a new message
+
+    Every saved turn gets an embedding of the user's message, stored on the
+    chat_history document as float16 bytes, so the index survives restarts.
+    A user's embeddings are loaded into one float32 matrix on first use
+    (turns saved before this existed are embedded and written back then) and
+    new turns are appended as they are saved. Each worker process keeps its
+    own index, so before every search a loaded user is re-synced with the
+    turns other workers saved: those timestamped from MEMORY_SYNC_OVERLAP_SECONDS
+    before the newest one already read, which covers writes that reach the
+    database late. Search is a single matrix-vector product, well under a
+    millisecond for 10k turns. Loaded users are kept least recently used first
+    within MEMORY_MAX_ROWS rows overall.
+    """
+
+    def __init__(self, db_service: DatabaseService):
+        self.db_service = db_service
+        self.enabled = os.environ.get("MEMORY_ENABLED", "true").lower() == "true"
+        self.dimensions = int(os.environ.get("MEMORY_DIMENSIONS", "256"))
+        self.top_k = int(os.environ.get("MEMORY_TOP_K", "3"))
+        self.min_similarity = float(os.environ.get("MEMORY_MIN_SIMILARITY", "0.3"))
+        self.max_rows = int(os.environ.get("MEMORY_MAX_ROWS", "200000"))
+        self.sync_overlap = timedelta(seconds=float(os.environ.get("MEMORY_SYNC_OVERLAP_SECONDS", "60")))
+        self.users: "OrderedDict[str, UserMemory]" = OrderedDict()
+        self._loading: Dict[str, List] = {}
+        self._loads = SingleFlight()
+        self.searches = 0
+        self.recalled = 0
+        self.backfilled = 0
+        self.synced = 0
+
+    def embed_message(self, message: str) -> np.ndarray:
+        return embed(normalize_message(message), self.dimensions)
+
+    def remember(self, chat_data: Dict) -> Dict:
+        """Attach the message embedding to a chat document about to be saved"""
+        if not self.enabled:
+            return chat_data
+        chat_data.setdefault("_id", ObjectId())
+        vector = self.embed_message(chat_data.get("message", ""))
+        chat_data["embedding"] = vector.astype(np.float16).tobytes()
+        user_id = chat_data["user_id"]
+        if user_id in self._loading:
+            # Added once the load finishes, in case the load has already read past it
+            self._loading[user_id].append((chat_data["_id"], vector))
+        elif user_id in self.users:
+            self.users[user_id].append(chat_data["_id"], vector)
+        return chat_data
+
+    async def recall(self, user_id: str, message: str, exclude: Iterable[ObjectId] = ()) -> List[Dict]:
+        """The top-k earlier turns relevant to message, oldest first, leaving out the turns in exclude"""
+        if not self.enabled or not message.strip():
+            return []
+        memory = await self._user_memory(user_id)
+        self.searches += 1
+        ids = memory.search(self.embed_message(message), self.top_k, self.min_similarity, exclude)
+        if not ids:
+            return []
+        turns = await self.db_service.get_chat_turns(ids)
+        self.recalled += len(turns)
+        return sorted(turns, key=lambda turn: turn["timestamp"])
+
+    async def _user_memory(self, user_id: str) -> UserMemory:
+        memory = self.users.get(user_id)
+        if memory is None:
+            return await self._loads.do(user_id, lambda: self._load(user_id))
+        self.users.move_to_end(user_id)
+        await self._loads.do(("sync", user_id), lambda: self._sync(memory, user_id))
+        return memory
+
+    async def _read(self, memory: UserMemory, user_id: str, since: Optional[datetime] = None) -> int:
+        """Append the stored turns from since on that memory lacks, embedding any saved without one"""
+        missing = []
+        added = 0
+        async for doc in self.db_service.chat_embeddings_cursor(user_id, since):
+            timestamp = doc.get("timestamp")
+            if timestamp is not None and (memory.synced_at is None or timestamp > memory.synced_at):
+                memory.synced_at = timestamp
+            if doc["_id"] in memory.rows:
+                continue
+            embedding = doc.get("embedding")
+            if embedding and len(embedding) == self.dimensions * 2:
+                memory.append(doc["_id"], np.frombuffer(embedding, dtype=np.float16).astype(np.float32))
+            else:
+                # Placeholder row keeps chat order; filled in by the backfill below
+                missing.append(memory.count)
+                memory.append(doc["_id"], np.zeros(self.dimensions, dtype=np.float32))
+            added += 1
+        if missing:
+            await self._backfill(memory, missing)
+        return added
+
+    async def _sync(self, memory: UserMemory, user_id: str) -> None:
+        """Pick up turns other workers saved since this one last read the user's history"""
+        since = memory.synced_at - self.sync_overlap if memory.synced_at else None
+        try:
+            added = await self._read(memory, user_id, since)
+        except Exception as e:
+            logger.warning("Re-syncing chat memory for %s failed: %s", user_id, e)
+            return
+        if added:
+            self.synced += added
+            self._evict()
+
+    async def _load(self, user_id: str) -> UserMemory:
+        self._loading[user_id] = []
+        try:
+            # Turns still in the write-behind queue must be readable before the scan
+            await self.db_service.chat_history_writer.flush()
+            memory = UserMemory(self.dimensions)
+            await self._read(memory, user_id)
+            for doc_id, vector in self._loading[user_id]:
+                memory.append(doc_id, vector)
+        finally:
+            del self._loading[user_id]
+
+        self.users[user_id] = memory
+        self._evict()
+        return memory
+
+    async def _backfill(self, memory: UserMemory, rows: List[int]) -> None:
+        """Embed turns saved before the index existed and store their embeddings"""
+        turns = await self.db_service.get_chat_turns([memory.ids[row] for row in rows])
+        messages = {turn["_id"]: turn.get("message", "") for turn in turns}
+        embeddings = {}
+        for row in rows:
+            doc_id = memory.ids[row]
+            vector = self.embed_message(messages.get(doc_id, ""))
+            memory.vectors[row] = vector
+            embeddings[doc_id] = vector.astype(np.float16).tobytes()
+        try:
+            await self.db_service.save_chat_embeddings(embeddings)
+            self.backfilled += len(embeddings)
+        except Exception as e:
+            logger.warning("Storing backfilled chat embeddings failed: %s", e)
+
+    def _evict(self) -> None:
+        rows = sum(memory.count for memory in self.users.values())
+        while rows > self.max_rows and len(self.users) > 1:
+            _, memory = self.users.popitem(last=False)
+            rows -= memory.count
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "loaded_users": len(self.users),
+            "loaded_rows": sum(memory.count for memory in self.users.values()),
+            "max_rows": self.max_rows,
+            "searches": self.searches,
+            "recalled": self.recalled,
+            "backfilled": self.backfilled,
+            "synced": self.synced
+        }
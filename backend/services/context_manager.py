@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Set
+from utils import START_CURSOR
+from .chat_memory import ChatMemoryIndex
+from .database_service import DatabaseService
+from .llm_scheduler import estimate_tokens
+from .llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+class ConversationContextManager:
+    """Keeps each user's chat context inside a fixed token budget
+
+    The last CONTEXT_RECENT_TURNS turns are sent verbatim; once enough older
+    turns pile up they are folded into a rolling summary stored in the
+    conversation_summaries collection, in the background and at the lowest
+    scheduler priority. Older turns relevant to the new message are recalled
+    from the chat memory index within CONTEXT_MEMORY_TOKENS.
+    """
+
+    def __init__(self, db_service: DatabaseService, llm_service: LLMService, memory: Optional[ChatMemoryIndex] = None):
+        self.db_service = db_service
+        self.llm_service = llm_service
+        self.memory = memory
+        self.token_budget = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "1500"))
+        self.memory_tokens = int(os.environ.get("CONTEXT_MEMORY_TOKENS", "400"))
+        self.recent_turns = int(os.environ.get("CONTEXT_RECENT_TURNS", "6"))
+        self.summary_tokens = int(os.environ.get("CONTEXT_SUMMARY_TOKENS", "300"))
+        self.summary_batch = int(os.environ.get("CONTEXT_SUMMARY_BATCH", "20"))
+        self._compacting: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def remember(self, chat_data: Dict) -> Dict:
+        """Index a chat turn for recall; call before saving it"""
+        return self.memory.remember(chat_data) if self.memory else chat_data
+
+    async def build_context(self, user_id: str, message: str = "") -> str:
+        """Rolling summary, earlier turns relevant to message, and as many recent turns as fit in the token budget"""
+        if message and not self.llm_service.needs_context(message):
+            # Generic questions are served from the shared semantic cache, which never sees context
+            return ""
+        summary_doc = await self.db_service.get_conversation_summary(user_id)
+        summary = summary_doc.get("summary", "") if summary_doc else ""
+        # The previous turn may still be waiting in the write-behind queue
+        await self.db_service.chat_history_writer.flush()
+        recent = await self.db_service.get_recent_chat_turns(user_id, self.recent_turns)
+        # Turns already in the verbatim window are left out of recall by id
+        memories = await self.recall(user_id, message, [chat["_id"] for chat in recent])
+
+        budget = self.token_budget - estimate_tokens(summary) - sum(estimate_tokens(memory) for memory in memories)
+        turns: List[str] = []
+        # Walk newest to oldest so the most recent turns win when the budget runs out
+        for chat in recent:
+            turn = f"User: {chat.get('message', '')}\nYou: {chat.get('response', '')}"
+            cost = estimate_tokens(turn)
+            if cost > budget:
+                break
+            budget -= cost
+            turns.append(turn)
+
+        sections = []
+        if summary:
+            sections.append(f"Summary of your earlier conversations with the user:\n{summary}")
+        if memories:
+            sections.append("Earlier conversations related to the current message:\n" + "\n\n".join(memories))
+        if turns:
+            sections.append("Recent conversation:\n" + "\n\n".join(reversed(turns)))
+        return "\n\n".join(sections)
+
+    async def recall(self, user_id: str, message: str, recent_ids: Optional[List] = None) -> List[str]:
+        """Relevant turns outside the verbatim window, formatted and trimmed to CONTEXT_MEMORY_TOKENS"""
+        if not self.memory or not message:
+            return []
+        try:
+            turns = await self.memory.recall(user_id, message, exclude=recent_ids or ())
+        except Exception as e:
+            logger.warning("Chat memory recall failed for %s: %s", user_id, e)
+            return []
+
+        budget = self.memory_tokens
+        memories = []
+        for chat in turns:
+            memory = f"[{chat['timestamp']:%Y-%m-%d}] User: {chat.get('message', '')}\nYou: {chat.get('response', '')}"
+            cost = estimate_tokens(memory)
+            if cost > budget:
+                continue
+            budget -= cost
+            memories.append(memory)
+        return memories
+
+    def schedule_compaction(self, user_id: str) -> None:
+        """Fold old turns into the summary in the background if enough have accumulated"""
+        if user_id in self._compacting:
+            return
+        self._compacting.add(user_id)
+        task = asyncio.create_task(self._compact(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        """Wait for in-flight compactions before shutdown"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _compact(self, user_id: str) -> None:
+        try:
+            summary_doc = await self.db_service.get_conversation_summary(user_id) or {}
+            covered_cursor: Optional[str] = summary_doc.get("covered_cursor")
+            unsummarized = await self.db_service.count_chat_history(user_id, after=covered_cursor)
+            overflow = unsummarized - self.recent_turns
+            if overflow < self.summary_batch:
+                return
+
+            # Oldest turns after the summary (from the very first turn before any
+            # summary exists), leaving the verbatim window untouched
+            turns, last_cursor = await self.db_service.get_chat_turns_after(
+                user_id,
+                covered_cursor or START_CURSOR,
+                min(overflow, self.summary_batch * 2)
+            )
+            if not turns:
+                return
+            transcript = "\n\n".join(
+                f"User: {chat.get('message', '')}\nBro: {chat.get('response', '')}"
+                for chat in turns
+            )
+            summary = await self.llm_service.summarize_conversation(
+                summary_doc.get("summary", ""),
+                transcript,
+                user_id,
+                self.summary_tokens
+            )
+            await self.db_service.save_conversation_summary(user_id, summary, last_cursor)
+        except Exception as e:
+            logger.warning("Conversation compaction failed for %s: %s", user_id, e)
+        finally:
+            self._compacting.discard(user_id)
\ No newline at end of file
@@ -1,56 +1,576 @@
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Dict, List, Optional
+from bson import ObjectId
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCursor
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Dict, List, Optional, Tuple
+from utils import CHAT_HISTORY_DTO, JOB_DTO, TIMETABLE_DTO, build_projection, encode_cursor, keyset_query
+from .cache import TieredCache
+from .metrics import track_db
+from .write_behind import WriteBehindQueue
+
+# History leaves out precomputed timetables until the user is actually served one
+VISIBLE_TIMETABLES = {"$or": [{"precomputed": {"$ne": True}}, {"served_at": {"$ne": None}}]}
 
 class DatabaseService:
-    def __init__(self):
+    def __init__(self, client: Optional[AsyncIOMotorClient] = None):
         self.mongo_url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
         self.db_name = os.environ.get("DB_NAME", "brolife_database")
-        self.client = AsyncIOMotorClient(self.mongo_url)
+        self.max_pool_size = int(os.environ.get("MONGO_MAX_POOL_SIZE", "50"))
+        self.min_pool_size = int(os.environ.get("MONGO_MIN_POOL_SIZE", "5"))
+        self.max_idle_time_ms = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000"))
+        self.connect_timeout_ms = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+        self.server_selection_timeout_ms = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+        self.socket_timeout_ms = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+        self.client = client or AsyncIOMotorClient(
+            self.mongo_url,
+            maxPoolSize=self.max_pool_size,
+            minPoolSize=self.min_pool_size,
+            maxIdleTimeMS=self.max_idle_time_ms,
+            connectTimeoutMS=self.connect_timeout_ms,
+            serverSelectionTimeoutMS=self.server_selection_timeout_ms,
+            socketTimeoutMS=self.socket_timeout_ms
+        )
         self.db = self.client[self.db_name]
 
+        # Chat and timetable inserts are batched behind the request unless DB_WRITE_MODE=sync
+        write_options = {
+            "batch_size": int(os.environ.get("DB_WRITE_BATCH_SIZE", "100")),
+            "flush_interval": float(os.environ.get("DB_WRITE_FLUSH_INTERVAL_MS", "50")) / 1000,
+            "max_queue_size": int(os.environ.get("DB_WRITE_QUEUE_SIZE", "10000")),
+            "synchronous": os.environ.get("DB_WRITE_MODE", "batched") == "sync",
+            "max_retries": int(os.environ.get("DB_WRITE_MAX_RETRIES", "5"))
+        }
+        self.chat_history_writer = WriteBehindQueue(self.db.chat_history, **write_options)
+        self.timetable_writer = WriteBehindQueue(self.db.timetables, **write_options)
+
+        # Read-through profile cache; USER_CACHE_BACKEND=redis shares it between workers
+        redis_url = os.environ.get("REDIS_URL") if os.environ.get("USER_CACHE_BACKEND", "memory") == "redis" else None
+        self.user_cache = TieredCache(
+            "users",
+            max_entries=int(os.environ.get("USER_CACHE_MAX_ENTRIES", "10000")),
+            ttl_seconds=float(os.environ.get("USER_CACHE_TTL_SECONDS", "300")),
+            redis_url=redis_url,
+            local_ttl_seconds=float(os.environ.get("USER_CACHE_LOCAL_TTL_SECONDS", "5")) if redis_url else None
+        )
+        self.user_negative_ttl_seconds = float(os.environ.get("USER_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+
+    async def connect(self) -> None:
+        """Warm up the connection pool so the first request doesn't pay for it"""
+        await self.client.admin.command("ping")
+
+    async def flush_writes(self) -> None:
+        """Wait for every batched insert to reach MongoDB"""
+        await self.chat_history_writer.flush()
+        await self.timetable_writer.flush()
+
+    async def close(self) -> None:
+        """Flush batched inserts, then close every pooled connection"""
+        await self.chat_history_writer.close()
+        await self.timetable_writer.close()
+        await self.user_cache.close()
+        self.client.close()
+
+    def write_stats(self) -> List[Dict]:
+        """Counters for the write-behind queues"""
+        return [self.chat_history_writer.stats(), self.timetable_writer.stats()]
+
+    def user_cursor(self, user_id: str) -> AsyncIOMotorCursor:
+        """Cursor behind get_user"""
+        return self.db.users.find({"user_id": user_id}).limit(1)
+
+    def chat_history_cursor(
+        self,
+        user_id: str,
+        limit: int = 20,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIOMotorCursor:
+        """Cursor behind get_chat_history"""
+        return self._keyset_cursor(self.db.chat_history, "timestamp", CHAT_HISTORY_DTO.fields, user_id, limit, before, after, fields)
+
+    def user_timetables_cursor(
+        self,
+        user_id: str,
+        limit: int = 10,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIOMotorCursor:
+        """Cursor behind get_user_timetables"""
+        return self._keyset_cursor(
+            self.db.timetables, "created_at", TIMETABLE_DTO.fields, user_id, limit, before, after, fields, VISIBLE_TIMETABLES
+        )
+
+    def chat_embeddings_cursor(self, user_id: str, since: Optional[datetime] = None) -> AsyncIOMotorCursor:
+        """Cursor behind the chat memory index load and re-sync: turn embeddings from since on, oldest first"""
+        query = {"user_id": user_id}
+        if since is not None:
+            query["timestamp"] = {"$gte": since}
+        return (
+            self.db.chat_history.find(query, {"_id": 1, "timestamp": 1, "embedding": 1})
+            .sort([("timestamp", 1), ("_id", 1)])
+        )
+
+    def users_after_cursor(self, last_user_id: Optional[str] = None, limit: int = 100) -> AsyncIOMotorCursor:
+        """Cursor behind get_users_after"""
+        query = {"goals.0": {"$exists": True}}
+        if last_user_id is not None:
+            query["user_id"] = {"$gt": last_user_id}
+        projection = {"_id": 0, "user_id": 1, "bro_name": 1, "goals": 1, "preferences": 1}
+        return self.db.users.find(query, projection).sort("user_id", 1).limit(limit)
+
+    def precomputed_timetable_cursor(self, user_id: str, date: str, input_key: str) -> AsyncIOMotorCursor:
+        """Cursor behind get_precomputed_timetable"""
+        query = {"user_id": user_id, "date": date, "input_key": input_key, "precomputed": True}
+        return self.db.timetables.find(query, {"_id": 0}).limit(1)
+
+    def latest_timetable_cursor(self, user_id: str, date: str) -> AsyncIOMotorCursor:
+        """Cursor behind get_latest_timetable"""
+        return self.db.timetables.find({"user_id": user_id, "date": date}, {"_id": 0, "narrative": 0}).sort("created_at", -1).limit(1)
+
+    def timetable_slots_cursor(self, user_id: str, start_date: str, end_date: str, minute: int) -> AsyncIOMotorCursor:
+        """Cursor behind get_timetable_slots_at"""
+        covering = {"start_minute": {"$lte": minute}, "end_minute": {"$gt": minute}}
+        query = {"user_id": user_id, "date": {"$gte": start_date, "$lte": end_date}, "slots": {"$elemMatch": covering}}
+        projection = {"_id": 0, "date": 1, "timetable_id": 1, "slots": {"$elemMatch": covering}}
+        return self.db.timetables.find(query, projection).sort([("date", 1), ("created_at", -1)])
+
+    def _keyset_cursor(self, collection, sort_field, allowed_fields, user_id, limit, before, after, fields, where=None) -> AsyncIOMotorCursor:
+        range_query, direction = keyset_query(sort_field, before, after)
+        query = {"user_id": user_id, **range_query, **(where or {})}
+        projection = build_projection(fields, allowed_fields, sort_field)
+        return (
+            collection.find(query, projection)
+            .sort([(sort_field, direction), ("_id", direction)])
+            .limit(limit)
+        )
+
+    async def _read_page(
+        self,
+        cursor: AsyncIOMotorCursor,
+        sort_field: str,
+        limit: int,
+        before: Optional[str],
+        after: Optional[str]
+    ) -> Dict:
+        """Drain a keyset cursor fetched with limit + 1 into a newest-first page
+
+        The extra document only tells whether more exist in the direction of
+        travel. A cursor is set only when its page is known to have documents:
+        older ones follow first and before pages only if the extra one was
+        there, and always precede an after page; newer ones always precede a
+        before page and follow an after page only if the extra one was there.
+        """
+        items = []
+        async for doc in cursor:
+            items.append(doc)
+        more = len(items) > limit
+        items = items[:limit]
+        if after:
+            # Pages towards newer documents are fetched oldest-first
+            items.reverse()
+            has_newer, has_older = more, True
+        else:
+            has_newer, has_older = bool(before), more
+
+        prev_cursor = encode_cursor(items[0][sort_field], items[0]["_id"]) if items and has_newer else None
+        next_cursor = encode_cursor(items[-1][sort_field], items[-1]["_id"]) if items and has_older else None
+        for doc in items:
+            doc.pop("_id", None)
+        return {"items": items, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+    def query_cursors(self, user_id: str) -> Dict[str, AsyncIOMotorCursor]:
+        """Every hot read query, keyed by the method that issues it, for plan checks"""
+        page_cursor = encode_cursor(datetime.utcnow(), ObjectId())
+        return {
+            "get_user": self.user_cursor(user_id),
+            "get_chat_history": self.chat_history_cursor(user_id),
+            "get_chat_history(before)": self.chat_history_cursor(user_id, before=page_cursor),
+            "get_chat_history(after)": self.chat_history_cursor(user_id, after=page_cursor),
+            "chat_memory_load": self.chat_embeddings_cursor(user_id),
+            "chat_memory_sync": self.chat_embeddings_cursor(user_id, since=datetime.utcnow()),
+            "get_user_timetables": self.user_timetables_cursor(user_id),
+            "get_user_timetables(before)": self.user_timetables_cursor(user_id, before=page_cursor),
+            "get_user_timetables(after)": self.user_timetables_cursor(user_id, after=page_cursor),
+            "get_users_after": self.users_after_cursor(user_id),
+            "get_precomputed_timetable": self.precomputed_timetable_cursor(user_id, datetime.utcnow().strftime("%Y-%m-%d"), ""),
+            "get_latest_timetable": self.latest_timetable_cursor(user_id, datetime.utcnow().strftime("%Y-%m-%d")),
+            "get_timetable_slots_at": self.timetable_slots_cursor(user_id, "2000-01-01", "2000-01-07", 21 * 60)
+        }
+
+    @track_db("get_user")
     async def get_user(self, user_id: str) -> Optional[Dict]:
-        """Get user by user_id"""
-        return await self.db.users.find_one({"user_id": user_id})
+        """Get user by user_id, served from the profile cache when possible"""
+        cached = await self.user_cache.get(user_id)
+        if cached is not None:
+            # An empty dict is the negative-cache marker for an unknown user
+            return dict(cached) or None
+
+        # Taken before the read so an update landing meanwhile voids the fill below
+        token = await self.user_cache.fill_token(user_id)
+        user = await self.db.users.find_one({"user_id": user_id}, {"_id": 0})
+        if user:
+            await self.user_cache.set(user_id, user, token=token)
+        elif self.user_negative_ttl_seconds > 0:
+            await self.user_cache.set(user_id, {}, ttl_seconds=self.user_negative_ttl_seconds, token=token)
+        return dict(user) if user else None
+
+    async def invalidate_user(self, user_id: str) -> None:
+        """Drop a user's cached profile after it changes"""
+        await self.user_cache.delete(user_id)
 
+    @track_db("create_user")
     async def create_user(self, user_data: Dict) -> Dict:
         """Create new user"""
         result = await self.db.users.insert_one(user_data)
         user_data["_id"] = result.inserted_id
+        await self.invalidate_user(user_data["user_id"])
         return user_data
 
+    @track_db("update_user")
     async def update_user(self, user_id: str, user_data: Dict) -> bool:
         """Update existing user"""
         result = await self.db.users.update_one(
             {"user_id": user_id},
             {"$set": user_data}
         )
+        await self.invalidate_user(user_id)
         return result.modified_count > 0
 
+    @track_db("upsert_user")
+    async def upsert_user(self, user_data: Dict) -> bool:
+        """Create or update a user in one round trip; returns True when the user was created"""
+        user_id = user_data["user_id"]
+        result = await self.db.users.update_one(
+            {"user_id": user_id},
+            self._user_upsert_update(user_data),
+            upsert=True
+        )
+        await self.invalidate_user(user_id)
+        return result.upserted_id is not None
+
+    @track_db("bulk_upsert_users")
+    async def bulk_upsert_users(self, users: List[Dict], chunk_size: int = 1000) -> List[Dict]:
+        """Upsert many users with unordered bulk writes, reporting a result per row"""
+        results = []
+        for start in range(0, len(users), chunk_size):
+            chunk = users[start:start + chunk_size]
+            operations = [
+                UpdateOne({"user_id": user["user_id"]}, self._user_upsert_update(user), upsert=True)
+                for user in chunk
+            ]
+            try:
+                result = await self.db.users.bulk_write(operations, ordered=False)
+                details = result.bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+
+            upserted = {item["index"] for item in details.get("upserted", [])}
+            errors = {item["index"]: item.get("errmsg", "write error") for item in details.get("writeErrors", [])}
+            for index, user in enumerate(chunk):
+                row = {"index": start + index, "user_id": user["user_id"]}
+                if index in errors:
+                    row.update(status="error", error=errors[index])
+                else:
+                    row["status"] = "created" if index in upserted else "updated"
+                results.append(row)
+
+            for user in chunk:
+                await self.invalidate_user(user["user_id"])
+        return results
+
+    def _user_upsert_update(self, user_data: Dict) -> Dict:
+        """$set the profile fields but only stamp created_at when the user is inserted"""
+        profile = {key: value for key, value in user_data.items() if key not in ("_id", "created_at")}
+        return {
+            "$set": profile,
+            "$setOnInsert": {"created_at": user_data.get("created_at") or datetime.utcnow()}
+        }
+
+    @track_db("save_chat_history")
     async def save_chat_history(self, chat_data: Dict) -> Dict:
-        """Save chat message to history"""
-        result = await self.db.chat_history.insert_one(chat_data)
-        chat_data["_id"] = result.inserted_id
+        """Queue chat message for a batched insert into history"""
+        chat_data.setdefault("_id", ObjectId())
+        await self.chat_history_writer.put(chat_data)
         return chat_data
 
-    async def get_chat_history(self, user_id: str, limit: int = 20) -> List[Dict]:
-        """Get chat history for user"""
-        cursor = self.db.chat_history.find({"user_id": user_id}).sort("timestamp", -1).limit(limit)
-        history = []
-        async for chat in cursor:
-            history.append(chat)
-        return history
+    @track_db("get_chat_history")
+    async def get_chat_history(
+        self,
+        user_id: str,
+        limit: int = 20,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Dict:
+        """Get a newest-first page of chat history for user"""
+        # Never read the stored embeddings for history pages
+        cursor = self.chat_history_cursor(user_id, limit + 1, before, after, fields or CHAT_HISTORY_DTO.fields)
+        return await self._read_page(cursor, "timestamp", limit, before, after)
+
+    @track_db("get_recent_chat_turns")
+    async def get_recent_chat_turns(self, user_id: str, limit: int) -> List[Dict]:
+        """Newest-first message and response of the user's latest turns, keeping their _id"""
+        return await self.chat_history_cursor(user_id, limit, fields=["message", "response"]).to_list(length=limit)
 
+    @track_db("get_chat_turns_after")
+    async def get_chat_turns_after(self, user_id: str, after: str, limit: int) -> Tuple[List[Dict], Optional[str]]:
+        """Oldest-first chat turns after a cursor, with the cursor of the last one returned"""
+        docs = await self.chat_history_cursor(user_id, limit, after=after, fields=["message", "response"]).to_list(length=limit)
+        last_cursor = encode_cursor(docs[-1]["timestamp"], docs[-1]["_id"]) if docs else None
+        return docs, last_cursor
+
+    @track_db("get_chat_turns")
+    async def get_chat_turns(self, ids: List[ObjectId]) -> List[Dict]:
+        """Message, response and time of specific chat turns"""
+        cursor = self.db.chat_history.find({"_id": {"$in": ids}}, {"message": 1, "response": 1, "timestamp": 1})
+        return await cursor.to_list(length=len(ids))
+
+    @track_db("save_chat_embeddings")
+    async def save_chat_embeddings(self, embeddings: Dict[ObjectId, bytes]) -> None:
+        """Store message embeddings computed for turns saved without one"""
+        operations = [UpdateOne({"_id": doc_id}, {"$set": {"embedding": embedding}}) for doc_id, embedding in embeddings.items()]
+        for start in range(0, len(operations), 1000):
+            await self.db.chat_history.bulk_write(operations[start:start + 1000], ordered=False)
+
+    @track_db("count_chat_history")
+    async def count_chat_history(self, user_id: str, after: Optional[str] = None) -> int:
+        """Count chat turns for user, optionally only those newer than a cursor"""
+        await self.chat_history_writer.flush()
+        range_query, _ = keyset_query("timestamp", after=after)
+        return await self.db.chat_history.count_documents({"user_id": user_id, **range_query})
+
+    @track_db("get_conversation_summary")
+    async def get_conversation_summary(self, user_id: str) -> Optional[Dict]:
+        """Get the rolling summary of a user's older chat turns"""
+        return await self.db.conversation_summaries.find_one({"user_id": user_id}, {"_id": 0})
+
+    @track_db("save_conversation_summary")
+    async def save_conversation_summary(self, user_id: str, summary: str, covered_cursor: Optional[str]) -> None:
+        """Store the rolling summary and the cursor of the newest turn it covers"""
+        await self.db.conversation_summaries.update_one(
+            {"user_id": user_id},
+            {"$set": {"summary": summary, "covered_cursor": covered_cursor, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    @track_db("save_timetable")
     async def save_timetable(self, timetable_data: Dict) -> Dict:
-        """Save timetable"""
-        result = await self.db.timetables.insert_one(timetable_data)
-        timetable_data["_id"] = result.inserted_id
+        """Queue timetable for a batched insert"""
+        timetable_data.setdefault("_id", ObjectId())
+        await self.timetable_writer.put(timetable_data)
         return timetable_data
 
-    async def get_user_timetables(self, user_id: str, limit: int = 10) -> List[Dict]:
-        """Get timetables for user"""
-        cursor = self.db.timetables.find({"user_id": user_id}).sort("created_at", -1).limit(limit)
-        timetables = []
-        async for timetable in cursor:
-            timetables.append(timetable)
-        return timetables
\ No newline at end of file
+    @track_db("save_timetables")
+    async def save_timetables(self, timetables: List[Dict]) -> List[Dict]:
+        """Insert several timetables with a single bulk write"""
+        if not timetables:
+            return []
+        for timetable_data in timetables:
+            timetable_data.setdefault("_id", ObjectId())
+        await self.db.timetables.insert_many(timetables, ordered=False)
+        return timetables
+
+    @track_db("save_timetable_narrative")
+    async def save_timetable_narrative(self, timetable_id: str, narrative: str) -> bool:
+        """Attach LLM-written commentary to a saved timetable"""
+        # The timetable itself may still be waiting in the write-behind queue
+        await self.timetable_writer.flush()
+        result = await self.db.timetables.update_one({"timetable_id": timetable_id}, {"$set": {"narrative": narrative}})
+        return result.matched_count > 0
+
+    @track_db("get_timetable")
+    async def get_timetable(self, timetable_id: str) -> Optional[Dict]:
+        """One timetable with its full text and narrative"""
+        await self.timetable_writer.flush()
+        return await self.db.timetables.find_one({"timetable_id": timetable_id}, {"_id": 0, "input_key": 0})
+
+    @track_db("get_timetable_slots_at")
+    async def get_timetable_slots_at(self, user_id: str, start_date: str, end_date: str, minute: int) -> List[Dict]:
+        """The slot covering minute on each day in the range, from that day's newest timetable"""
+        matches = {}
+        async for doc in self.timetable_slots_cursor(user_id, start_date, end_date, minute):
+            # Newest first within a date, so the first timetable seen for a day wins
+            if doc["date"] not in matches:
+                matches[doc["date"]] = {"date": doc["date"], "timetable_id": doc["timetable_id"], "slot": doc["slots"][0]}
+        return list(matches.values())
+
+    @track_db("get_timetable_narrative")
+    async def get_timetable_narrative(self, timetable_id: str) -> Optional[Dict]:
+        """Just the narrative of one timetable, without its schedule"""
+        # Read-your-writes for a timetable that was only just queued
+        await self.timetable_writer.flush()
+        return await self.db.timetables.find_one({"timetable_id": timetable_id}, {"_id": 0, "timetable_id": 1, "narrative": 1})
+
+    @track_db("get_user_timetables")
+    async def get_user_timetables(
+        self,
+        user_id: str,
+        limit: int = 10,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Dict:
+        """Get a newest-first page of timetables for user"""
+        cursor = self.user_timetables_cursor(user_id, limit + 1, before, after, fields or TIMETABLE_DTO.default_fields)
+        return await self._read_page(cursor, "created_at", limit, before, after)
+
+    @track_db("get_users_after")
+    async def get_users_after(self, last_user_id: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Next batch of users with goals, in user_id order, after last_user_id"""
+        return await self.users_after_cursor(last_user_id, limit).to_list(length=limit)
+
+    @track_db("get_latest_timetable_time")
+    async def get_latest_timetable_time(self, user_id: str) -> Optional[datetime]:
+        """When the user's newest timetable was created, or None if they have none
+
+        Precomputed timetables the user was never served don't count, or every
+        precompute pass would keep its user looking active.
+        """
+        page = await self.get_user_timetables(user_id, 1, fields=["created_at"])
+        return page["items"][0]["created_at"] if page["items"] else None
+
+    @track_db("get_precomputed_timetable")
+    async def get_precomputed_timetable(self, user_id: str, date: str, input_key: str) -> Optional[Dict]:
+        """Precomputed timetable for the day, if one was generated from the same inputs"""
+        docs = await self.precomputed_timetable_cursor(user_id, date, input_key).to_list(length=1)
+        return docs[0] if docs else None
+
+    @track_db("mark_timetable_served")
+    async def mark_timetable_served(self, timetable_id: str) -> None:
+        """Record that a precomputed timetable reached the user, adding it to their history"""
+        await self.db.timetables.update_one(
+            {"timetable_id": timetable_id, "served_at": None},
+            {"$set": {"served_at": datetime.utcnow()}}
+        )
+
+    @track_db("get_latest_timetable")
+    async def get_latest_timetable(self, user_id: str, date: str) -> Optional[Dict]:
+        """The user's newest timetable for the day, with the inputs it was built from"""
+        # Read-your-writes for a timetable that was only just queued
+        await self.timetable_writer.flush()
+        docs = await self.latest_timetable_cursor(user_id, date).to_list(length=1)
+        return docs[0] if docs else None
+
+    @track_db("get_precompute_checkpoint")
+    async def get_precompute_checkpoint(self, job: str) -> Optional[Dict]:
+        """Progress of a background precompute job"""
+        return await self.db.precompute_checkpoints.find_one({"job": job}, {"_id": 0})
+
+    @track_db("save_precompute_checkpoint")
+    async def save_precompute_checkpoint(self, job: str, state: Dict) -> None:
+        """Record a background precompute job's progress so it can resume after a restart"""
+        await self.db.precompute_checkpoints.update_one(
+            {"job": job},
+            {"$set": {**state, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    @track_db("create_job")
+    async def create_job(self, job_id: str, kind: str, payload: Dict, user_id: Optional[str] = None) -> Dict:
+        """Persist a newly queued background job"""
+        now = datetime.utcnow()
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "user_id": user_id,
+            "status": "queued",
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        await self.db.jobs.insert_one(job)
+        job.pop("_id", None)
+        return job
+
+    @track_db("claim_job")
+    async def claim_job(self, job_id: str, lease_seconds: float) -> Optional[Dict]:
+        """Atomically mark a queued (or abandoned running) job as running; None if someone else has it"""
+        now = datetime.utcnow()
+        job = await self.db.jobs.find_one_and_update(
+            {
+                "job_id": job_id,
+                "$or": [{"status": "queued"}, {"status": "running", "lease_expires_at": {"$lt": now}}]
+            },
+            {"$set": {"status": "running", "updated_at": now, "lease_expires_at": now + timedelta(seconds=lease_seconds)}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job:
+            job.pop("_id", None)
+        return job
+
+    @track_db("renew_job_lease")
+    async def renew_job_lease(self, job_id: str, lease_seconds: float) -> None:
+        """Push back the lease of a job this process is still running"""
+        now = datetime.utcnow()
+        await self.db.jobs.update_one(
+            {"job_id": job_id, "status": "running"},
+            {"$set": {"updated_at": now, "lease_expires_at": now + timedelta(seconds=lease_seconds)}}
+        )
+
+    @track_db("finish_job")
+    async def finish_job(
+        self,
+        job_id: str,
+        status: str,
+        ttl_seconds: float,
+        result: Optional[Dict] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Store a job's outcome; the TTL index removes it ttl_seconds later"""
+        now = datetime.utcnow()
+        await self.db.jobs.update_one(
+            {"job_id": job_id},
+            {
+                "$set": {
+                    "status": status,
+                    "result": result,
+                    "error": error,
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=ttl_seconds)
+                },
+                "$unset": {"lease_expires_at": ""}
+            }
+        )
+
+    @track_db("get_job")
+    async def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get a background job's current state"""
+        return await self.db.jobs.find_one({"job_id": job_id}, JOB_DTO.projection())
+
+    @track_db("release_jobs")
+    async def release_jobs(self, job_ids: List[str]) -> None:
+        """Put running jobs this process gave up on during shutdown back to queued"""
+        await self.db.jobs.update_many(
+            {"job_id": {"$in": job_ids}, "status": "running"},
+            {"$set": {"status": "queued", "updated_at": datetime.utcnow()}, "$unset": {"lease_expires_at": ""}}
+        )
+
+    @track_db("get_recoverable_jobs")
+    async def get_recoverable_jobs(self, limit: int, queued_before: Optional[datetime] = None) -> List[Dict]:
+        """Oldest jobs whose worker's lease ran out or that were queued (before queued_before, if given)"""
+        queued = {"status": "queued"}
+        if queued_before is not None:
+            queued["updated_at"] = {"$lt": queued_before}
+        query = {
+            "$or": [
+                queued,
+                {"status": "running", "lease_expires_at": {"$lt": datetime.utcnow()}}
+            ]
+        }
+        cursor = self.db.jobs.find(query, {"_id": 0, "job_id": 1}).sort("created_at", 1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+def create_database_service() -> DatabaseService:
+    """DatabaseService for the configured DB_BACKEND: mongo, or memory for offline load tests"""
+    if os.environ.get("DB_BACKEND", "mongo") == "memory":
+        # In-process MongoDB stand-in; nothing persists beyond the process
+        from mongomock_motor import AsyncMongoMockClient
+
+        return DatabaseService(client=AsyncMongoMockClient())
+    return DatabaseService()
\ No newline at end of file
@@ -0,0 +1,34 @@
+import re
+import zlib
+import numpy as np
+
+# Question phrasing that carries no meaning of its own ("how do I" vs "how can I")
+STOP_WORDS = {
+    "a", "about", "am", "an", "and", "any", "are", "at", "be", "can", "could", "did", "do", "does", "for", "give",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "please", "said", "say", "should", "some", "tell", "that",
+    "the", "this", "to", "was", "what", "whats", "what's", "with", "would", "you"
+}
+
+def normalize_message(message: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9']+", message.casefold()))
+
+def embed(text: str, dimensions: int) -> np.ndarray:
+    """Unit-length hashed bag of words and character trigrams
+
+    Words carry meaning, trigrams absorb typos and inflections ("focus" vs
+    "focusing"). crc32 keeps the hashing stable across processes.
+    """
+    words = [word for word in text.split() if word not in STOP_WORDS] or text.split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    vector = np.zeros(dimensions, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter((zlib.crc32(feature.encode()) for feature in features), dtype=np.uint64, count=len(features))
+    # The top hash bit picks a sign so colliding features tend to cancel out
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, (hashes % dimensions).astype(np.int64), signs)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from typing import Any, Dict, List, Set
+from .database_service import DatabaseService
+
+logger = logging.getLogger(__name__)
+
+# Indexes backing every hot query in DatabaseService
+REQUIRED_INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True)
+    ],
+    "chat_history": [
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], name="user_id_timestamp_id")
+    ],
+    "conversation_summaries": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True)
+    ],
+    "timetables": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_id_created_at_id"),
+        IndexModel([("user_id", ASCENDING), ("date", ASCENDING), ("created_at", DESCENDING)], name="user_id_date_created_at"),
+        IndexModel([("timetable_id", ASCENDING)], name="timetable_id_unique", unique=True)
+    ],
+    "jobs": [
+        IndexModel([("job_id", ASCENDING)], name="job_id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0)
+    ],
+    "precompute_checkpoints": [
+        IndexModel([("job", ASCENDING)], name="job_unique", unique=True)
+    ]
+}
+
+# Plan stages that mean a query is scanning or sorting instead of walking an index
+FORBIDDEN_STAGES = {"COLLSCAN", "SORT"}
+
+class IndexManager:
+    def __init__(self, db_service: DatabaseService):
+        self.db_service = db_service
+        self.db = db_service.db
+
+    async def ensure_indexes(self) -> Dict[str, Dict[str, Any]]:
+        """Create the required indexes one at a time, so one failure doesn't block the rest
+
+        Existing indexes are a no-op. Returns the created index names and the
+        failures ("name: error") per collection, plus for each failed unique
+        index a sample of the duplicate keys that have to be cleaned up first.
+        """
+        created: Dict[str, List[str]] = {}
+        failed: Dict[str, List[str]] = {}
+        duplicates: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        for collection, indexes in REQUIRED_INDEXES.items():
+            for index in indexes:
+                name = index.document["name"]
+                try:
+                    created.setdefault(collection, []).extend(await self.db[collection].create_indexes([index]))
+                except Exception as e:
+                    logger.error("Creating index %s.%s failed: %s", collection, name, e)
+                    failed.setdefault(collection, []).append(f"{name}: {e}")
+                    if not index.document.get("unique"):
+                        continue
+                    try:
+                        found = await self.find_duplicates(collection, index)
+                    except Exception as e:
+                        logger.error("Checking %s.%s for duplicates failed: %s", collection, name, e)
+                        continue
+                    if found:
+                        logger.error("%s.%s has duplicate keys, e.g. %s", collection, name, found)
+                        duplicates.setdefault(collection, {})[name] = found
+        return {"created": created, "failed": failed, "duplicates": duplicates}
+
+    async def find_duplicates(self, collection: str, index: IndexModel, limit: int = 20) -> List[Dict[str, Any]]:
+        """Sample the key values a unique index rejects, with how many documents share each"""
+        fields = list(index.document["key"])
+        pipeline = [
+            {"$group": {"_id": {field: f"${field}" for field in fields}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": limit}
+        ]
+        rows = await self.db[collection].aggregate(pipeline, allowDiskUse=True).to_list(limit)
+        return [{"key": row["_id"], "count": row["count"]} for row in rows]
+
+    async def verify_query_plans(self, user_id: str = "__plan_check__") -> Dict[str, List[str]]:
+        """Explain every DatabaseService query and report forbidden plan stages per query"""
+        problems = {}
+        for name, cursor in self.db_service.query_cursors(user_id).items():
+            plan = await cursor.explain()
+            stages = collect_stages(plan.get("queryPlanner", {}).get("winningPlan", {}))
+            bad_stages = sorted(stages & FORBIDDEN_STAGES)
+            if bad_stages:
+                problems[name] = bad_stages
+        return problems
+
+def collect_stages(plan: Any) -> Set[str]:
+    """Collect every stage name in an explain() plan tree"""
+    stages = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= collect_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages |= collect_stages(value)
+    return stages
+
+async def run(check: bool) -> int:
+    db_service = DatabaseService()
+    try:
+        manager = IndexManager(db_service)
+        result = await manager.ensure_indexes()
+        print(json.dumps(result, indent=2))
+        if result["failed"]:
+            return 1
+        if not check:
+            return 0
+
+        problems = await manager.verify_query_plans()
+        for name, stages in problems.items():
+            print(f"{name}: plan uses {', '.join(stages)}")
+        if problems:
+            return 1
+        print("All query plans use indexes")
+        return 0
+    finally:
+        await db_service.close()
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Create Brolife MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="fail if any query plan uses COLLSCAN or a blocking SORT")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.check)))
\ No newline at end of file
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from .database_service import DatabaseService
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict], Awaitable[Dict]]
+
+FINISHED_STATUSES = {"succeeded", "failed"}
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+class JobQueue:
+    """Runs long LLM work in a fixed worker pool instead of inside the request
+
+    Jobs are persisted in the jobs collection before they are queued and each
+    status change is written back, so any process can answer polls. A worker
+    claims a job atomically with a lease of JOB_LEASE_SECONDS, renewed every
+    third of that while the job runs. On startup every queued job is picked
+    up, and every JOB_SWEEP_INTERVAL_SECONDS after that running jobs whose
+    lease ran out (their worker died) and jobs left queued for a whole lease
+    are. A graceful shutdown puts the jobs its workers were running back to
+    queued. At most JOB_QUEUE_SIZE jobs wait in one process, counting
+    submissions still being persisted.
+    """
+
+    def __init__(self, db_service: DatabaseService):
+        self.db_service = db_service
+        self.worker_count = int(os.environ.get("JOB_WORKERS", "4"))
+        self.lease_seconds = float(os.environ.get("JOB_LEASE_SECONDS", "300"))
+        self.result_ttl_seconds = float(os.environ.get("JOB_RESULT_TTL_SECONDS", "86400"))
+        self.poll_interval = float(os.environ.get("JOB_POLL_INTERVAL_SECONDS", "1"))
+        self.sweep_interval = float(os.environ.get("JOB_SWEEP_INTERVAL_SECONDS", "60"))
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=int(os.environ.get("JOB_QUEUE_SIZE", "100")))
+        self.handlers: Dict[str, JobHandler] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._workers: List[asyncio.Task] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        # Job ids waiting in this process's queue, so a sweep doesn't queue them twice
+        self._pending: Set[str] = set()
+        # Jobs whose worker was cancelled mid-run, handed back to the queue on close
+        self._interrupted: List[str] = []
+        self._reserved = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.recovered = 0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Set the coroutine that runs jobs of this kind; it gets the payload and returns the result"""
+        self.handlers[kind] = handler
+
+    async def start(self) -> None:
+        """Start the workers, queue jobs left behind by a previous run and keep sweeping for abandoned ones"""
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        await self.recover()
+        self._sweeper = asyncio.create_task(self._sweep())
+
+    async def close(self) -> None:
+        """Stop the workers and put the jobs they were running back to queued for the next start"""
+        tasks = self._workers + ([self._sweeper] if self._sweeper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._interrupted:
+            try:
+                await self.db_service.release_jobs(self._interrupted)
+            except Exception as e:
+                logger.warning("Releasing %d interrupted jobs failed: %s", len(self._interrupted), e)
+            self._interrupted = []
+
+    async def recover(self, queued_before: Optional[datetime] = None) -> int:
+        """Queue jobs whose lease ran out, and jobs queued before queued_before, up to the free capacity"""
+        capacity = self.queue.maxsize - self.queue.qsize() - self._reserved
+        if capacity <= 0:
+            return 0
+        try:
+            jobs = await self.db_service.get_recoverable_jobs(capacity + len(self._pending), queued_before)
+        except Exception as e:
+            logger.warning("Job recovery failed: %s", e)
+            return 0
+        requeued = 0
+        for job in jobs:
+            if job["job_id"] in self._pending or self.queue.full():
+                continue
+            self._enqueue(job["job_id"])
+            requeued += 1
+        if requeued:
+            self.recovered += requeued
+            logger.info("Requeued %d unfinished jobs", requeued)
+        return requeued
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            # Jobs queued within the last lease may still be waiting in another process's queue
+            await self.recover(queued_before=datetime.utcnow() - timedelta(seconds=self.lease_seconds))
+
+    def _enqueue(self, job_id: str) -> None:
+        self.queue.put_nowait(job_id)
+        self._pending.add(job_id)
+
+    async def submit(self, kind: str, payload: Dict, user_id: Optional[str] = None) -> Dict:
+        """Persist and queue a job, returning its stored state"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        # Reserve the queue slot before persisting, so concurrent submits can't overfill it
+        if self.queue.qsize() + self._reserved >= self.queue.maxsize:
+            self.rejected += 1
+            raise JobQueueFullError("Too many jobs waiting, try again shortly")
+        self._reserved += 1
+        try:
+            job = await self.db_service.create_job(str(uuid.uuid4()), kind, payload, user_id)
+            self._enqueue(job["job_id"])
+        finally:
+            self._reserved -= 1
+        self.submitted += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await self.db_service.get_job(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """Return when the job changes in this process, or after timeout for jobs run elsewhere"""
+        event = self._events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            # Don't keep events for jobs this process never runs; other waiters fall back to polling
+            if self._events.get(job_id) is event:
+                del self._events[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            self._pending.discard(job_id)
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error("Job %s could not be run: %s", job_id, e)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await self.db_service.claim_job(job_id, self.lease_seconds)
+        if job is None:
+            # Finished, or claimed by a worker in another process
+            return
+        self._notify(job_id)
+
+        heartbeat = asyncio.create_task(self._renew_lease(job_id))
+        try:
+            result = await self.handlers[job["kind"]](job["payload"])
+            await self.db_service.finish_job(job_id, "succeeded", self.result_ttl_seconds, result=result)
+            self.succeeded += 1
+        except asyncio.CancelledError:
+            self._interrupted.append(job_id)
+            raise
+        except Exception as e:
+            logger.warning("Job %s failed: %s", job_id, e)
+            await self.db_service.finish_job(job_id, "failed", self.result_ttl_seconds, error=str(e))
+            self.failed += 1
+        finally:
+            heartbeat.cancel()
+        self._notify(job_id)
+
+    async def _renew_lease(self, job_id: str) -> None:
+        """Keep extending a running job's lease so no other process takes it over"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.db_service.renew_job_lease(job_id, self.lease_seconds)
+            except Exception as e:
+                logger.warning("Renewing the lease of job %s failed: %s", job_id, e)
+
+    def _notify(self, job_id: str) -> None:
+        event = self._events.pop(job_id, None)
+        if event:
+            event.set()
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.worker_count,
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "recovered": self.recovered
+        }
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import os
+import random
+import re
+import litellm
+from emergentintegrations.llm.chat import LlmChat, UserMessage
+from typing import AsyncIterator, List
+
+class EmergentBackend:
+    """Live provider calls: LlmChat for whole completions, litellm for token streams"""
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    async def complete(self, provider: str, model: str, system_message: str, text: str, session_id: str, operation: str) -> str:
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(provider, model)
+        return await chat.send_message(UserMessage(text=text))
+
+    async def stream(self, provider: str, model: str, system_message: str, text: str, user_id: str) -> AsyncIterator[str]:
+        stream = await litellm.acompletion(
+            model=f"{provider}/{model}",
+            api_key=self.api_key,
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": text}
+            ],
+            user=user_id,
+            stream=True
+        )
+        async for chunk in stream:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                yield token
+
+class FakeProviderError(Exception):
+    """Injected provider failure"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+CHAT_OPENERS = [
+    "Hey, love that you're thinking about this!",
+    "What's up! Let's figure this out together.",
+    "You got this, let's break it down.",
+    "Solid question, here's how I'd tackle it."
+]
+
+CHAT_TIPS = [
+    "Pick the one task that matters most and give it a 45 minute focus block before anything else.",
+    "Put your phone in another room, set a timer and work until it rings. Small wins stack up.",
+    "Write down the very next step, not the whole project. Momentum beats motivation.",
+    "Schedule a short walk after lunch; it resets your focus for the afternoon block.",
+    "Review what you finished tonight and plan tomorrow's first task before bed."
+]
+
+class FakeLLMBackend:
+    """Deterministic offline provider for load and latency testing (LLM_PROVIDER=fake)
+
+    Replies depend only on the prompt, so runs are reproducible. Latency is
+    drawn from FAKE_LLM_LATENCY_DISTRIBUTION (fixed, uniform or lognormal)
+    around FAKE_LLM_LATENCY_MS with FAKE_LLM_LATENCY_SPREAD; streams pace
+    tokens FAKE_LLM_TOKEN_DELAY_MS apart. FAKE_LLM_ERROR_RATE and
+    FAKE_LLM_RATE_LIMIT_RATE inject 500s and 429s, FAKE_LLM_STALL_RATE
+    provider stalls of FAKE_LLM_STALL_MS, and models listed in
+    FAKE_LLM_FAILING_MODELS always fail, for exercising hedging and failover.
+    """
+
+    def __init__(self):
+        self.distribution = os.environ.get("FAKE_LLM_LATENCY_DISTRIBUTION", "lognormal")
+        self.latency_ms = float(os.environ.get("FAKE_LLM_LATENCY_MS", "800"))
+        self.spread = float(os.environ.get("FAKE_LLM_LATENCY_SPREAD", "0.5"))
+        self.token_delay_ms = float(os.environ.get("FAKE_LLM_TOKEN_DELAY_MS", "20"))
+        self.error_rate = float(os.environ.get("FAKE_LLM_ERROR_RATE", "0"))
+        self.rate_limit_rate = float(os.environ.get("FAKE_LLM_RATE_LIMIT_RATE", "0"))
+        self.stall_rate = float(os.environ.get("FAKE_LLM_STALL_RATE", "0"))
+        self.stall_ms = float(os.environ.get("FAKE_LLM_STALL_MS", "30000"))
+        self.failing_models = {model.strip() for model in os.environ.get("FAKE_LLM_FAILING_MODELS", "").split(",") if model.strip()}
+        self.random = random.Random(int(os.environ.get("FAKE_LLM_SEED", "0")))
+
+    def latency(self) -> float:
+        """One sampled completion latency in seconds"""
+        if self.stall_rate and self.random.random() < self.stall_rate:
+            return self.stall_ms / 1000
+        if self.distribution == "fixed":
+            millis = self.latency_ms
+        elif self.distribution == "uniform":
+            millis = self.random.uniform(self.latency_ms * (1 - self.spread), self.latency_ms * (1 + self.spread))
+        else:
+            millis = self.random.lognormvariate(0, self.spread) * self.latency_ms
+        return max(0.0, millis / 1000)
+
+    def inject_failure(self, model: str) -> None:
+        if model in self.failing_models:
+            raise FakeProviderError(f"Fake outage of {model} (503)", status_code=503)
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            raise FakeProviderError("Rate limit reached (429). Please try again in 1.5s", status_code=429)
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise FakeProviderError("Fake provider error (500)")
+
+    def reply(self, system_message: str, text: str, operation: str) -> str:
+        seed = int(hashlib.sha256(f"{system_message}\n{text}".encode()).hexdigest(), 16)
+        if operation in ("timetable", "timetable_blocks"):
+            return self.timetable_reply(text, seed)
+        if operation == "summary":
+            return "The user is working on their goals and checks in regularly for focus tips and accountability."
+        return f"{CHAT_OPENERS[seed % len(CHAT_OPENERS)]} {CHAT_TIPS[seed // 7 % len(CHAT_TIPS)]}"
+
+    def timetable_reply(self, text: str, seed: int) -> str:
+        goals_match = re.search(r"User's goals: (.*)", text)
+        focus_match = re.search(r"Night focus for [^:]+: (.*)", text)
+        goals: List[str] = [goal.strip() for goal in goals_match.group(1).split(",") if goal.strip()] if goals_match else []
+        goals = goals or ["your top priority"]
+        night_focus = focus_match.group(1).strip() if focus_match else "Side Hustle"
+        goal = lambda index: goals[(seed + index) % len(goals)]
+        return "\n".join([
+            "Here's your game plan for today, bro!",
+            "",
+            "**Morning (7:30-12:00)**",
+            "- 7:30-8:00: Breakfast and plan the day",
+            f"- 8:00-10:00: Deep work on {goal(0)}",
+            "- 10:00-10:15: Break",
+            f"- 10:15-12:00: Focused session on {goal(1)}",
+            "",
+            "**Afternoon (12:00-17:00)**",
+            "- 12:00-13:00: Lunch",
+            f"- 13:00-15:00: Work on {goal(2)}",
+            "- 15:00-15:15: Break",
+            "- 15:15-17:00: Admin and smaller tasks",
+            "",
+            "**Evening (17:00-21:00)**",
+            "- 17:00-18:00: Workout",
+            "- 18:00-19:00: Dinner",
+            "- 19:00-21:00: Personal time",
+            "",
+            f"**Night (21:00-00:30): {night_focus}**",
+            f"- 21:00-23:30: {night_focus} session",
+            "- 23:30-00:30: Wind down and sleep prep",
+            "",
+            "You got this!"
+        ])
+
+    async def complete(self, provider: str, model: str, system_message: str, text: str, session_id: str, operation: str) -> str:
+        await asyncio.sleep(self.latency())
+        self.inject_failure(model)
+        return self.reply(system_message, text, operation)
+
+    async def stream(self, provider: str, model: str, system_message: str, text: str, user_id: str) -> AsyncIterator[str]:
+        # Time to first token follows the latency distribution, then tokens are paced evenly
+        await asyncio.sleep(self.latency())
+        self.inject_failure(model)
+        words = self.reply(system_message, text, "chat").split(" ")
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(self.token_delay_ms / 1000)
+            yield word if index == 0 else f" {word}"
+
+def create_llm_backend(provider: str, api_key: str):
+    """Backend for the configured LLM_PROVIDER"""
+    if provider == "fake":
+        return FakeLLMBackend()
+    return EmergentBackend(api_key)
\ No newline at end of file
@@ -0,0 +1,86 @@
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+import numpy as np
+from .metrics import LLM_BREAKER_OPEN
+
+class LLMDeadlineError(TimeoutError):
+    """Raised when no provider answered within the operation's deadline"""
+
+class LLMUnavailableError(Exception):
+    """Raised when the primary model's circuit is open and there is no fallback"""
+
+class LatencyTracker:
+    """Rolling window of successful call latencies for one model"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """None until enough samples exist to trust the estimate"""
+        if len(self.samples) < self.min_samples:
+            return None
+        return float(np.percentile(self.samples, percentile))
+
+class CircuitBreaker:
+    """Stops sending traffic to a model after consecutive failures
+
+    After failure_threshold failures in a row the circuit opens and callers
+    should use the fallback. Once cooldown_seconds have passed it half-opens
+    and lets a single probe call through while the rest keep using the
+    fallback: a success closes it and a failure opens it for another
+    cooldown. A probe that never reports back (cancelled by a hedge, say)
+    is given up on after another cooldown so a new one can go out.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, cooldown_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.probe_started_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == "open" and now - self.opened_at >= self.cooldown_seconds:
+            self.state = "half_open"
+            self.probe_started_at = None
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and (self.probe_started_at is None or now - self.probe_started_at >= self.cooldown_seconds):
+            self.probe_started_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.probe_started_at = None
+        if self.state != "closed":
+            self.state = "closed"
+            LLM_BREAKER_OPEN.labels(self.name).set(0)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_started_at = None
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.opens += 1
+            LLM_BREAKER_OPEN.labels(self.name).set(1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.name,
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "probe_in_flight": self.probe_started_at is not None,
+            "retry_in_seconds": max(0.0, self.opened_at + self.cooldown_seconds - time.monotonic()) if self.state == "open" else 0.0
+        }
@@ -0,0 +1,290 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+from .metrics import LLM_QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class Priority(IntEnum):
+    """Lower values are served first when a provider is saturated"""
+    INTERACTIVE = 0
+    STANDARD = 1
+    BACKGROUND = 2
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) used for rate budgeting"""
+    return max(1, len(text or "") // 4)
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """Whether a provider error is a 429 / rate-limit response"""
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    message = str(exc).lower()
+    return "429" in message or "rate limit" in message or "rate_limit" in message
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Delay requested by the provider through Retry-After or a 'try again in Ns' message"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    match = re.search(r"try again in (?:(\d+)m)?(\d+(?:\.\d+)?)(ms|s)", str(exc))
+    if match:
+        minutes, amount, unit = match.groups()
+        seconds = float(amount) / 1000 if unit == "ms" else float(amount)
+        return seconds + int(minutes or 0) * 60
+    return None
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute, holding at most one minute's worth"""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def time_until(self, amount: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float) -> None:
+        # May go negative when a request used more than estimated; later requests repay the debt
+        if self.rate > 0:
+            self._refill()
+            self.tokens -= amount
+
+class ProviderLane:
+    """Concurrency slots, rate budgets and metrics for one provider/model
+
+    Both are handed out by priority, then arrival: only the highest-priority
+    budget waiter may spend budget, and one arriving with a higher priority
+    takes over from a waiter already sleeping on the refill.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, requests_per_minute: float, tokens_per_minute: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.cooldown_until = 0.0
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._budget_waiters: List[Tuple[int, int]] = []
+        self._budget_changed = asyncio.Condition()
+        self.completed = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def acquire(self, priority: Priority) -> None:
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        entry = (int(priority), next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed to us just as we were cancelled; pass it on
+                self.release()
+            elif entry in self._waiters:
+                # release() may already have popped and skipped our cancelled entry
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Hand the slot straight to the highest-priority waiter
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    async def wait_for_budget(self, estimated_tokens: int, priority: Priority = Priority.STANDARD) -> None:
+        entry = (int(priority), next(self._sequence))
+        async with self._budget_changed:
+            heapq.heappush(self._budget_waiters, entry)
+            self._budget_changed.notify_all()
+            try:
+                while True:
+                    # Only the head spends, so waiters don't all wake and overspend together
+                    delay = None
+                    if self._budget_waiters[0] == entry:
+                        delay = max(
+                            self.cooldown_until - time.monotonic(),
+                            self.requests.time_until(1),
+                            self.tokens.time_until(estimated_tokens)
+                        )
+                        if delay <= 0:
+                            self.requests.consume(1)
+                            self.tokens.consume(estimated_tokens)
+                            return
+                    try:
+                        # Woken early when the queue changes, e.g. a higher priority arrives
+                        await asyncio.wait_for(self._budget_changed.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._budget_waiters.remove(entry)
+                heapq.heapify(self._budget_waiters)
+                self._budget_changed.notify_all()
+
+    def refund(self, estimated_tokens: int) -> None:
+        """Give back budget taken for a call that never went out"""
+        self.requests.consume(-1)
+        self.tokens.consume(-estimated_tokens)
+
+    def record_wait(self, seconds: float) -> None:
+        LLM_QUEUE_WAIT.labels(self.name).observe(seconds)
+        self.wait_count += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lane": self.name,
+            "active": self.active,
+            "queue_depth": len(self._waiters),
+            "budget_queue_depth": len(self._budget_waiters),
+            "max_concurrency": self.max_concurrency,
+            "completed": self.completed,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "wait_avg_seconds": self.wait_total / self.wait_count if self.wait_count else 0.0,
+            "wait_max_seconds": self.wait_max,
+            "cooldown_seconds": max(0.0, self.cooldown_until - time.monotonic())
+        }
+
+class LLMScheduler:
+    """Central gate for provider calls: bounded concurrency, rate budgets and 429 backoff per provider/model
+
+    Defaults come from LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE and
+    LLM_TOKENS_PER_MINUTE; LLM_RATE_LIMITS can override them per lane with JSON
+    such as {"groq/llama-3.3-70b-versatile": {"concurrency": 4, "rpm": 30, "tpm": 6000}}.
+    A limit of 0 disables that budget. Limits are enforced per process: with
+    N workers the provider sees up to N times the configured budgets, so
+    divide the account's limits by the worker count.
+    """
+
+    def __init__(self):
+        self.max_concurrency = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+        self.requests_per_minute = float(os.environ.get("LLM_REQUESTS_PER_MINUTE", "30"))
+        self.tokens_per_minute = float(os.environ.get("LLM_TOKENS_PER_MINUTE", "12000"))
+        self.lane_overrides = json.loads(os.environ.get("LLM_RATE_LIMITS", "{}"))
+        self.max_retries = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+        self.backoff_base = float(os.environ.get("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+        self.backoff_max = float(os.environ.get("LLM_BACKOFF_MAX_SECONDS", "20"))
+        self.lanes: Dict[str, ProviderLane] = {}
+
+    def lane(self, provider: str, model: str) -> ProviderLane:
+        name = f"{provider}/{model}"
+        if name not in self.lanes:
+            override = self.lane_overrides.get(name, {})
+            self.lanes[name] = ProviderLane(
+                name,
+                max_concurrency=int(override.get("concurrency", self.max_concurrency)),
+                requests_per_minute=float(override.get("rpm", self.requests_per_minute)),
+                tokens_per_minute=float(override.get("tpm", self.tokens_per_minute))
+            )
+        return self.lanes[name]
+
+    @asynccontextmanager
+    async def reserve(
+        self,
+        provider: str,
+        model: str,
+        priority: Priority = Priority.STANDARD,
+        estimated_tokens: int = 1
+    ) -> AsyncIterator[ProviderLane]:
+        """Hold a concurrency slot and rate budget for one provider call"""
+        lane = self.lane(provider, model)
+        queued_at = time.monotonic()
+        # Budget first, so requests waiting on the rate limit don't sit on concurrency slots
+        await lane.wait_for_budget(estimated_tokens, priority)
+        try:
+            await lane.acquire(priority)
+        except BaseException:
+            lane.refund(estimated_tokens)
+            raise
+        try:
+            lane.record_wait(time.monotonic() - queued_at)
+            yield lane
+            lane.completed += 1
+        except Exception as e:
+            if is_rate_limited(e):
+                lane.rate_limited += 1
+                delay = retry_after_seconds(e)
+                if delay:
+                    # Every request on this lane waits out the provider's cooldown
+                    lane.cooldown_until = max(lane.cooldown_until, time.monotonic() + delay)
+            raise
+        finally:
+            lane.release()
+
+    async def run(
+        self,
+        provider: str,
+        model: str,
+        fn: Callable[[], Awaitable[T]],
+        priority: Priority = Priority.STANDARD,
+        estimated_tokens: int = 1
+    ) -> T:
+        """Run a provider call through the lane, retrying rate-limited attempts with jittered backoff"""
+        jitter = wait_random_exponential(multiplier=self.backoff_base, max=self.backoff_max)
+
+        def wait(retry_state) -> float:
+            requested = retry_after_seconds(retry_state.outcome.exception()) or 0.0
+            return max(requested, jitter(retry_state))
+
+        def before_sleep(retry_state) -> None:
+            self.lane(provider, model).retries += 1
+            logger.warning("Rate limited by %s/%s, retry %d", provider, model, retry_state.attempt_number)
+
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception(is_rate_limited),
+            wait=wait,
+            stop=stop_after_attempt(self.max_retries + 1),
+            before_sleep=before_sleep,
+            reraise=True
+        ):
+            with attempt:
+                async with self.reserve(provider, model, priority, estimated_tokens):
+                    return await fn()
+
+    def settle(self, provider: str, model: str, token_delta: int) -> None:
+        """Correct a lane's token budget once a call's real size is known"""
+        self.lane(provider, model).tokens.consume(token_delta)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [lane.stats() for lane in self.lanes.values()]
\ No newline at end of file
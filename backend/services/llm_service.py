@@ -1,13 +1,96 @@
 import os
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-from datetime import datetime
-from typing import Dict, List
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import uuid
+from datetime import date, datetime
+from typing import AsyncIterator, Dict, List, Optional
+from utils import get_night_focus
+from .cache import TieredCache
+from .llm_backends import create_llm_backend
+from .llm_scheduler import LLMScheduler, Priority, estimate_tokens
+from .llm_resilience import CircuitBreaker, LatencyTracker, LLMDeadlineError, LLMUnavailableError
+from .metrics import LLM_FALLBACKS, LLM_HEDGES, record_llm_tokens, track_llm
+from .model_router import ModelRouter, Target
+from .semantic_cache import SemanticCache
+from .single_flight import SingleFlight
+from .timetable_engine import BLOCKS, build_timetable, changed_blocks, covers_blocks, expand_slots, minute_label, parse_slots, render_schedule_text
+
+logger = logging.getLogger(__name__)
+
+# Expected completion sizes used to reserve token budget before a call
+CHAT_COMPLETION_TOKENS = 300
+TIMETABLE_COMPLETION_TOKENS = 1200
+TIMETABLE_NARRATIVE_TOKENS = 250
+
+# Per-operation deadlines in seconds; chat_stream bounds the wait for the first token
+DEFAULT_DEADLINES = '{"chat": 20, "chat_stream": 10}'
 
 class LLMService:
     def __init__(self):
         self.provider = os.environ.get("LLM_PROVIDER", "groq")
         self.model = os.environ.get("LLM_MODEL", "llama-3.3-70b-versatile")
         self.api_key = os.environ.get("LLM_API_KEY")
+        self.backend = create_llm_backend(self.provider, self.api_key)
+        self.timetable_cache = TieredCache(
+            "timetables",
+            max_entries=int(os.environ.get("TIMETABLE_CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=float(os.environ.get("TIMETABLE_CACHE_TTL_SECONDS", "43200")),
+            redis_url=os.environ.get("REDIS_URL")
+        )
+        self.timetable_batch_concurrency = int(os.environ.get("TIMETABLE_BATCH_CONCURRENCY", "3"))
+        # "local" lays timetables out with the slot allocator; "llm" has the model write them
+        self.timetable_engine = os.environ.get("TIMETABLE_ENGINE", "local")
+        # Rewrite only the blocks a goal/preference change touches instead of the whole day
+        self.incremental_timetables = (
+            self.timetable_engine == "llm" and os.environ.get("TIMETABLE_INCREMENTAL", "true").lower() == "true"
+        )
+        self.incremental_runs = 0
+        self.incremental_blocks = 0
+        self.single_flight = SingleFlight()
+        self.scheduler = LLMScheduler()
+        self.semantic_cache = SemanticCache()
+        self.router = ModelRouter(self.provider, self.model)
+
+        # Slow or failing primary calls are hedged to, or fail over to, the fallback model
+        fallback_model = os.environ.get("LLM_FALLBACK_MODEL")
+        self.fallback = (os.environ.get("LLM_FALLBACK_PROVIDER", self.provider), fallback_model) if fallback_model else None
+        self.deadline_seconds = float(os.environ.get("LLM_DEADLINE_SECONDS", "60"))
+        self.deadlines = json.loads(os.environ.get("LLM_DEADLINES", DEFAULT_DEADLINES))
+        self.hedge_operations = {op.strip() for op in os.environ.get("LLM_HEDGE_OPERATIONS", "chat").split(",") if op.strip()}
+        self.hedge_percentile = float(os.environ.get("LLM_HEDGE_PERCENTILE", "95"))
+        self.hedge_min_delay = float(os.environ.get("LLM_HEDGE_MIN_DELAY_MS", "500")) / 1000
+        self.hedge_max_delay = float(os.environ.get("LLM_HEDGE_MAX_DELAY_MS", "5000")) / 1000
+        self.hedge_default_delay = float(os.environ.get("LLM_HEDGE_DEFAULT_DELAY_MS", "3000")) / 1000
+        self.breaker_failures = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+        self.breaker_cooldown = float(os.environ.get("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+        self.latencies: Dict[Target, LatencyTracker] = {}
+        self.breakers: Dict[Target, CircuitBreaker] = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallback_calls = 0
+
+    async def close(self) -> None:
+        """Release connections held by the caches"""
+        await self.timetable_cache.close()
+
+    def timetable_cache_key(self, goals: List[str], preferences: str, night_focus: str, bro_name: str, date: str) -> str:
+        """Content key for a generated timetable; equivalent inputs map to the same key"""
+        normalized = {
+            "goals": sorted({" ".join(goal.split()).casefold() for goal in goals if goal.strip()}),
+            "preferences": " ".join((preferences or "").split()).casefold(),
+            "night_focus": night_focus,
+            "bro_name": (bro_name or "Bro").strip(),
+            "date": date,
+            "model": f"{self.provider}/{self.model}"
+        }
+        return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+    def timetable_input_key(self, goals: List[str], preferences: str, bro_name: str, day: date) -> str:
+        """Content key for one day's timetable, also stored on saved timetables"""
+        return self.timetable_cache_key(goals, preferences, get_night_focus(day), bro_name, day.isoformat())
 
     def get_bro_system_prompt(self, bro_name: str = "Bro") -> str:
         return f"""You are {bro_name}, a friendly and supportive productivity companion. You speak like a close friend - casual, encouraging, and genuinely caring about the user's success.
@@ -35,35 +118,324 @@ For timetables, use this structure:
 
 Always be encouraging and make them feel like they can achieve their goals."""
 
-    async def get_llm_response(self, message: str, user_id: str, bro_name: str = "Bro") -> str:
+    def deadline_for(self, operation: str) -> float:
+        return float(self.deadlines.get(operation, self.deadline_seconds))
+
+    def breaker(self, target: Target) -> CircuitBreaker:
+        """Circuit breaker of one provider/model"""
+        if target not in self.breakers:
+            self.breakers[target] = CircuitBreaker("/".join(target), self.breaker_failures, self.breaker_cooldown)
+        return self.breakers[target]
+
+    def latency(self, target: Target) -> LatencyTracker:
+        """Recent latencies of one provider/model"""
+        return self.latencies.setdefault(target, LatencyTracker())
+
+    def resilience_stats(self) -> Dict:
+        return {
+            "fallback": "/".join(self.fallback) if self.fallback else None,
+            "breakers": [breaker.stats() for breaker in self.breakers.values()],
+            "hedge_delay_seconds": {"/".join(target): self.hedge_delay(target) for target in self.latencies},
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "fallback_calls": self.fallback_calls
+        }
+
+    def hedge_delay(self, target: Target) -> float:
+        """How long to wait on a model before hedging: its recent latency percentile, clamped"""
+        observed = self.latency(target).percentile(self.hedge_percentile)
+        delay = observed if observed is not None else self.hedge_default_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, delay))
+
+    async def _call(
+        self,
+        provider: str,
+        model: str,
+        system_message: str,
+        text: str,
+        session_id: str,
+        priority: Priority,
+        completion_tokens: int,
+        operation: str
+    ) -> str:
+        """Send one prompt to one provider/model through the scheduler"""
+        prompt_tokens = estimate_tokens(system_message) + estimate_tokens(text)
+
+        async def complete() -> str:
+            # Timed inside the scheduler slot so hedge delays track the provider, not our queue
+            started = asyncio.get_running_loop().time()
+            response = await self.backend.complete(provider, model, system_message, text, session_id, operation)
+            self.latency((provider, model)).record(asyncio.get_running_loop().time() - started)
+            return response
+
+        with track_llm(provider, model, operation):
+            response = await self.scheduler.run(
+                provider,
+                model,
+                complete,
+                priority=priority,
+                estimated_tokens=prompt_tokens + completion_tokens
+            )
+        self.scheduler.settle(provider, model, estimate_tokens(response) - completion_tokens)
+        record_llm_tokens(provider, model, operation, prompt_tokens, estimate_tokens(response))
+        return response
+
+    async def _send(
+        self,
+        system_message: str,
+        text: str,
+        session_id: str,
+        priority: Priority,
+        completion_tokens: int,
+        operation: str,
+        target: Optional[Target] = None
+    ) -> str:
+        """Send one prompt within the operation's deadline, hedging or failing over to the fallback model
+
+        The model is target, or the router's pick for the operation. For hedged operations a duplicate call goes to the fallback once the
+        primary has taken longer than its recent LLM_HEDGE_PERCENTILE latency;
+        the first answer wins and the other call is cancelled. A failed primary
+        call fails over to the fallback, and while the primary's circuit is
+        open the fallback is used directly.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline_for(operation)
+        primary = target or self.router.route(operation)
+        fallback = self.fallback if self.fallback != primary else None
+        breaker = self.breaker(primary)
+        tasks: Dict[asyncio.Future, Target] = {}
+
+        def start(call_target: Target, reason: Optional[str] = None) -> None:
+            if reason:
+                self.fallback_calls += 1
+                LLM_FALLBACKS.labels(operation, reason).inc()
+            tasks[asyncio.ensure_future(
+                self._call(*call_target, system_message, text, session_id, priority, completion_tokens, operation)
+            )] = call_target
+
+        hedge_at = None
+        if breaker.allow():
+            start(primary)
+            if fallback and operation in self.hedge_operations:
+                hedge_at = loop.time() + self.hedge_delay(primary)
+        elif fallback:
+            start(fallback, "circuit_open")
+        else:
+            raise LLMUnavailableError(f"{primary[0]}/{primary[1]} is unavailable")
+
+        fallback_started = primary not in tasks.values()
+        hedged = False
+        error: Optional[BaseException] = None
         try:
-            session_id = f"brolife_{user_id}"
-            chat = LlmChat(
-                api_key=self.api_key,
-                session_id=session_id,
-                system_message=self.get_bro_system_prompt(bro_name)
-            ).with_model(self.provider, self.model)
-            
-            user_message = UserMessage(text=message)
-            response = await chat.send_message(user_message)
+            while tasks:
+                wake_at = min(hedge_at, deadline) if hedge_at else deadline
+                done, _ = await asyncio.wait(tasks, timeout=max(0.0, wake_at - loop.time()), return_when=asyncio.FIRST_COMPLETED)
+                # Successes first, so a failure finishing at the same moment can't shadow an answer
+                for task in sorted(done, key=lambda task: task.exception() is not None):
+                    finished = tasks.pop(task)
+                    if task.exception() is None:
+                        if finished == primary:
+                            breaker.record_success()
+                        if hedged:
+                            winner = "primary" if finished == primary else "fallback"
+                            LLM_HEDGES.labels(operation, winner).inc()
+                            self.hedge_wins += winner == "fallback"
+                        return task.result()
+                    error = task.exception()
+                    if finished == primary:
+                        logger.warning("%s/%s failed for %s: %s", *primary, operation, error)
+                        breaker.record_failure()
+                        if fallback and not fallback_started:
+                            start(fallback, "error")
+                            fallback_started = True
+                            hedge_at = None
+                if done:
+                    continue
+                if loop.time() >= deadline:
+                    if primary in tasks.values():
+                        breaker.record_failure()
+                    raise LLMDeadlineError(f"No {operation} completion within {self.deadline_for(operation):.0f}s")
+                # The primary is slower than usual: hedge
+                hedge_at = None
+                if not fallback_started:
+                    self.hedges += 1
+                    start(fallback)
+                    fallback_started = hedged = True
+            raise error
+        finally:
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    task.exception()
+                task.cancel()
+
+    def build_chat_prompt(self, message: str, context: str = "") -> str:
+        """Prepend the bounded conversation context to the user's message"""
+        if not context:
+            return message
+        return f"{context}\n\nCurrent message from the user:\n{message}"
+
+    def chat_usage(self, message: str, bro_name: str, context: str, response: str) -> Dict[str, int]:
+        """Estimated prompt and completion tokens for one chat turn"""
+        prompt = self.get_bro_system_prompt(bro_name) + self.build_chat_prompt(message, context)
+        return {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(response)}
+
+    def needs_context(self, message: str) -> bool:
+        """False for generic questions, which are answered without the conversation so the answer can be shared"""
+        return not (self.semantic_cache.enabled and self.semantic_cache.is_cacheable(message))
+
+    async def get_llm_response(self, message: str, user_id: str, bro_name: str = "Bro", context: str = "") -> str:
+        if not self.needs_context(message):
+            # Answered the same for everyone: from the semantic cache, or without context and then stored
+            context = ""
+        cached = self.semantic_cache.lookup(message, bro_name)
+        if cached is not None:
+            return cached
+        try:
+            # A fresh session per request: the context we pass is the only history the model sees
+            session_id = f"brolife_{user_id}_{uuid.uuid4().hex}"
+            # Routed by the single-flight leader only, so coalesced requests count as one decision
+            response = await self.single_flight.do(
+                ("chat", user_id, bro_name, message),
+                lambda: self._send(
+                    self.get_bro_system_prompt(bro_name),
+                    self.build_chat_prompt(message, context),
+                    session_id,
+                    Priority.INTERACTIVE,
+                    CHAT_COMPLETION_TOKENS,
+                    "chat",
+                    self.router.route("chat", message)
+                )
+            )
+            if not context:
+                # Answers shaped by someone's conversation are never shared
+                self.semantic_cache.store(message, response, bro_name)
             return response
         except Exception as e:
-            return f"Hey, I'm having some technical issues right now. Let me try again in a bit! Error: {str(e)}"
+            logger.error("Chat completion failed for %s: %s", user_id, e)
+            return "Hey, I'm having some technical issues right now. Let me try again in a bit!"
+
+    async def stream_llm_response(self, message: str, user_id: str, bro_name: str = "Bro", context: str = "") -> AsyncIterator[str]:
+        """Yield the bro's response token by token as the provider produces it"""
+        if not self.needs_context(message):
+            context = ""
+        cached = self.semantic_cache.lookup(message, bro_name)
+        if cached is not None:
+            for token in re.findall(r"\s*\S+", cached):
+                yield token
+            return
 
-    async def generate_timetable(self, goals: List[str], preferences: str, user_id: str, bro_name: str = "Bro") -> Dict:
+        system_message = self.get_bro_system_prompt(bro_name)
+        prompt = self.build_chat_prompt(message, context)
+        primary = self.router.route("chat_stream", message)
+        breaker = self.breaker(primary)
+        targets = ([primary] if breaker.allow() else []) + ([self.fallback] if self.fallback and self.fallback != primary else [])
+        tokens = []
         try:
-            today = datetime.now()
-            day_name = today.strftime("%A")
-            
-            # Determine night focus based on alternating schedule
-            night_focus = "Side Hustle" if day_name in ["Monday", "Wednesday", "Friday", "Sunday"] else "Health & Wellness"
-            
-            timetable_prompt = f"""Create a detailed daily timetable for today ({day_name}) from 7:30 AM to 12:30 AM.
+            if not targets:
+                raise LLMUnavailableError(f"{primary[0]}/{primary[1]} is unavailable")
+            for index, target in enumerate(targets):
+                if target != primary:
+                    self.fallback_calls += 1
+                    LLM_FALLBACKS.labels("chat_stream", "error" if index else "circuit_open").inc()
+                stream = self._stream(*target, system_message, prompt, user_id)
+                try:
+                    # Fail over only before the first token; after that the user is already reading
+                    try:
+                        first = await asyncio.wait_for(stream.__anext__(), self.deadline_for("chat_stream"))
+                    except StopAsyncIteration:
+                        break
+                    except Exception as e:
+                        if target == primary:
+                            breaker.record_failure()
+                        if index == len(targets) - 1:
+                            raise
+                        logger.warning("Streaming from %s/%s failed, failing over: %s", *target, e)
+                        continue
+                    if target == primary:
+                        breaker.record_success()
+                    tokens.append(first)
+                    yield first
+                    async for token in stream:
+                        tokens.append(token)
+                        yield token
+                    break
+                finally:
+                    await stream.aclose()
+            if not context:
+                self.semantic_cache.store(message, "".join(tokens), bro_name)
+        except Exception as e:
+            logger.error("Streamed chat completion failed for %s: %s", user_id, e)
+            yield "Hey, I'm having some technical issues right now. Let me try again in a bit!"
+
+    async def _stream(self, provider: str, model: str, system_message: str, prompt: str, user_id: str) -> AsyncIterator[str]:
+        """Stream from one provider/model; the stream holds its scheduler slot until the last token arrives"""
+        prompt_tokens = estimate_tokens(system_message) + estimate_tokens(prompt)
+        completion_tokens = 0
+        with track_llm(provider, model, "chat_stream"):
+            async with self.scheduler.reserve(provider, model, Priority.INTERACTIVE, prompt_tokens + CHAT_COMPLETION_TOKENS):
+                async for token in self.backend.stream(provider, model, system_message, prompt, user_id):
+                    completion_tokens += estimate_tokens(token)
+                    yield token
+        record_llm_tokens(provider, model, "chat_stream", prompt_tokens, completion_tokens)
+
+    async def generate_timetable(
+        self,
+        goals: List[str],
+        preferences: str,
+        user_id: str,
+        bro_name: str = "Bro",
+        force_refresh: bool = False,
+        day: Optional[date] = None,
+        priority: Priority = Priority.STANDARD,
+        previous: Optional[Dict] = None
+    ) -> Dict:
+        """Build a day's timetable locally, or with the LLM when TIMETABLE_ENGINE=llm
+
+        previous is the stored timetable for the same day; when it records the
+        inputs it was built from, only the blocks the new inputs change are
+        rewritten and merged into it.
+        """
+        today = date.today()
+        day = day or today
+        schedule = {
+            **build_timetable(goals, preferences, day),
+            "source": "engine",
+            "generated_at": datetime.utcnow().isoformat()
+        }
+        if self.timetable_engine != "llm":
+            return schedule
+
+        try:
+            day_name = schedule["day"]
+            day_label = "today" if day == today else day.strftime("%A, %B %d")
+            night_focus = schedule["night_focus"]
+
+            cache_key = self.timetable_input_key(goals, preferences, bro_name, day)
+            if not force_refresh:
+                cached = await self.timetable_cache.get(cache_key)
+                if cached is not None:
+                    return {**cached, "cached": True}
+
+            if self.incremental_timetables and not force_refresh and previous and previous.get("date") == schedule["date"]:
+                blocks = changed_blocks(
+                    previous.get("slots", []),
+                    previous.get("goals", []),
+                    previous.get("preferences", ""),
+                    goals,
+                    preferences,
+                    day
+                )
+                if previous.get("goals") and len(blocks) < len(BLOCKS):
+                    schedule = await self._regenerate_blocks(schedule, previous, blocks, goals, preferences, user_id, bro_name, day_label, priority)
+                    await self.timetable_cache.set(cache_key, schedule)
+                    return schedule
+
+            timetable_prompt = f"""Create a detailed daily timetable for {day_label} ({day_name}) from 7:30 AM to 12:30 AM.
 
 User's goals: {', '.join(goals)}
 Additional preferences: {preferences}
 
-Night focus for today: {night_focus}
+Night focus for {day_label}: {night_focus}
 
 Structure it like this and be specific with activities:
 - 7:30-12:00 (Morning): Focused work blocks aligned with their goals
@@ -73,24 +445,151 @@ Structure it like this and be specific with activities:
 
 Make it practical and achievable. Include breaks and be specific about what they should work on during each time slot. Respond in a friendly, encouraging way as their bro."""
 
-            session_id = f"timetable_{user_id}"
-            chat = LlmChat(
-                api_key=self.api_key,
-                session_id=session_id,
-                system_message=self.get_bro_system_prompt(bro_name)
-            ).with_model(self.provider, self.model)
+            session_id = f"timetable_{user_id}_{uuid.uuid4().hex}"
+            response = await self.single_flight.do(
+                ("timetable", cache_key),
+                lambda: self._send(
+                    self.get_bro_system_prompt(bro_name),
+                    timetable_prompt,
+                    session_id,
+                    priority,
+                    TIMETABLE_COMPLETION_TOKENS,
+                    "timetable"
+                )
+            )
             
-            user_message = UserMessage(text=timetable_prompt)
-            response = await chat.send_message(user_message)
-            
-            return {
-                "date": today.strftime("%Y-%m-%d"),
-                "day": day_name,
-                "night_focus": night_focus,
-                "schedule_text": response,
-                "generated_at": datetime.utcnow().isoformat()
-            }
+            # Keep the model's own slots when they cover the whole day, else the local layout
+            parsed = parse_slots(response, goals)
+            slots = parsed if covers_blocks(parsed) else schedule["slots"]
+            schedule = {**schedule, "slots": slots, "schedule_text": response, "source": "llm"}
+            await self.timetable_cache.set(cache_key, schedule)
+            return schedule
         except Exception as e:
-            return {
-                "error": f"Couldn't generate your timetable right now, bro. Technical issue: {str(e)}"
-            }
\ No newline at end of file
+            # The locally built timetable keeps the app working while the provider is down
+            logger.warning("LLM timetable failed for %s, serving the local schedule: %s", user_id, e)
+            return schedule
+
+    async def _regenerate_blocks(
+        self,
+        schedule: Dict,
+        previous: Dict,
+        blocks: List[str],
+        goals: List[str],
+        preferences: str,
+        user_id: str,
+        bro_name: str,
+        day_label: str,
+        priority: Priority
+    ) -> Dict:
+        """Rewrite only the given day blocks with the LLM and merge them into the previous timetable"""
+        kept = [item for item in expand_slots(previous.get("slots", [])) if item["block"] not in blocks]
+        regenerated = []
+        if blocks:
+            windows = "\n".join(
+                f"- {minute_label(start)}-{minute_label(end)} ({name})" for name, _, start, end in BLOCKS if name in blocks
+            )
+            unchanged = "\n".join(f"- {item['start']}-{item['end']}: {item['activity']}" for item in kept)
+            prompt = f"""Your friend changed their goals or preferences, so rewrite part of their timetable for {day_label} ({schedule['day']}).
+
+User's goals: {', '.join(goals)}
+Additional preferences: {preferences}
+
+Night focus for {day_label}: {schedule['night_focus']}
+
+Rewrite only these blocks:
+{windows}
+
+The rest of the day stays exactly as planned:
+{unchanged}
+
+List every slot of the rewritten blocks on its own line as "H:MM-H:MM: activity", including breaks, and be specific about what they should work on."""
+
+            response = await self.single_flight.do(
+                ("timetable_blocks", previous.get("timetable_id"), tuple(goals), preferences, tuple(blocks)),
+                lambda: self._send(
+                    self.get_bro_system_prompt(bro_name),
+                    prompt,
+                    f"timetable_{user_id}_{uuid.uuid4().hex}",
+                    priority,
+                    TIMETABLE_COMPLETION_TOKENS * len(blocks) // len(BLOCKS),
+                    "timetable_blocks"
+                )
+            )
+            parsed = [item for item in parse_slots(response, goals) if item["block"] in blocks]
+            for name in blocks:
+                # A block the model skipped or only partly covered gets the local layout for the new inputs
+                block_slots = [item for item in parsed if item["block"] == name]
+                if not covers_blocks(block_slots, [name]):
+                    block_slots = [item for item in schedule["slots"] if item["block"] == name]
+                regenerated += block_slots
+            self.incremental_runs += 1
+            self.incremental_blocks += len(blocks)
+
+        slots = sorted(kept + regenerated, key=lambda item: item["start_minute"])
+        text = previous.get("schedule_text") if not blocks else None
+        return {
+            **schedule,
+            "slots": slots,
+            "schedule_text": text or render_schedule_text(slots, schedule["night_focus"], day_label),
+            "source": "llm",
+            "regenerated_blocks": blocks
+        }
+
+    async def write_timetable_narrative(self, schedule: Dict, goals: List[str], user_id: str, bro_name: str = "Bro") -> str:
+        """Encouraging note on a locally built timetable, written at background priority"""
+        prompt = f"""Your friend's timetable for {schedule['day']} is already planned:
+
+{schedule['schedule_text']}
+
+Their goals: {', '.join(goals) or 'not set yet'}
+
+Write a short, encouraging note about this plan in at most 120 words. Hype up the main focus sessions and tonight's {schedule['night_focus']} block and give one practical tip. Don't repeat the timetable or change any times."""
+        return await self._send(
+            self.get_bro_system_prompt(bro_name),
+            prompt,
+            f"narrative_{user_id}_{uuid.uuid4().hex}",
+            Priority.BACKGROUND,
+            TIMETABLE_NARRATIVE_TOKENS,
+            "timetable_narrative"
+        )
+
+    async def generate_timetables(
+        self,
+        goals: List[str],
+        preferences: str,
+        user_id: str,
+        days: List[date],
+        bro_name: str = "Bro",
+        force_refresh: bool = False
+    ) -> List[Dict]:
+        """Generate timetables for several days concurrently, one result per day in order"""
+        semaphore = asyncio.Semaphore(self.timetable_batch_concurrency)
+
+        async def generate_day(day: date) -> Dict:
+            async with semaphore:
+                try:
+                    return await self.generate_timetable(goals, preferences, user_id, bro_name, force_refresh, day=day)
+                except Exception as e:
+                    return {"error": f"Couldn't generate your timetable right now, bro. Technical issue: {str(e)}"}
+
+        return await asyncio.gather(*(generate_day(day) for day in days))
+
+    async def summarize_conversation(self, previous_summary: str, transcript: str, user_id: str, max_tokens: int = 300) -> str:
+        """Fold older chat turns into a user's rolling conversation summary"""
+        prompt = f"""Update the running summary of a productivity coaching conversation.
+
+Current summary:
+{previous_summary or "(none yet)"}
+
+New conversation turns:
+{transcript}
+
+Write an updated summary of at most {max_tokens * 3 // 4} words. Keep the user's goals, commitments, progress, struggles and preferences; drop small talk. Reply with the summary only."""
+        return await self._send(
+            "You summarize conversations accurately and concisely.",
+            prompt,
+            f"summary_{user_id}_{uuid.uuid4().hex}",
+            Priority.BACKGROUND,
+            max_tokens,
+            "summary"
+        )
\ No newline at end of file
@@ -0,0 +1,150 @@
+import asyncio
+import functools
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "brolife_http_request_duration_seconds",
+    "Time to produce an HTTP response, by route template",
+    ["method", "route"]
+)
+HTTP_REQUESTS = Counter(
+    "brolife_http_requests_total",
+    "HTTP responses by route template and status code",
+    ["method", "route", "status"]
+)
+DB_OPERATION_DURATION = Histogram(
+    "brolife_db_operation_duration_seconds",
+    "Time spent in DatabaseService operations",
+    ["operation"]
+)
+DB_OPERATION_ERRORS = Counter(
+    "brolife_db_operation_errors_total",
+    "DatabaseService operations that raised",
+    ["operation"]
+)
+DB_WRITE_BEHIND_FAILURES = Counter(
+    "brolife_db_write_behind_failures_total",
+    "Documents whose batched insert failed, by whether they were requeued or dropped",
+    ["collection", "outcome"]
+)
+LLM_REQUEST_DURATION = Histogram(
+    "brolife_llm_request_duration_seconds",
+    "Provider call latency, including scheduler wait and retries",
+    ["provider", "model", "operation"],
+    buckets=LLM_BUCKETS
+)
+LLM_REQUEST_ERRORS = Counter(
+    "brolife_llm_request_errors_total",
+    "Provider calls that failed",
+    ["provider", "model", "operation"]
+)
+LLM_TOKENS = Counter(
+    "brolife_llm_tokens_total",
+    "Estimated prompt (in) and completion (out) tokens",
+    ["provider", "model", "operation", "direction"]
+)
+LLM_IN_FLIGHT = Gauge(
+    "brolife_llm_in_flight_requests",
+    "Provider calls currently waiting or running",
+    ["provider", "model", "operation"],
+    multiprocess_mode="livesum"
+)
+LLM_QUEUE_WAIT = Histogram(
+    "brolife_llm_queue_wait_seconds",
+    "Time a provider call waited for a scheduler slot and rate budget",
+    ["lane"],
+    buckets=LLM_BUCKETS
+)
+LLM_HEDGES = Counter(
+    "brolife_llm_hedged_requests_total",
+    "Duplicate calls sent to the fallback model because the primary was slow, by which answered first",
+    ["operation", "winner"]
+)
+LLM_FALLBACKS = Counter(
+    "brolife_llm_fallbacks_total",
+    "Calls served by the fallback model instead of the primary, by reason",
+    ["operation", "reason"]
+)
+LLM_ROUTE_DECISIONS = Counter(
+    "brolife_llm_route_decisions_total",
+    "Model tier picked for each LLM call by the router, by reason",
+    ["operation", "tier", "reason"]
+)
+LLM_BREAKER_OPEN = Gauge(
+    "brolife_llm_circuit_open",
+    "1 while a model's circuit breaker is open",
+    ["model"],
+    multiprocess_mode="livemax"
+)
+SEMANTIC_CACHE_LOOKUPS = Counter(
+    "brolife_semantic_cache_lookups_total",
+    "Chat semantic cache lookups by result: hit, miss, or skip for personal messages",
+    ["result"]
+)
+SEMANTIC_CACHE_SIMILARITY = Histogram(
+    "brolife_semantic_cache_best_similarity",
+    "Cosine similarity of the closest cached question per lookup",
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 1)
+)
+EVENT_LOOP_LAG = Histogram(
+    "brolife_event_loop_lag_seconds",
+    "How late the event loop ran a periodic wake-up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+def track_db(operation: str) -> Callable:
+    """Time a DatabaseService coroutine and count its failures"""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                DB_OPERATION_ERRORS.labels(operation).inc()
+                raise
+            finally:
+                DB_OPERATION_DURATION.labels(operation).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+@contextmanager
+def track_llm(provider: str, model: str, operation: str) -> Iterator[None]:
+    """Time one provider call and keep the in-flight gauge current"""
+    in_flight = LLM_IN_FLIGHT.labels(provider, model, operation)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        LLM_REQUEST_ERRORS.labels(provider, model, operation).inc()
+        raise
+    finally:
+        in_flight.dec()
+        LLM_REQUEST_DURATION.labels(provider, model, operation).observe(time.perf_counter() - started)
+
+def record_llm_tokens(provider: str, model: str, operation: str, prompt_tokens: int, completion_tokens: int) -> None:
+    LLM_TOKENS.labels(provider, model, operation, "in").inc(prompt_tokens)
+    LLM_TOKENS.labels(provider, model, operation, "out").inc(completion_tokens)
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Record how far behind schedule the event loop wakes us; run as a background task"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+def render_metrics() -> tuple:
+    """Exposition body and content type, aggregating workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
\ No newline at end of file
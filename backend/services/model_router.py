@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import re
+from typing import Dict, Tuple
+from .metrics import LLM_ROUTE_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+# Operation -> "small", "large", or "auto" to classify each request
+DEFAULT_ROUTES = {
+    "chat": "auto",
+    "chat_stream": "auto",
+    "summary": "large",
+    "timetable": "large",
+    "timetable_blocks": "large",
+    "timetable_narrative": "small"
+}
+
+# Greetings, thanks and acknowledgements that need no reasoning
+SMALL_TALK = re.compile(
+    r"^(?:(?:hi|hey|hello|yo|sup|gm|gn|good (?:morning|night|evening)|thanks?|thank you|thx|ty|ok(?:ay)?|cool|nice|great|"
+    r"awesome|lol|haha|got it|will do|done|yes|yep|yeah|no|nope|bye|see ya|later)\s*)+(?:bro|man|dude|buddy)?$"
+)
+# Requests that want planning or reasoning, whatever their length
+COMPLEX_MARKERS = re.compile(
+    r"\b(?:plan|planning|schedule|timetable|routine|strategy|explain|why|compare|step by step|break (?:it )?down|"
+    r"week|month|budget|diet|program|analy[sz]e|review|prioriti[sz]e)\b"
+)
+
+Target = Tuple[str, str]
+
+class ModelRouter:
+    """Picks the provider/model for each LLM call from a routing table
+
+    LLM_ROUTES maps an operation to "small", "large" or "auto" (overriding
+    DEFAULT_ROUTES). "auto" sends small talk and short messages without
+    planning or reasoning markers (at most LLM_ROUTE_SIMPLE_MAX_WORDS words)
+    to the small model and everything else to the large one. The large model
+    is LLM_MODEL and the small one LLM_SMALL_MODEL; without a small model
+    every call stays on LLM_MODEL. Each decision is logged and counted so
+    answer quality can be compared against latency per tier.
+    """
+
+    def __init__(self, provider: str, model: str):
+        small_model = os.environ.get("LLM_SMALL_MODEL")
+        self.tiers: Dict[str, Target] = {"large": (provider, model)}
+        if small_model:
+            self.tiers["small"] = (os.environ.get("LLM_SMALL_PROVIDER", provider), small_model)
+        self.routes = {**DEFAULT_ROUTES, **json.loads(os.environ.get("LLM_ROUTES", "{}"))}
+        self.simple_max_words = int(os.environ.get("LLM_ROUTE_SIMPLE_MAX_WORDS", "20"))
+        self.decisions: Dict[str, int] = {}
+
+    def classify(self, message: str) -> Tuple[str, str]:
+        """Tier for a chat message and the reason it was picked"""
+        text = " ".join(re.findall(r"[a-z']+", message.casefold()))
+        if SMALL_TALK.match(text):
+            return "small", "small_talk"
+        if COMPLEX_MARKERS.search(text):
+            return "large", "complex"
+        if len(text.split()) > self.simple_max_words or message.count("?") > 1:
+            return "large", "long"
+        return "small", "short"
+
+    def route(self, operation: str, message: str = "") -> Target:
+        rule = self.routes.get(operation, "large")
+        tier, reason = self.classify(message) if rule == "auto" else (rule, "table")
+        if tier not in self.tiers:
+            tier, reason = "large", f"{reason}_no_{tier}_model"
+        provider, model = self.tiers[tier]
+
+        key = f"{operation}:{tier}:{reason}"
+        self.decisions[key] = self.decisions.get(key, 0) + 1
+        LLM_ROUTE_DECISIONS.labels(operation, tier, reason).inc()
+        logger.info("LLM route operation=%s tier=%s reason=%s model=%s/%s words=%d", operation, tier, reason, provider, model, len(message.split()))
+        return provider, model
+
+    def stats(self) -> Dict:
+        return {
+            "tiers": {tier: "/".join(target) for tier, target in self.tiers.items()},
+            "routes": self.routes,
+            "decisions": self.decisions
+        }
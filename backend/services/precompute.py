@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional
+from models import Timetable
+from .database_service import DatabaseService
+from .llm_scheduler import Priority
+from .llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_JOB = "tomorrow_timetables"
+
+def parse_clock(value: str) -> time:
+    hours, _, minutes = value.partition(":")
+    return time(int(hours), int(minutes or 0))
+
+class TimetablePrecomputer:
+    """Generates tomorrow's timetables for active users during an off-peak window
+
+    Users are walked in user_id order at most PRECOMPUTE_RATE_PER_MINUTE at a
+    time, with LLM calls at background priority. Progress is checkpointed
+    after every user, so a restart resumes where the last run stopped. A user
+    is active if they generated a timetable within PRECOMPUTE_ACTIVE_DAYS.
+    """
+
+    def __init__(self, db_service: DatabaseService, llm_service: LLMService):
+        self.db_service = db_service
+        self.llm_service = llm_service
+        self.window_start = parse_clock(os.environ.get("PRECOMPUTE_WINDOW_START", "01:00"))
+        self.window_end = parse_clock(os.environ.get("PRECOMPUTE_WINDOW_END", "06:00"))
+        self.rate_per_minute = float(os.environ.get("PRECOMPUTE_RATE_PER_MINUTE", "20"))
+        self.active_days = int(os.environ.get("PRECOMPUTE_ACTIVE_DAYS", "14"))
+        self.batch_size = int(os.environ.get("PRECOMPUTE_BATCH_SIZE", "100"))
+        self.poll_seconds = float(os.environ.get("PRECOMPUTE_POLL_SECONDS", "300"))
+
+    def in_window(self, now: Optional[datetime] = None) -> bool:
+        """Whether the local clock is inside the off-peak window (which may wrap midnight)"""
+        current = (now or datetime.now()).time()
+        if self.window_start <= self.window_end:
+            return self.window_start <= current < self.window_end
+        return current >= self.window_start or current < self.window_end
+
+    async def run_forever(self) -> None:
+        """Run a pass whenever the off-peak window is open; started from the app lifespan"""
+        while True:
+            try:
+                if self.in_window():
+                    await self.run_once(date.today() + timedelta(days=1), stop_outside_window=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Timetable precompute pass failed: %s", e)
+            await asyncio.sleep(self.poll_seconds)
+
+    async def run_once(self, target: date, stop_outside_window: bool = False) -> Dict:
+        """Precompute target's timetables for every active user not yet done"""
+        checkpoint = await self.db_service.get_precompute_checkpoint(CHECKPOINT_JOB) or {}
+        if checkpoint.get("target_date") != target.isoformat():
+            checkpoint = {"target_date": target.isoformat(), "last_user_id": None, "completed": False, "generated": 0, "skipped": 0, "failed": 0}
+        if checkpoint["completed"]:
+            return checkpoint
+
+        interval = 60 / self.rate_per_minute if self.rate_per_minute > 0 else 0
+        active_since = datetime.utcnow() - timedelta(days=self.active_days)
+        while True:
+            users = await self.db_service.get_users_after(checkpoint["last_user_id"], self.batch_size)
+            if not users:
+                checkpoint["completed"] = True
+                break
+            for user in users:
+                if stop_outside_window and not self.in_window():
+                    await self.db_service.save_precompute_checkpoint(CHECKPOINT_JOB, checkpoint)
+                    return checkpoint
+
+                try:
+                    outcome = await self.precompute_user(user, target, active_since)
+                except Exception as e:
+                    logger.warning("Timetable precompute failed for %s: %s", user["user_id"], e)
+                    outcome = "failed"
+                checkpoint[outcome] += 1
+                checkpoint["last_user_id"] = user["user_id"]
+                await self.db_service.save_precompute_checkpoint(CHECKPOINT_JOB, checkpoint)
+                if outcome != "skipped":
+                    await asyncio.sleep(interval)
+
+        await self.db_service.save_precompute_checkpoint(CHECKPOINT_JOB, checkpoint)
+        logger.info("Precomputed timetables for %s: %s", target, checkpoint)
+        return checkpoint
+
+    async def precompute_user(self, user: Dict, target: date, active_since: datetime) -> str:
+        """Generate and store one user's timetable; returns generated, skipped or failed"""
+        user_id = user["user_id"]
+        last_timetable = await self.db_service.get_latest_timetable_time(user_id)
+        if last_timetable is None or last_timetable < active_since:
+            return "skipped"
+
+        bro_name = user.get("bro_name") or "Bro"
+        preferences = user.get("preferences") or ""
+        input_key = self.llm_service.timetable_input_key(user["goals"], preferences, bro_name, target)
+        if await self.db_service.get_precomputed_timetable(user_id, target.isoformat(), input_key):
+            return "skipped"
+
+        schedule = await self.llm_service.generate_timetable(
+            user["goals"],
+            preferences,
+            user_id,
+            bro_name,
+            day=target,
+            priority=Priority.BACKGROUND
+        )
+        schedule = {**schedule, "precomputed": True}
+        schedule.pop("cached", None)
+        narrative = None
+        if schedule.get("source") == "engine":
+            # Off-peak is the cheap time to write the narrative, so it's ready by morning
+            try:
+                narrative = await self.llm_service.write_timetable_narrative(schedule, user["goals"], user_id, bro_name)
+            except Exception as e:
+                logger.warning("Timetable narrative precompute failed for %s: %s", user_id, e)
+        timetable = Timetable.from_schedule(
+            user_id,
+            schedule,
+            input_key=input_key,
+            goals=user["goals"],
+            preferences=preferences,
+            precomputed=True,
+            narrative=narrative
+        )
+        await self.db_service.save_timetables([timetable.model_dump()])
+        return "generated"
+
+    async def stats(self) -> Dict:
+        """Checkpoint of the current or most recent precompute pass"""
+        checkpoint = await self.db_service.get_precompute_checkpoint(CHECKPOINT_JOB)
+        return {
+            "window": f"{self.window_start.strftime('%H:%M')}-{self.window_end.strftime('%H:%M')}",
+            "rate_per_minute": self.rate_per_minute,
+            "in_window": self.in_window(),
+            "checkpoint": checkpoint
+        }
+
+async def run(target: date) -> int:
+    db_service = DatabaseService()
+    llm_service = LLMService()
+    try:
+        checkpoint = await TimetablePrecomputer(db_service, llm_service).run_once(target)
+        print(checkpoint)
+        return 0 if checkpoint["failed"] == 0 else 1
+    finally:
+        await llm_service.close()
+        await db_service.close()
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Precompute timetables for active Brolife users")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today() + timedelta(days=1), help="day to generate (default tomorrow)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.date)))
@@ -0,0 +1,130 @@
+import os
+import re
+import time
+import numpy as np
+from typing import Any, Dict, List, Optional
+from .embeddings import embed, normalize_message
+from .metrics import SEMANTIC_CACHE_LOOKUPS, SEMANTIC_CACHE_SIMILARITY
+
+# Messages that refer to the user's own situation or the conversation so far
+PERSONAL_MARKERS = re.compile(
+    r"\d|\b(my|mine|i'm|im|i've|i was|we|our|yesterday|today|tonight|tomorrow|earlier|last time|you said|remember)\b"
+)
+# Openers and pronouns that lean on earlier turns ("and what about...", "explain that again")
+FOLLOW_UP_MARKERS = re.compile(
+    r"^(and|but|so|also|then|ok|okay|what about|how about|what if)\b|\b(it|its|that|this|these|those|them|they|again|instead|else|same|above)\b"
+)
+# Stands in for the bro name inside stored answers
+BRO_NAME_TOKEN = "\x00bro_name\x00"
+
+class SemanticCache:
+    """Reuses chat answers for questions that mean the same as a recent one
+
+    Messages are embedded locally and compared by cosine similarity against a
+    fixed-size matrix of recent questions in one vectorized top-1 lookup; at
+    SEMANTIC_CACHE_THRESHOLD or above the stored answer is returned with the
+    asking user's bro name swapped in. Only generic questions take part (no
+    personal markers, no follow-up references, at most SEMANTIC_CACHE_MAX_WORDS
+    words). Whether a message takes part depends on the message alone: generic
+    ones are answered without conversation context, whoever asks, so a stored
+    answer carries nothing from one user's history to another, while
+    follow-ups always go to the model with their context. Entries expire after
+    SEMANTIC_CACHE_TTL_SECONDS; when full, SEMANTIC_CACHE_EVICTION picks the
+    least recently used ("lru") or oldest ("fifo") entry to replace.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        self.threshold = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+        self.max_entries = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+        self.ttl_seconds = float(os.environ.get("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+        self.eviction = os.environ.get("SEMANTIC_CACHE_EVICTION", "lru")
+        self.dimensions = int(os.environ.get("SEMANTIC_CACHE_DIMENSIONS", "1024"))
+        self.max_words = int(os.environ.get("SEMANTIC_CACHE_MAX_WORDS", "30"))
+        self.vectors = np.zeros((self.max_entries, self.dimensions), dtype=np.float32)
+        self.expires_at = np.zeros(self.max_entries)
+        self.inserted_at = np.zeros(self.max_entries)
+        self.last_used = np.zeros(self.max_entries)
+        self.answers: List[Optional[str]] = [None] * self.max_entries
+        self.questions: List[Optional[str]] = [None] * self.max_entries
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def is_cacheable(self, message: str) -> bool:
+        """Whether a message is generic enough to share an answer with other users"""
+        text = normalize_message(message)
+        return (
+            bool(text)
+            and len(text.split()) <= self.max_words
+            and not PERSONAL_MARKERS.search(text)
+            and not FOLLOW_UP_MARKERS.search(text)
+        )
+
+    def lookup(self, message: str, bro_name: str = "Bro") -> Optional[str]:
+        """Cached answer for a question similar enough to message, personalized for bro_name"""
+        if not self.enabled or not self.is_cacheable(message):
+            self.skipped += 1
+            SEMANTIC_CACHE_LOOKUPS.labels("skip").inc()
+            return None
+
+        now = time.time()
+        similarities = self.vectors @ embed(normalize_message(message), self.dimensions)
+        similarities[self.expires_at <= now] = -1.0
+        index = int(np.argmax(similarities))
+        similarity = float(similarities[index])
+        if similarity >= 0:
+            SEMANTIC_CACHE_SIMILARITY.observe(similarity)
+        if similarity < self.threshold:
+            self.misses += 1
+            SEMANTIC_CACHE_LOOKUPS.labels("miss").inc()
+            return None
+
+        self.hits += 1
+        self.last_used[index] = now
+        SEMANTIC_CACHE_LOOKUPS.labels("hit").inc()
+        return self.answers[index].replace(BRO_NAME_TOKEN, bro_name)
+
+    def store(self, message: str, answer: str, bro_name: str = "Bro") -> bool:
+        """Remember an answer written without conversation context; False if the message is not generic"""
+        if not self.enabled or not answer or not self.is_cacheable(message):
+            return False
+
+        now = time.time()
+        vector = embed(normalize_message(message), self.dimensions)
+        live = self.expires_at > now
+        duplicates = np.flatnonzero(live & (self.vectors @ vector >= 0.999))
+        if duplicates.size:
+            index = int(duplicates[0])
+        elif not live.all():
+            index = int(np.argmin(live))
+        else:
+            index = int(np.argmin(self.last_used if self.eviction == "lru" else self.inserted_at))
+            self.evictions += 1
+
+        self.vectors[index] = vector
+        self.expires_at[index] = now + self.ttl_seconds
+        self.inserted_at[index] = now
+        self.last_used[index] = now
+        self.questions[index] = message
+        self.answers[index] = re.sub(rf"\b{re.escape(bro_name)}\b", BRO_NAME_TOKEN, answer) if bro_name else answer
+        self.stores += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": int((self.expires_at > time.time()).sum()),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "eviction": self.eviction
+        }
@@ -0,0 +1,306 @@
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from utils import get_night_focus
+
+# Day blocks as (name, emoji, start minute, end minute); the night block runs past midnight
+BLOCKS = [
+    ("Morning", "🌅", 7 * 60 + 30, 12 * 60),
+    ("Afternoon", "☀️", 12 * 60, 17 * 60),
+    ("Evening", "🌆", 17 * 60, 21 * 60),
+    ("Night", "🌙", 21 * 60, 24 * 60 + 30)
+]
+
+# Fixed anchors every schedule is built around: (start, end, category, activity)
+ANCHORS = [
+    (7 * 60 + 30, 8 * 60, "planning", "Breakfast and plan the day"),
+    (12 * 60 + 30, 13 * 60 + 30, "meal", "Lunch break"),
+    (18 * 60 + 30, 19 * 60 + 30, "meal", "Dinner"),
+    (23 * 60 + 30, 24 * 60 + 30, "wind_down", "Wind down and sleep prep")
+]
+
+BLOCK_RANGES = {name: (start, end) for name, _, start, end in BLOCKS}
+
+# Minutes before the 7:30 start belong to the tail of the night block, after midnight
+DAY_START = 7 * 60 + 30
+
+# Share of every block an LLM-written timetable's parsed slots must cover to replace the local layout
+MIN_BLOCK_COVERAGE = 0.75
+
+# Keyword rules for categorizing free-text activities, checked in order
+CATEGORY_KEYWORDS = [
+    ("break", ("break", "rest", "recharge")),
+    ("meal", ("breakfast", "lunch", "dinner", "meal", "snack")),
+    ("wind_down", ("wind down", "sleep", "bed")),
+    ("night_focus", ("side hustle", "health & wellness")),
+    ("exercise", ("workout", "gym", "exercise", "walk", "run", "yoga", "stretch", "training")),
+    ("admin", ("admin", "email", "errand", "chores")),
+    ("planning", ("plan", "review", "journal")),
+    ("focus", ("deep work", "focus", "study", "learn", "work on", "session", "practice"))
+]
+
+# "**Morning (7:30-12:00)**", "🌙 Night: Side Hustle" and similar block headings
+BLOCK_HEADING = re.compile(r"^[\W_]*(morning|afternoon|evening|night)\b", re.IGNORECASE)
+
+SLOT_LINE = re.compile(
+    r"^[\s*\-•]*(?:\d+[.)]\s+)?(\d{1,2}):(\d{2})\s*([AaPp][Mm])?\s*[-–]\s*(\d{1,2}):(\d{2})\s*([AaPp][Mm])?\s*[:)\-–]*\s*(.+)$"
+)
+
+FITNESS_WORDS = {"fit", "fitness", "gym", "workout", "exercise", "run", "running", "lift", "health", "healthy", "weight", "yoga"}
+# Too generic to tie an activity to a goal
+COMMON_WORDS = {"a", "an", "and", "at", "for", "get", "in", "more", "my", "of", "on", "the", "to", "with", "work", "your"}
+SIDE_HUSTLE_WORDS = {"startup", "business", "side", "hustle", "project", "freelance", "app", "build", "ship", "launch", "blog", "channel"}
+
+def minute_label(minute: int) -> str:
+    """Minutes since midnight as H:MM, wrapping past midnight"""
+    return f"{(minute // 60) % 24}:{minute % 60:02d}"
+
+def day_minute(hours: int, minutes: int, meridiem: Optional[str] = None) -> int:
+    """Clock time as minutes on the 7:30-00:30 day timeline, so 0:30 is 1470"""
+    if meridiem:
+        hours = hours % 12 + (12 if meridiem.lower() == "pm" else 0)
+    minute = hours * 60 + minutes
+    return minute + 24 * 60 if minute < DAY_START else minute
+
+def clock_candidates(hours: int, minutes: int, meridiem: Optional[str] = None) -> List[int]:
+    """Day-timeline minutes a clock time may mean: both halves of the day for 1-12 without AM/PM"""
+    if meridiem or not 1 <= hours <= 12:
+        return [day_minute(hours, minutes, meridiem)]
+    other = hours + 12 if hours < 12 else 0
+    return sorted({day_minute(hours, minutes), day_minute(other, minutes)})
+
+def parse_clock_minute(value: str) -> int:
+    """Parse H:MM into a day-timeline minute"""
+    match = re.fullmatch(r"\s*(\d{1,2}):(\d{2})\s*([AaPp][Mm])?\s*", value)
+    if not match:
+        raise ValueError(f"Invalid time: {value}")
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"Invalid time: {value}")
+    return day_minute(hours, minutes, match.group(3))
+
+def goal_words(goal: str) -> set:
+    return set(re.findall(r"[a-z]+", goal.casefold()))
+
+def match_goal(goals: List[str], words: set) -> Optional[str]:
+    """First goal mentioning any of the given words"""
+    return next((goal for goal in goals if goal_words(goal) & words), None)
+
+def session_lengths(preferences: str) -> Tuple[int, int]:
+    """Focus session and break length in minutes implied by the preferences"""
+    text = preferences.casefold()
+    if "pomodoro" in text or "short" in text:
+        return 50, 10
+    if "long" in text or "deep" in text:
+        return 120, 15
+    return 90, 15
+
+def peak_block(preferences: str) -> str:
+    """Block that gets the top-priority goal: Morning unless the user prefers later hours"""
+    text = preferences.casefold()
+    if any(word in text for word in ("night owl", "evening", "late", "afternoon")):
+        return "Afternoon"
+    return "Morning"
+
+def slot(start: int, end: int, block: str, category: str, activity: str, goal: Optional[str] = None) -> Dict:
+    return {
+        "start": minute_label(start),
+        "end": minute_label(end),
+        "start_minute": start,
+        "end_minute": end,
+        "block": block,
+        "category": category,
+        "activity": activity,
+        "goal": goal
+    }
+
+def block_of(minute: int) -> str:
+    return next((name for name, _, start, end in BLOCKS if start <= minute < end), "Night")
+
+def fill_focus(start: int, end: int, goals: List[str], focus: int, rest: int) -> List[Dict]:
+    """Alternate focus sessions and breaks across a free window, cycling through the goals"""
+    slots = []
+    cursor = start
+    index = 0
+    while end - cursor >= min(focus, 30):
+        session_end = min(cursor + focus, end)
+        goal = goals[index % len(goals)] if goals else None
+        activity = f"Focused work on {goal}" if goal else "Focused work on your priorities"
+        slots.append(slot(cursor, session_end, block_of(cursor), "focus", activity, goal))
+        index += 1
+        cursor = session_end
+        if end - cursor >= rest + 30:
+            slots.append(slot(cursor, cursor + rest, block_of(cursor), "break", "Break"))
+            cursor += rest
+    if cursor < end:
+        slots.append(slot(cursor, end, block_of(cursor), "buffer", "Buffer and catch-up"))
+    return slots
+
+def categorize(activity: str) -> str:
+    """Best-effort slot category for a free-text activity"""
+    text = activity.casefold()
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(re.search(rf"\b{re.escape(keyword)}(?:s|es|ing)?\b", text) for keyword in keywords):
+            return category
+    return "personal"
+
+def parse_slots(text: str, goals: List[str]) -> List[Dict]:
+    """Pull "H:MM-H:MM: activity" lines out of free text, e.g. an LLM-written timetable
+
+    A time without AM/PM is read in the half of the day that falls inside the
+    block heading it appears under, or else that follows the previous slot.
+    Slots that don't end after they start, or run longer than their block,
+    are dropped.
+    """
+    goal_lookup = [(goal, goal_words(goal) - COMMON_WORDS) for goal in goals]
+    slots = []
+    heading_range: Optional[Tuple[int, int]] = None
+    cursor = DAY_START
+    for line in text.splitlines():
+        match = SLOT_LINE.match(line.strip())
+        if not match:
+            heading = BLOCK_HEADING.match(line.strip())
+            if heading:
+                heading_range = BLOCK_RANGES[heading.group(1).capitalize()]
+            continue
+        starts = clock_candidates(int(match.group(1)), int(match.group(2)), match.group(3))
+        start = next((minute for minute in starts if heading_range and heading_range[0] <= minute < heading_range[1]), None)
+        if start is None:
+            start = next((minute for minute in starts if minute >= cursor), starts[0])
+        block_start, block_end = BLOCK_RANGES[block_of(start)]
+        ends = clock_candidates(int(match.group(4)), int(match.group(5)), match.group(6) or match.group(3))
+        end = next((minute for minute in ends if start < minute <= start + block_end - block_start), None)
+        if end is None:
+            continue
+        cursor = start
+        activity = match.group(7).replace("**", "").strip()
+        words = goal_words(activity)
+        goal = next((goal for goal, keys in goal_lookup if keys and keys & words), None)
+        slots.append(slot(start, end, block_of(start), categorize(activity), activity, goal))
+    slots.sort(key=lambda item: item["start_minute"])
+    return slots
+
+def block_coverage(slots: List[Dict], block: str) -> float:
+    """Fraction of a day block's time the slots cover"""
+    block_start, block_end = BLOCK_RANGES[block]
+    covered = 0
+    cursor = block_start
+    for item in sorted(slots, key=lambda item: item["start_minute"]):
+        start, end = max(item["start_minute"], cursor), min(item["end_minute"], block_end)
+        if end > start:
+            covered += end - start
+            cursor = end
+    return covered / (block_end - block_start)
+
+def covers_blocks(slots: List[Dict], blocks: Optional[List[str]] = None) -> bool:
+    """Whether the slots cover at least MIN_BLOCK_COVERAGE of each block (every block by default)"""
+    return all(block_coverage(slots, block) >= MIN_BLOCK_COVERAGE for block in blocks or BLOCK_RANGES)
+
+def expand_slots(slots: List[Dict]) -> List[Dict]:
+    """Stored compact slots with their clock labels and day block filled back in"""
+    return [
+        slot(item["start_minute"], item["end_minute"], block_of(item["start_minute"]), item["category"], item["activity"], item.get("goal"))
+        for item in slots
+    ]
+
+def build_timetable(goals: List[str], preferences: str, day: date) -> Dict:
+    """Lay out a day's schedule from goals and preferences without calling the LLM
+
+    Meals, planning and wind-down are fixed anchors. Work windows are filled
+    with focus sessions and breaks, giving the user's first goal the peak
+    block, the evening holds exercise when a goal calls for it, and the night
+    block follows the alternating night focus.
+    """
+    goals = [goal.strip() for goal in goals if goal.strip()]
+    preferences = preferences or ""
+    focus, rest = session_lengths(preferences)
+    night_focus = get_night_focus(day)
+    fitness_goal = match_goal(goals, FITNESS_WORDS)
+    side_goal = match_goal(goals, SIDE_HUSTLE_WORDS)
+    work_goals = [goal for goal in goals if goal not in (fitness_goal, side_goal)] or goals
+
+    # The peak block works on the top goal only; the other block rotates through the rest
+    peak = peak_block(preferences)
+    top_goals = work_goals[:1]
+    other_goals = work_goals[1:] or work_goals
+    morning_goals, afternoon_goals = (top_goals, other_goals) if peak == "Morning" else (other_goals, top_goals)
+
+    slots = [slot(start, end, block_of(start), category, activity) for start, end, category, activity in ANCHORS]
+    slots += fill_focus(8 * 60, 12 * 60 + 30, morning_goals, focus, rest)
+    slots += fill_focus(13 * 60 + 30, 16 * 60, afternoon_goals, focus, rest)
+    slots.append(slot(16 * 60, 17 * 60, "Afternoon", "admin", "Admin, email and smaller tasks"))
+
+    if fitness_goal:
+        slots.append(slot(17 * 60, 18 * 60, "Evening", "exercise", f"Workout for {fitness_goal}", fitness_goal))
+    else:
+        slots.append(slot(17 * 60, 18 * 60, "Evening", "exercise", "Walk, stretch or light exercise"))
+    slots.append(slot(18 * 60, 18 * 60 + 30, "Evening", "personal", "Shower and reset"))
+    slots.append(slot(19 * 60 + 30, 21 * 60, "Evening", "personal", "Personal time, friends and family"))
+
+    if night_focus == "Side Hustle":
+        activity = f"Side hustle: {side_goal}" if side_goal else "Side hustle: work on your personal project"
+        night_goal = side_goal
+    else:
+        activity = f"Health & wellness: {fitness_goal}" if fitness_goal else "Health & wellness: stretching, meal prep, reading"
+        night_goal = fitness_goal
+    slots.append(slot(21 * 60, 23 * 60 + 30, "Night", "night_focus", activity, night_goal))
+
+    slots.sort(key=lambda item: item["start_minute"])
+    return {
+        "date": day.isoformat(),
+        "day": day.strftime("%A"),
+        "night_focus": night_focus,
+        "slots": slots,
+        "schedule_text": render_schedule_text(slots, night_focus, "today" if day == date.today() else day.strftime("%A"))
+    }
+
+def changed_blocks(
+    previous_slots: List[Dict],
+    old_goals: List[str],
+    old_preferences: str,
+    goals: List[str],
+    preferences: str,
+    day: date
+) -> List[str]:
+    """Day blocks, in order, that a change of goals or preferences touches
+
+    A block changes when the local layout for the new inputs differs from the
+    old one there, or when it holds a slot tied to a goal that was dropped.
+    Input changes the layout doesn't reflect, like preferences beyond session
+    length and peak hours, touch every block. Unchanged inputs touch none.
+    """
+    old_goals = [goal.strip() for goal in old_goals if goal.strip()]
+    goals = [goal.strip() for goal in goals if goal.strip()]
+    old_preferences, preferences = (old_preferences or "").strip(), (preferences or "").strip()
+    if old_goals == goals and old_preferences == preferences:
+        return []
+    everything = [name for name, *_ in BLOCKS]
+    if old_preferences != preferences and (
+        session_lengths(old_preferences) == session_lengths(preferences) and peak_block(old_preferences) == peak_block(preferences)
+    ):
+        return everything
+
+    def layout(slots: List[Dict]) -> Dict[str, List[Tuple]]:
+        blocks: Dict[str, List[Tuple]] = {}
+        for item in slots:
+            blocks.setdefault(item["block"], []).append((item["start_minute"], item["end_minute"], item["category"], item["activity"]))
+        return blocks
+
+    old_layout = layout(build_timetable(old_goals, old_preferences, day)["slots"])
+    new_layout = layout(build_timetable(goals, preferences, day)["slots"])
+    changed = {name for name, *_ in BLOCKS if old_layout.get(name) != new_layout.get(name)}
+    dropped = set(old_goals) - set(goals)
+    changed |= {block_of(item["start_minute"]) for item in previous_slots if item.get("goal") in dropped}
+    return [name for name in everything if name in changed] if changed else everything
+
+def render_schedule_text(slots: List[Dict], night_focus: str, day_label: str = "today") -> str:
+    """Plain-text rendering of the slots, in the same layout the app has always shown"""
+    lines = [f"Here's your productivity schedule for {day_label}!"]
+    for name, emoji, start, end in BLOCKS:
+        title = f"{name}: {night_focus}" if name == "Night" else name
+        lines.append(f"\n{emoji} {title} ({minute_label(start)}-{minute_label(end)}):")
+        for item in slots:
+            if item["block"] == name:
+                lines.append(f"- {item['start']}-{item['end']}: {item['activity']}")
+    lines.append("\nLet's crush this day! 💪")
+    return "\n".join(lines)
@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import sys
+import uuid
+from pymongo import UpdateOne
+from typing import Dict, List
+from models import TimetableSlot
+from .database_service import DatabaseService
+from .timetable_engine import parse_slots
+
+class TimetableMigration:
+    """Moves timetables saved as one text blob to the structured layout
+
+    Older timetables kept the whole LLM answer in schedule.schedule_text. This
+    parses it into slots and moves the text to the top-level schedule_text
+    field, which history listings leave out unless asked for. It also gives a
+    fresh timetable_id to timetables that share one, which the unique
+    timetable_id index needs.
+    """
+
+    def __init__(self, db_service: DatabaseService, batch_size: int = 500):
+        self.db = db_service.db
+        self.batch_size = batch_size
+
+    async def reassign_duplicate_ids(self) -> int:
+        """New ids for every timetable sharing its timetable_id with an older one
+
+        The first Timetable model computed the id default once per process, so
+        every timetable a worker saved got the same id. The oldest document
+        keeps it. Documents are streamed in (timetable_id, _id) order rather
+        than grouped, since one worker's group can outgrow a document and
+        the $group memory limit.
+        """
+        cursor = (
+            self.db.timetables.find({}, {"_id": 1, "timetable_id": 1})
+            .sort([("timetable_id", 1), ("_id", 1)])
+            .allow_disk_use(True)
+        )
+        reassigned = 0
+        operations = []
+        previous = object()
+        async for doc in cursor:
+            timetable_id = doc.get("timetable_id")
+            if timetable_id != previous:
+                # The first (oldest) document of each id keeps it
+                previous = timetable_id
+                continue
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"timetable_id": str(uuid.uuid4())}}))
+            if len(operations) >= self.batch_size:
+                await self.db.timetables.bulk_write(operations, ordered=False)
+                reassigned += len(operations)
+                operations = []
+        if operations:
+            await self.db.timetables.bulk_write(operations, ordered=False)
+            reassigned += len(operations)
+        return reassigned
+
+    async def run(self) -> Dict[str, int]:
+        reassigned = await self.reassign_duplicate_ids()
+        migrated = 0
+        unparsed = 0
+        operations = []
+        goals: Dict[str, List[str]] = {}
+        cursor = self.db.timetables.find({"slots": {"$exists": False}}, {"_id": 1, "user_id": 1, "schedule": 1})
+        async for doc in cursor:
+            user_id = doc.get("user_id")
+            if user_id not in goals:
+                # Goal references come from the user's current goals
+                user = await self.db.users.find_one({"user_id": user_id}, {"_id": 0, "goals": 1})
+                goals[user_id] = (user or {}).get("goals", [])
+            schedule = doc.get("schedule") or {}
+            text = schedule.pop("schedule_text", None) or ""
+            slots = [TimetableSlot(**slot).model_dump() for slot in parse_slots(text, goals[user_id])]
+            if not slots:
+                unparsed += 1
+            operations.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"schedule": schedule, "slots": slots, "schedule_text": text or None}}
+            ))
+            if len(operations) >= self.batch_size:
+                await self.db.timetables.bulk_write(operations, ordered=False)
+                migrated += len(operations)
+                operations = []
+        if operations:
+            await self.db.timetables.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+        return {"reassigned_ids": reassigned, "migrated": migrated, "without_slots": unparsed}
+
+async def run() -> int:
+    db_service = DatabaseService()
+    try:
+        print(await TimetableMigration(db_service).run())
+        return 0
+    finally:
+        await db_service.close()
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    argparse.ArgumentParser(description="Convert free-text Brolife timetables to structured slots").parse_args()
+    sys.exit(asyncio.run(run()))
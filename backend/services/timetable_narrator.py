@@ -0,0 +1,46 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List, Set
+from .database_service import DatabaseService
+from .llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+class TimetableNarrator:
+    """Adds LLM-written encouragement to locally built timetables in the background
+
+    The timetable is returned and saved as soon as the slot allocator has laid
+    it out; the narrative is written afterwards at the lowest scheduler
+    priority and attached to the saved timetable. A provider outage only
+    means the narrative never arrives. Set TIMETABLE_NARRATIVE=false to skip it.
+    """
+
+    def __init__(self, db_service: DatabaseService, llm_service: LLMService):
+        self.db_service = db_service
+        self.llm_service = llm_service
+        self.enabled = os.environ.get("TIMETABLE_NARRATIVE", "true").lower() == "true"
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, timetable_id: str, schedule: Dict, goals: List[str], user_id: str, bro_name: str = "Bro") -> bool:
+        """Write the narrative for a saved timetable in the background; returns whether one is coming"""
+        if not self.enabled or schedule.get("source") != "engine":
+            return False
+        task = asyncio.create_task(self._narrate(timetable_id, schedule, goals, user_id, bro_name))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def close(self) -> None:
+        """Drop unfinished narratives on shutdown; they are optional and may be queued behind the rate limit"""
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _narrate(self, timetable_id: str, schedule: Dict, goals: List[str], user_id: str, bro_name: str) -> None:
+        try:
+            narrative = await self.llm_service.write_timetable_narrative(schedule, goals, user_id, bro_name)
+            await self.db_service.save_timetable_narrative(timetable_id, narrative)
+        except Exception as e:
+            logger.warning("Timetable narrative failed for %s: %s", user_id, e)
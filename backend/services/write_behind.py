@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import logging
+from pymongo.errors import BulkWriteError
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .metrics import DB_WRITE_BEHIND_FAILURES, track_db
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+# (sequence number, failed attempts so far, document)
+Entry = Tuple[int, int, Dict]
+
+class WriteBehindQueue:
+    """Buffers documents for one collection and writes them with insert_many
+
+    A batch is written once it reaches batch_size documents or flush_interval
+    seconds after its first document arrived, whichever comes first. put()
+    blocks while max_queue_size documents are waiting, which pushes back on
+    callers instead of growing memory without bound. In synchronous mode every
+    document is inserted before put() returns. Each document gets a sequence
+    number, so flush() waits only for what was queued before it was called.
+
+    Documents in a failed insert are requeued after an exponential backoff,
+    during which the writer pauses, up to max_retries times. Documents out of
+    retries, or that find the queue full, are dropped and counted. Documents
+    keep their _id across attempts, so a retry of a partly written batch
+    skips the ones already stored.
+    """
+
+    def __init__(
+        self,
+        collection,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        max_queue_size: int = 10000,
+        synchronous: bool = False,
+        max_retries: int = 5,
+        retry_base_delay: float = 0.1,
+        retry_max_delay: float = 5.0
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._sequence = itertools.count(1)
+        self._last_sequence = 0
+        self._outstanding: Set[int] = set()
+        self._settled = asyncio.Condition()
+        self.batches_written = 0
+        self.documents_written = 0
+        self.documents_retried = 0
+        self.documents_dropped = 0
+
+    async def put(self, document: Dict) -> None:
+        if self.synchronous:
+            await self.collection.insert_one(document)
+            self.documents_written += 1
+            return
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        sequence = next(self._sequence)
+        self._last_sequence = sequence
+        self._outstanding.add(sequence)
+        await self._queue.put((sequence, 0, document))
+
+    async def flush(self) -> None:
+        """Wait until every document queued before this call has been written
+
+        Documents queued while waiting don't extend the wait, so reads that
+        flush first stay bounded under a sustained stream of writes.
+        """
+        target = self._last_sequence
+        async with self._settled:
+            await self._settled.wait_for(lambda: not self._outstanding or min(self._outstanding) > target)
+
+    async def close(self) -> None:
+        """Flush outstanding documents and stop the background writer"""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            requeued: Set[int] = set()
+            try:
+                failed = await self._write(batch)
+                if failed:
+                    requeued = await self._requeue(failed)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+                await self._settle([sequence for sequence, _, _ in batch if sequence not in requeued])
+
+    async def _settle(self, sequences: List[int]) -> None:
+        """Mark documents as done with and wake flushes waiting on them"""
+        self._outstanding.difference_update(sequences)
+        async with self._settled:
+            self._settled.notify_all()
+
+    async def _write(self, batch: List[Entry]) -> List[Entry]:
+        """Insert a batch; returns the entries that failed and may succeed on a retry"""
+        try:
+            documents = [document for _, _, document in batch]
+            await track_db(f"{self.collection.name}.insert_many")(self.collection.insert_many)(documents, ordered=False)
+            failed = []
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            # A duplicate key means an earlier attempt already stored the document
+            failed = [batch[error["index"]] for error in errors if error.get("code") != DUPLICATE_KEY] if errors else batch
+            logger.error("Write-behind insert into %s failed for %d of %d documents: %s", self.collection.name, len(failed), len(batch), e)
+        except Exception as e:
+            failed = batch
+            logger.error("Write-behind insert into %s failed for %d documents: %s", self.collection.name, len(failed), e)
+        self.batches_written += 1
+        self.documents_written += len(batch) - len(failed)
+        return failed
+
+    async def _requeue(self, failed: List[Entry]) -> Set[int]:
+        """Queue failed documents again after a backoff; returns the sequence numbers requeued"""
+        attempt = max(attempts for _, attempts, _ in failed) + 1
+        await asyncio.sleep(min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1)))
+        requeued = set()
+        for sequence, attempts, document in failed:
+            if attempts >= self.max_retries:
+                continue
+            try:
+                self._queue.put_nowait((sequence, attempts + 1, document))
+            except asyncio.QueueFull:
+                continue
+            requeued.add(sequence)
+
+        dropped = len(failed) - len(requeued)
+        self.documents_retried += len(requeued)
+        self.documents_dropped += dropped
+        DB_WRITE_BEHIND_FAILURES.labels(self.collection.name, "requeued").inc(len(requeued))
+        if dropped:
+            DB_WRITE_BEHIND_FAILURES.labels(self.collection.name, "dropped").inc(dropped)
+            logger.error("Write-behind dropped %d documents for %s after failed inserts", dropped, self.collection.name)
+        return requeued
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "collection": self.collection.name,
+            "synchronous": self.synchronous,
+            "queued": self._queue.qsize(),
+            "batches_written": self.batches_written,
+            "documents_written": self.documents_written,
+            "documents_retried": self.documents_retried,
+            "documents_dropped": self.documents_dropped
+        }
\ No newline at end of file
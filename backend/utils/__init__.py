@@ -1,3 +1,11 @@
-from .helpers import serialize_datetime, serialize_user_document, get_response_message
+from .helpers import serialize_datetime, serialize_user_document, get_response_message, get_night_focus, format_sse
+from .serialization import DocumentDTO, DocumentResponse, USER_DTO, CHAT_HISTORY_DTO, TIMETABLE_DTO, JOB_DTO, dumps, dumps_tagged, loads_tagged
+from .compression import CompressionMiddleware
+from .pagination import InvalidCursorError, START_CURSOR, encode_cursor, decode_cursor, keyset_query, build_projection, parse_fields
 
-__all__ = ["serialize_datetime", "serialize_user_document", "get_response_message"]
\ No newline at end of file
+__all__ = [
+    "serialize_datetime", "serialize_user_document", "get_response_message", "get_night_focus", "format_sse",
+    "DocumentDTO", "DocumentResponse", "USER_DTO", "CHAT_HISTORY_DTO", "TIMETABLE_DTO", "JOB_DTO", "dumps", "dumps_tagged", "loads_tagged",
+    "CompressionMiddleware",
+    "InvalidCursorError", "START_CURSOR", "encode_cursor", "decode_cursor", "keyset_query", "build_projection", "parse_fields"
+]
\ No newline at end of file
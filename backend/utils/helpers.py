@@ -1,5 +1,6 @@
-from datetime import datetime
-from typing import Dict, Any
+from datetime import date, datetime
+from typing import Dict, Any, Optional
+from .serialization import USER_DTO, dumps
 
 def serialize_datetime(obj: Any) -> Any:
     """Convert datetime objects to ISO format strings for JSON serialization"""
@@ -17,13 +18,10 @@ def serialize_user_document(user_doc: Dict, user_id: str) -> Dict:
             "preferences": ""
         }
     
-    return {
-        "user_id": user_doc.get("user_id", user_id),
-        "bro_name": user_doc.get("bro_name", "Bro"),
-        "goals": user_doc.get("goals", []),
-        "preferences": user_doc.get("preferences", ""),
-        "created_at": serialize_datetime(user_doc.get("created_at"))
-    }
+    user = USER_DTO.dump(user_doc)
+    user.setdefault("user_id", user_id)
+    user["created_at"] = serialize_datetime(user.get("created_at"))
+    return user
 
 def get_response_message(action: str, bro_name: str) -> str:
     """Get appropriate response message for user actions"""
@@ -33,4 +31,13 @@ def get_response_message(action: str, bro_name: str) -> str:
         "timetable_ready": "Your personalized timetable is ready! 🎯",
         "goals_needed": "Hey! Set up your goals first so I can create a personalized timetable for you. 🎯"
     }
-    return messages.get(action, "Great! Let's keep going! 💪")
\ No newline at end of file
+    return messages.get(action, "Great! Let's keep going! 💪")
+
+def get_night_focus(day: date) -> str:
+    """Get the alternating night focus for a given day"""
+    return "Side Hustle" if day.strftime("%A") in ["Monday", "Wednesday", "Friday", "Sunday"] else "Health & Wellness"
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """Format a payload as a single Server-Sent Events frame"""
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {dumps(data).decode()}\n\n"
@@ -0,0 +1,96 @@
+import orjson
+from bson import ObjectId
+from datetime import datetime
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Any, Dict, Iterable, List, Optional
+
+def encode_default(obj: Any) -> Any:
+    """Types orjson does not encode natively: ObjectIds, pydantic models and sets"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Encode content as JSON; datetimes become ISO strings and ObjectIds plain strings"""
+    return orjson.dumps(content, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+def _tag_datetimes(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, dict):
+        return {key: _tag_datetimes(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_tag_datetimes(item) for item in value]
+    return value
+
+def _untag_datetimes(value: Any) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1 and isinstance(value.get("$date"), str):
+            return datetime.fromisoformat(value["$date"])
+        return {key: _untag_datetimes(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_untag_datetimes(item) for item in value]
+    return value
+
+def dumps_tagged(content: Any) -> bytes:
+    """Encode content like dumps, but wrap datetimes as {"$date": iso} so loads_tagged can restore them"""
+    return dumps(_tag_datetimes(content))
+
+def loads_tagged(data: bytes) -> Any:
+    """Decode dumps_tagged output, turning {"$date": iso} back into datetimes"""
+    return _untag_datetimes(orjson.loads(data))
+
+class DocumentResponse(JSONResponse):
+    """JSON response rendered with orjson
+
+    Returned directly from a route, the content skips FastAPI's recursive
+    jsonable_encoder pass: datetimes are encoded natively in C and ObjectIds
+    and pydantic models through encode_default.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class DocumentDTO:
+    """The fields of one collection exposed over the API
+
+    fields doubles as the whitelist for `fields=` projections, default_fields
+    as the projection when a client asks for nothing in particular, and dump
+    shapes a stored document into the response, filling in defaults.
+    """
+
+    def __init__(self, fields: Iterable[str], default_fields: Optional[Iterable[str]] = None, defaults: Optional[Dict] = None):
+        self.fields = tuple(fields)
+        self.default_fields = tuple(default_fields) if default_fields else None
+        self.defaults = defaults or {}
+
+    def projection(self) -> Dict:
+        """Mongo projection returning just the exposed fields"""
+        return {"_id": 0, **{field: 1 for field in self.fields}}
+
+    def dump(self, doc: Dict) -> Dict:
+        data = {field: doc[field] for field in self.fields if field in doc}
+        for field, value in self.defaults.items():
+            if data.get(field) is None:
+                data[field] = value() if callable(value) else value
+        return data
+
+    def dump_many(self, docs: Iterable[Dict]) -> List[Dict]:
+        return [self.dump(doc) for doc in docs]
+
+USER_DTO = DocumentDTO(
+    ("user_id", "bro_name", "goals", "preferences", "created_at"),
+    defaults={"bro_name": "Bro", "goals": list, "preferences": ""}
+)
+CHAT_HISTORY_DTO = DocumentDTO(("user_id", "message", "response", "timestamp", "message_id", "usage"))
+# Full text and narrative can be several KB, so history listings leave them out unless asked for
+TIMETABLE_DTO = DocumentDTO(
+    ("user_id", "date", "schedule", "slots", "schedule_text", "narrative", "created_at", "timetable_id", "goals", "preferences", "precomputed", "served_at"),
+    default_fields=("user_id", "date", "schedule", "slots", "created_at", "timetable_id", "precomputed")
+)
+JOB_DTO = DocumentDTO(("job_id", "kind", "user_id", "status", "result", "error", "created_at", "updated_at"))
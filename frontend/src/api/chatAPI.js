@@ -15,6 +15,49 @@ export const chatAPI = {
     return response.json();
   },
 
+  async streamMessage(message, onToken) {
+    const response = await fetch(`${BACKEND_URL}/api/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(message)
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error('Failed to send message');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = { response: '', bro_name: 'Bro' };
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE frames are separated by a blank line
+      const frames = buffer.split('\n\n');
+      buffer = frames.pop();
+      for (const frame of frames) {
+        const event = frame.match(/^event: (.*)$/m)?.[1];
+        const data = frame.match(/^data: (.*)$/m)?.[1];
+        if (!data) continue;
+        const payload = JSON.parse(data);
+        if (event === 'start') {
+          result.bro_name = payload.bro_name;
+        } else if (event === 'done') {
+          result = payload;
+        } else {
+          result.response += payload.token;
+          onToken?.(payload.token, result);
+        }
+      }
+    }
+
+    return result;
+  },
+
   async getChatHistory(userId, limit = 20) {
     const response = await fetch(`${BACKEND_URL}/api/chat-history/${userId}?limit=${limit}`);
     
@@ -27,18 +27,32 @@ export const useChat = () => {
         timestamp: new Date() 
       }]);
 
-      const response = await chatAPI.sendMessage({
+      // Add the bot response once the first token arrives and fill it in as tokens stream
+      const botId = `bot_${Date.now()}`;
+      const updateBotMessage = (content, broName) => {
+        setMessages(prev => {
+          const botMessage = {
+            id: botId,
+            type: 'bot',
+            content,
+            timestamp: new Date(),
+            bro_name: broName
+          };
+          return prev.some(m => m.id === botId)
+            ? prev.map(m => (m.id === botId ? botMessage : m))
+            : [...prev, botMessage];
+        });
+      };
+
+      const response = await chatAPI.streamMessage({
         message,
         user_id: userId
+      }, (token, partial) => {
+        setIsLoading(false);
+        updateBotMessage(partial.response, partial.bro_name);
       });
-      
-      // Add bot response
-      setMessages(prev => [...prev, { 
-        type: 'bot', 
-        content: response.response, 
-        timestamp: new Date(),
-        bro_name: response.bro_name 
-      }]);
+
+      updateBotMessage(response.response, response.bro_name);
 
       return response;
     } catch (err) {
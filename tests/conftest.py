@@ -0,0 +1,37 @@
+import os
+import sys
+import pytest
+
+# Run every test against the fake LLM provider and the in-memory database, with no rate limits
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("DB_BACKEND", "memory")
+os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "0")
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
+os.environ.setdefault("FAKE_LLM_TOKEN_DELAY_MS", "0")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+# The app's packages (services, routes, utils) are imported from backend/, as server.py runs them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from services import create_database_service  # noqa: E402
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def db_service():
+    service = create_database_service()
+    yield service
+    await service.close()
+
+@pytest.fixture
+async def client():
+    """HTTP client for the app, with its lifespan running"""
+    import httpx
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
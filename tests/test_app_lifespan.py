@@ -0,0 +1,82 @@
+import pytest
+from services import DatabaseService
+
+pytestmark = pytest.mark.anyio
+
+async def test_pool_settings_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "7")
+    monkeypatch.setenv("MONGO_MIN_POOL_SIZE", "2")
+    monkeypatch.setenv("MONGO_MAX_IDLE_TIME_MS", "4000")
+    monkeypatch.setenv("MONGO_CONNECT_TIMEOUT_MS", "1500")
+    monkeypatch.setenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "500")
+    monkeypatch.setenv("MONGO_SOCKET_TIMEOUT_MS", "9000")
+    service = DatabaseService()
+    try:
+        options = service.client.options
+        assert options.pool_options.max_pool_size == 7
+        assert options.pool_options.min_pool_size == 2
+        assert options.pool_options.max_idle_time_seconds == 4
+        assert options.pool_options.connect_timeout == 1.5
+        assert options.pool_options.socket_timeout == 9
+        assert options.server_selection_timeout == 0.5
+    finally:
+        await service.close()
+
+async def test_routes_share_the_lifespan_database_service(monkeypatch):
+    import httpx
+    import main
+
+    services, pinged, closed = [], [], []
+    create_database_service = main.create_database_service
+
+    def tracked():
+        service = create_database_service()
+        close, connect = service.close, service.connect
+
+        async def tracked_connect():
+            pinged.append(service)
+            await connect()
+
+        async def tracked_close():
+            closed.append(service)
+            await close()
+
+        service.connect = tracked_connect
+        service.close = tracked_close
+        services.append(service)
+        return service
+
+    monkeypatch.setattr(main, "create_database_service", tracked)
+    async with main.app.router.lifespan_context(main.app):
+        db_service = main.app.state.db_service
+        assert services == [db_service]
+        assert pinged == [db_service]
+        assert main.app.state.context_manager.db_service is db_service
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/user/setup", json={"user_id": "shared", "bro_name": "Ace", "goals": [], "preferences": ""})
+            assert response.status_code == 200
+        assert (await db_service.db.users.find_one({"user_id": "shared"}))["bro_name"] == "Ace"
+        assert closed == []
+    assert closed == [db_service]
+
+async def test_failed_warm_up_ping_does_not_block_startup(monkeypatch):
+    import httpx
+    from main import app
+
+    async def unreachable(self):
+        raise ConnectionError("no MongoDB")
+
+    monkeypatch.setattr(DatabaseService, "connect", unreachable)
+    async with app.router.lifespan_context(app):
+        # Index bootstrap is skipped, and the pool connects on the first query instead
+        assert app.state.index_status is None
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get("/api/health")).json()["status"] == "healthy"
+
+def test_server_entrypoint_serves_the_modular_app():
+    import main
+    import server
+
+    assert server.app is main.app
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import date, timedelta
+import pytest
+from services import LLMService
+
+pytestmark = pytest.mark.anyio
+
+REQUEST = {"user_id": "planner", "goals": ["Ship the MVP", "Get fit"], "preferences": ""}
+
+@pytest.fixture
+def app_state(client):
+    from main import app
+    return app.state
+
+async def test_week_covers_seven_days_with_alternating_night_focus(client, app_state):
+    bulk_writes = []
+    save_timetables = app_state.db_service.save_timetables
+
+    async def counted(timetables):
+        bulk_writes.append(len(timetables))
+        return await save_timetables(timetables)
+
+    app_state.db_service.save_timetables = counted
+    response = await client.post("/api/generate-timetable/week", json={**REQUEST, "start_date": "2026-03-02"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["generated"], body["failed"]) == (7, 0)
+    assert [day["date"] for day in body["timetables"]] == [(date(2026, 3, 2) + timedelta(days=n)).isoformat() for n in range(7)]
+    assert [day["timetable"]["night_focus"] for day in body["timetables"]] == [
+        "Side Hustle", "Health & Wellness", "Side Hustle", "Health & Wellness", "Side Hustle", "Health & Wellness", "Side Hustle"
+    ]
+    assert bulk_writes == [7]
+    assert await app_state.db_service.db.timetables.count_documents({"user_id": "planner"}) == 7
+
+async def test_range_is_validated(client, monkeypatch):
+    monkeypatch.setenv("TIMETABLE_RANGE_MAX_DAYS", "5")
+    backwards = await client.post("/api/generate-timetable/range", json={**REQUEST, "start_date": "2026-03-05", "end_date": "2026-03-04"})
+    too_long = await client.post("/api/generate-timetable/range", json={**REQUEST, "start_date": "2026-03-01", "end_date": "2026-03-06"})
+    ok = await client.post("/api/generate-timetable/range", json={**REQUEST, "start_date": "2026-03-01", "end_date": "2026-03-03"})
+
+    assert backwards.status_code == 400
+    assert too_long.status_code == 400
+    assert [day["date"] for day in ok.json()["timetables"]] == ["2026-03-01", "2026-03-02", "2026-03-03"]
+
+async def test_a_failed_day_is_reported_without_failing_the_batch(client, app_state):
+    llm_service = app_state.llm_service
+    generate_timetable = llm_service.generate_timetable
+
+    async def failing_tuesday(*args, day=None, **kwargs):
+        if day == date(2026, 3, 3):
+            raise RuntimeError("provider down")
+        return await generate_timetable(*args, day=day, **kwargs)
+
+    llm_service.generate_timetable = failing_tuesday
+    body = (await client.post("/api/generate-timetable/range", json={**REQUEST, "start_date": "2026-03-02", "end_date": "2026-03-04"})).json()
+
+    assert (body["generated"], body["failed"]) == (2, 1)
+    assert [day["status"] for day in body["timetables"]] == ["generated", "error", "generated"]
+    assert "provider down" in body["timetables"][1]["error"]
+    assert await app_state.db_service.db.timetables.count_documents({"user_id": "planner"}) == 2
+
+async def test_days_are_generated_concurrently_up_to_the_limit(monkeypatch):
+    monkeypatch.setenv("TIMETABLE_BATCH_CONCURRENCY", "3")
+    llm_service = LLMService()
+    running, peak = 0, 0
+
+    async def generate_timetable(goals, preferences, user_id, bro_name, force_refresh, day):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"date": day.isoformat()}
+
+    monkeypatch.setattr(llm_service, "generate_timetable", generate_timetable)
+    days = [date(2026, 3, 1) + timedelta(days=n) for n in range(7)]
+    results = await llm_service.generate_timetables(["gym"], "", "u1", days)
+
+    assert [result["date"] for result in results] == [day.isoformat() for day in days]
+    assert peak == 3
@@ -0,0 +1,47 @@
+import argparse
+import pytest
+import benchmark
+
+pytestmark = pytest.mark.anyio
+
+def test_percentiles_use_the_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+    assert [benchmark.percentile(values, pct) for pct in (50, 95, 99)] == [50, 95, 99]
+    assert benchmark.percentile([0.2], 99) == 0.2
+    assert benchmark.percentile([], 50) == 0.0
+
+def test_mix_names_must_be_endpoints():
+    assert benchmark.parse_mix("chat=3,get_user") == [("chat", 3.0), ("get_user", 1.0)]
+    with pytest.raises(SystemExit):
+        benchmark.parse_mix("chat=3,nope=1")
+
+def test_summary_reports_errors_and_throughput_per_endpoint():
+    recorder = benchmark.Recorder()
+    for seconds in (0.01, 0.02, 0.03, 0.04):
+        recorder.record("chat", seconds, 200)
+    recorder.record("get_user", 0.5, 500)
+
+    summary = recorder.summary(elapsed=2)
+
+    assert summary["endpoints"]["chat"]["requests"] == 4
+    assert summary["endpoints"]["chat"]["throughput_rps"] == 2
+    assert summary["endpoints"]["chat"]["p50_ms"] == 20
+    assert summary["endpoints"]["get_user"]["statuses"] == {"500": 1}
+    assert summary["overall"]["errors"] == 1
+    assert summary["overall"]["max_ms"] == 500
+
+async def test_in_process_run_drives_every_endpoint_without_errors(capsys):
+    args = argparse.Namespace(
+        url=None, requests=140, warmup=5, concurrency=5, users=5, mix=benchmark.DEFAULT_MIX, seed=1, timeout=30
+    )
+    result = await benchmark.run_benchmark(args)
+
+    assert result["target"] == "in-process"
+    assert result["overall"]["requests"] == 140
+    assert result["overall"]["errors"] == 0
+    assert set(result["endpoints"]) == set(benchmark.ENDPOINTS)
+
+    benchmark.print_report(result, baseline=result)
+    report = capsys.readouterr().out
+    assert "overall" in report
+    assert "p50_ms +0.0%" in report
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+import pytest
+from services.cache import TieredCache
+from utils import dumps_tagged, loads_tagged
+
+pytestmark = pytest.mark.anyio
+
+def test_tagged_serialization_round_trips_datetimes():
+    user = {
+        "user_id": "u1",
+        "created_at": datetime(2026, 1, 2, 3, 4, 5, 678000),
+        "sessions": [{"at": datetime(2026, 1, 3, tzinfo=timezone.utc)}],
+        "note": "2026-01-02T03:04:05"
+    }
+    assert loads_tagged(dumps_tagged(user)) == user
+
+async def test_fill_after_invalidation_is_dropped():
+    cache = TieredCache("test")
+    token = await cache.fill_token("u1")
+    # An update invalidates the key while the read-through fill is in flight
+    await cache.delete("u1")
+    await cache.set("u1", {"bro_name": "stale"}, token=token)
+    assert await cache.get("u1") is None
+    assert cache.stats()["stale_fills"] == 1
+
+    token = await cache.fill_token("u1")
+    await cache.set("u1", {"bro_name": "fresh"}, token=token)
+    assert await cache.get("u1") == {"bro_name": "fresh"}
+
+async def test_get_user_does_not_cache_a_read_raced_by_an_upsert(db_service, monkeypatch):
+    await db_service.upsert_user({"user_id": "u1", "bro_name": "Old", "goals": [], "preferences": ""})
+    collection_type = type(db_service.db.users)
+    find_one = collection_type.find_one
+    raced = []
+
+    async def racing_find_one(self, *args, **kwargs):
+        user = await find_one(self, *args, **kwargs)
+        if not raced:
+            raced.append(True)
+            await db_service.upsert_user({"user_id": "u1", "bro_name": "New", "goals": [], "preferences": ""})
+        return user
+
+    monkeypatch.setattr(collection_type, "find_one", racing_find_one)
+    assert (await db_service.get_user("u1"))["bro_name"] == "Old"
+    assert (await db_service.get_user("u1"))["bro_name"] == "New"
+
+async def test_stalled_redis_times_out_to_a_miss_and_is_skipped(monkeypatch):
+    monkeypatch.setenv("REDIS_SOCKET_TIMEOUT_SECONDS", "0.1")
+    monkeypatch.setenv("REDIS_CONNECT_TIMEOUT_SECONDS", "0.1")
+    stalled = []
+
+    async def accept_and_stall(reader, writer):
+        stalled.append(writer)
+        await reader.read()
+
+    server = await asyncio.start_server(accept_and_stall, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    cache = TieredCache("test", redis_url=f"redis://127.0.0.1:{port}/0")
+    try:
+        started = time.monotonic()
+        assert await cache.get("u1") is None
+        assert time.monotonic() - started < 2
+        assert cache.stats()["remote_errors"] == 1
+
+        # While Redis is backed off the local tier still serves without waiting on it
+        started = time.monotonic()
+        await cache.set("u1", {"bro_name": "Local"}, token=await cache.fill_token("u1"))
+        assert await cache.get("u1") == {"bro_name": "Local"}
+        assert await cache.get("u2") is None
+        assert time.monotonic() - started < 0.1
+        assert cache.stats()["remote_errors"] == 1
+    finally:
+        for writer in stalled:
+            writer.close()
+        server.close()
+        await cache.close()
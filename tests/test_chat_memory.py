@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import pytest
+from services import ChatMemoryIndex, ConversationContextManager, LLMService
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2026, 1, 1)
+
+async def save_turn(db_service, index: ChatMemoryIndex, message: str, minute: int) -> None:
+    await db_service.save_chat_history(index.remember({
+        "user_id": "u1",
+        "message": message,
+        "response": "ok",
+        "timestamp": START + timedelta(minutes=minute)
+    }))
+    await db_service.flush_writes()
+
+async def recalled(index: ChatMemoryIndex, message: str) -> list:
+    return [turn["message"] for turn in await index.recall("u1", message)]
+
+async def test_workers_see_turns_saved_by_other_workers(db_service):
+    worker_a = ChatMemoryIndex(db_service)
+    worker_b = ChatMemoryIndex(db_service)
+    await save_turn(db_service, worker_a, "training for the city marathon", 0)
+    assert await recalled(worker_a, "marathon training plan") == ["training for the city marathon"]
+
+    # Saved through the other worker after worker_a loaded the user
+    await save_turn(db_service, worker_b, "learning spanish verbs every evening", 1)
+    assert await recalled(worker_a, "spanish verbs practice") == ["learning spanish verbs every evening"]
+    assert worker_a.stats()["synced"] == 1
+
+async def test_resync_catches_late_writes_and_embeds_missing_vectors(db_service):
+    worker_a = ChatMemoryIndex(db_service)
+    await save_turn(db_service, worker_a, "training for the city marathon", 10)
+    await recalled(worker_a, "marathon")
+
+    # Written late by another worker, older than the newest turn already read and without an embedding
+    await db_service.save_chat_history({
+        "user_id": "u1",
+        "message": "practicing guitar chords nightly",
+        "response": "ok",
+        "timestamp": START + timedelta(minutes=9, seconds=30)
+    })
+    await db_service.flush_writes()
+    assert await recalled(worker_a, "guitar chords practice") == ["practicing guitar chords nightly"]
+    assert worker_a.stats()["backfilled"] == 1
+
+async def test_recall_leaves_out_the_verbatim_window_whatever_the_row_order(db_service, monkeypatch):
+    monkeypatch.setenv("CONTEXT_RECENT_TURNS", "2")
+    worker_a = ChatMemoryIndex(db_service)
+    worker_b = ChatMemoryIndex(db_service)
+    manager = ConversationContextManager(db_service, LLMService(), worker_a)
+    await save_turn(db_service, worker_a, "training for the city marathon", 0)
+    await recalled(worker_a, "marathon")
+    await save_turn(db_service, worker_a, "practicing guitar chords nightly", 10)
+    await save_turn(db_service, worker_a, "reading about stoic philosophy", 11)
+    # Older than worker_a's own turns, but only synced into its index after them
+    await save_turn(db_service, worker_b, "learning spanish verbs every evening", 5)
+
+    context = await manager.build_context("u1", "my spanish verbs and guitar chords")
+    recalled_section = context.split("Recent conversation:")[0]
+    assert "learning spanish verbs" in recalled_section
+    assert "guitar chords nightly" not in recalled_section
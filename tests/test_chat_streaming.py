@@ -0,0 +1,55 @@
+import json
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+def parse_sse(body: str):
+    """(event, data) pairs from a Server-Sent Events body"""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        event = "message"
+        for line in frame.split("\n"):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+async def test_sse_streams_tokens_then_saves_the_whole_response(client):
+    await client.post("/api/user/setup", json={"user_id": "streamer", "bro_name": "Chief", "goals": ["ship"], "preferences": ""})
+
+    response = await client.post("/api/chat/stream", json={"user_id": "streamer", "message": "how do I start?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert events[0] == ("start", {"bro_name": "Chief"})
+    tokens = [data["token"] for event, data in events[1:-1]]
+    assert len(tokens) > 1
+    assert events[-1] == ("done", {"response": "".join(tokens), "bro_name": "Chief"})
+
+    history = (await client.get("/api/chat-history/streamer")).json()["history"]
+    assert [(turn["message"], turn["response"]) for turn in history] == [("how do I start?", "".join(tokens))]
+
+# Starlette's TestClient still imports an anyio alias that newer anyio deprecates
+@pytest.mark.filterwarnings("ignore:The anyio.abc.BlockingPortal alias is deprecated:DeprecationWarning")
+def test_websocket_streams_one_reply_per_message():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/chat/ws") as websocket:
+            replies = []
+            for message in ["first question", "second question"]:
+                websocket.send_json({"user_id": "socket", "message": message})
+                frames = [websocket.receive_json()]
+                while frames[-1]["type"] != "done":
+                    frames.append(websocket.receive_json())
+                assert frames[0] == {"type": "start", "bro_name": "Bro"}
+                tokens = [frame["token"] for frame in frames[1:-1]]
+                assert frames[-1]["response"] == "".join(tokens)
+                replies.append(frames[-1]["response"])
+
+        history = client.get("/api/chat-history/socket").json()["history"]
+    # Newest first
+    assert [turn["response"] for turn in history] == replies[::-1]
@@ -0,0 +1,113 @@
+import gzip
+from datetime import datetime
+import httpx
+import orjson
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from utils import CHAT_HISTORY_DTO, CompressionMiddleware, DocumentResponse
+from utils import compression
+
+pytestmark = pytest.mark.anyio
+
+LARGE = {"items": ["chat turn " * 20] * 20}
+
+def make_app() -> FastAPI:
+    app = FastAPI(default_response_class=DocumentResponse)
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/large")
+    async def large():
+        return LARGE
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse("x" * 4096, headers={"Content-Encoding": "identity"})
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            for n in range(3):
+                yield f"data: {'x' * 1024} {n}\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+async def get(path: str, accept_encoding: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+async def test_large_json_is_gzipped(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    response = await get("/large", "gzip, br")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(orjson.dumps(LARGE))
+    assert "Accept-Encoding" in response.headers["vary"]
+    # httpx decodes the gzip body transparently
+    assert response.json() == LARGE
+
+async def test_brotli_is_preferred_when_installed(monkeypatch):
+    class FakeBrotli:
+        @staticmethod
+        def compress(body: bytes, quality: int) -> bytes:
+            return b"br" + gzip.compress(body)
+
+    monkeypatch.setattr(compression, "brotli", FakeBrotli)
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async with client.stream("GET", "/large", headers={"Accept-Encoding": "gzip, br"}) as response:
+            raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    assert response.headers["content-encoding"] == "br"
+    assert orjson.loads(gzip.decompress(raw[2:])) == LARGE
+
+    # q=0 refuses an encoding
+    assert compression.CompressionMiddleware(None).choose_encoding("br;q=0, gzip") == "gzip"
+    assert compression.CompressionMiddleware(None).choose_encoding("identity") is None
+
+async def test_small_encoded_and_unaccepted_responses_pass_through():
+    small = await get("/small", "gzip")
+    assert "content-encoding" not in small.headers
+    assert small.json() == {"ok": True}
+
+    assert (await get("/text", "gzip")).headers["content-encoding"] == "identity"
+    assert "content-encoding" not in (await get("/large", "identity")).headers
+
+async def test_event_streams_are_never_compressed():
+    response = await get("/events", "gzip")
+
+    assert "content-encoding" not in response.headers
+    assert response.text.count("data: ") == 3
+
+async def test_threshold_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv("RESPONSE_COMPRESSION_MIN_BYTES", "100000")
+    assert "content-encoding" not in (await get("/large", "gzip")).headers
+
+def test_documents_render_datetimes_and_object_ids():
+    turn = {
+        "_id": ObjectId(),
+        "user_id": "u1",
+        "message": "hi",
+        "response": "hey",
+        "timestamp": datetime(2026, 3, 2, 8, 30),
+        "internal": "not exposed"
+    }
+    body = orjson.loads(DocumentResponse({"history": CHAT_HISTORY_DTO.dump_many([turn]), "id": turn["_id"]}).body)
+    assert body == {
+        "history": [{"user_id": "u1", "message": "hi", "response": "hey", "timestamp": "2026-03-02T08:30:00"}],
+        "id": str(turn["_id"])
+    }
+
+async def test_history_endpoint_is_compressed_end_to_end(client):
+    for n in range(20):
+        await client.post("/api/chat", json={"user_id": "long", "message": f"question number {n} about my plan"})
+    response = await client.get("/api/chat-history/long", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["history"]) == 20
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+import pytest
+from services import ConversationContextManager, LLMService
+
+pytestmark = pytest.mark.anyio
+
+async def save_turns(db_service, first: int, count: int) -> None:
+    start = datetime(2026, 1, 1)
+    for index in range(first, first + count):
+        await db_service.save_chat_history({
+            "user_id": "u1",
+            "message": f"message {index}",
+            "response": f"response {index}",
+            "timestamp": start + timedelta(minutes=index)
+        })
+    await db_service.flush_writes()
+
+def summarized(transcript: str, total: int) -> list:
+    return [index for index in range(total) if f"message {index}\n" in transcript]
+
+async def test_compaction_summarizes_oldest_turns_outside_the_verbatim_window(db_service, monkeypatch):
+    monkeypatch.setenv("CONTEXT_SUMMARY_BATCH", "3")
+    monkeypatch.setenv("CONTEXT_RECENT_TURNS", "2")
+    llm_service = LLMService()
+    manager = ConversationContextManager(db_service, llm_service)
+    transcripts = []
+
+    async def summarize(previous_summary, transcript, user_id, max_tokens=300):
+        transcripts.append(transcript)
+        return f"summary {len(transcripts)}"
+
+    monkeypatch.setattr(llm_service, "summarize_conversation", summarize)
+
+    await save_turns(db_service, 0, 6)
+    await manager._compact("u1")
+    assert summarized(transcripts[0], 6) == [0, 1, 2, 3]
+
+    # The next compaction picks up right after the covered turns
+    await save_turns(db_service, 6, 3)
+    await manager._compact("u1")
+    assert summarized(transcripts[1], 9) == [4, 5, 6]
+    summary = await db_service.get_conversation_summary("u1")
+    assert summary["summary"] == "summary 2"
+
+async def test_compaction_waits_for_a_full_batch(db_service, monkeypatch):
+    monkeypatch.setenv("CONTEXT_SUMMARY_BATCH", "3")
+    monkeypatch.setenv("CONTEXT_RECENT_TURNS", "2")
+    llm_service = LLMService()
+    manager = ConversationContextManager(db_service, llm_service)
+
+    async def summarize(*args, **kwargs):
+        raise AssertionError("compacted too early")
+
+    monkeypatch.setattr(llm_service, "summarize_conversation", summarize)
+    await save_turns(db_service, 0, 4)
+    await manager._compact("u1")
+    assert await db_service.get_conversation_summary("u1") is None
+
+async def test_context_and_counts_include_turns_still_being_written(db_service):
+    manager = ConversationContextManager(db_service, LLMService())
+    await db_service.save_chat_history({
+        "user_id": "u1",
+        "message": "exams start next week",
+        "response": "Let's plan for them.",
+        "timestamp": datetime(2026, 1, 1)
+    })
+    assert db_service.chat_history_writer.stats()["queued"] == 1
+    assert await db_service.count_chat_history("u1") == 1
+    assert "exams start next week" in await manager.build_context("u1", "what about tomorrow?")
@@ -0,0 +1,73 @@
+import time
+import pytest
+from services.llm_backends import FakeLLMBackend, FakeProviderError, create_llm_backend
+from services.timetable_engine import covers_blocks, parse_slots
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def backend(monkeypatch):
+    def make(**env):
+        # Each backend sees only the settings it was made with, over the conftest defaults
+        for name in ("ERROR_RATE", "RATE_LIMIT_RATE", "STALL_RATE", "FAILING_MODELS", "SEED", "LATENCY_DISTRIBUTION"):
+            monkeypatch.delenv(f"FAKE_LLM_{name}", raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(f"FAKE_LLM_{name.upper()}", str(value))
+        return FakeLLMBackend()
+    return make
+
+def test_fake_provider_is_selected_by_name():
+    assert isinstance(create_llm_backend("fake", None), FakeLLMBackend)
+
+async def test_replies_depend_only_on_the_prompt(backend):
+    fake = backend()
+    first = await fake.complete("fake", "m", "system", "how do I focus?", "s1", "chat")
+    assert await fake.complete("fake", "m", "system", "how do I focus?", "s2", "chat") == first
+    replies = {await fake.complete("fake", "m", "system", f"question {n}", "s", "chat") for n in range(10)}
+    assert len(replies) > 1
+
+async def test_streams_are_the_reply_split_into_paced_tokens(backend):
+    fake = backend(latency_distribution="fixed", latency_ms=0, token_delay_ms=5)
+    started = time.monotonic()
+    tokens = [token async for token in fake.stream("fake", "m", "system", "how do I focus?", "u1")]
+
+    assert "".join(tokens) == fake.reply("system", "how do I focus?", "chat")
+    assert len(tokens) > 3
+    assert time.monotonic() - started >= 0.005 * (len(tokens) - 1)
+
+def test_latency_follows_the_configured_distribution(backend):
+    assert backend(latency_distribution="fixed", latency_ms=250).latency() == 0.25
+    uniform = backend(latency_distribution="uniform", latency_ms=100, latency_spread=0.5)
+    assert all(0.05 <= uniform.latency() <= 0.15 for _ in range(100))
+    lognormal = backend(latency_distribution="lognormal", latency_ms=100, latency_spread=0.5)
+    assert all(lognormal.latency() > 0 for _ in range(100))
+    assert backend(stall_rate=1, stall_ms=1500).latency() == 1.5
+
+def test_the_seed_makes_runs_reproducible(backend):
+    first = [backend(seed=7, latency_ms=100).latency() for _ in range(3)]
+    assert first[0] == first[1] == first[2]
+    assert backend(seed=8, latency_ms=100).latency() != first[0]
+
+async def test_injected_failures(backend):
+    with pytest.raises(FakeProviderError) as outage:
+        await backend(latency_ms=0, failing_models="big").complete("fake", "big", "s", "hi", "s", "chat")
+    assert outage.value.status_code == 503
+    assert await backend(latency_ms=0, failing_models="big").complete("fake", "small", "s", "hi", "s", "chat")
+
+    with pytest.raises(FakeProviderError) as limited:
+        await backend(latency_ms=0, rate_limit_rate=1).complete("fake", "m", "s", "hi", "s", "chat")
+    assert limited.value.status_code == 429
+    assert "429" in str(limited.value)
+
+    with pytest.raises(FakeProviderError) as failed:
+        await backend(latency_ms=0, error_rate=1).complete("fake", "m", "s", "hi", "s", "chat")
+    assert failed.value.status_code == 500
+
+def test_timetable_replies_cover_the_day_with_the_goals(backend):
+    text = "User's goals: Ship the MVP, Learn Spanish\nNight focus for today: Health & Wellness"
+    reply = backend().reply("system", text, "timetable")
+    slots = parse_slots(reply, ["Ship the MVP", "Learn Spanish"])
+
+    assert covers_blocks(slots)
+    assert "Health & Wellness" in reply
+    assert {"Ship the MVP", "Learn Spanish"} <= {item["goal"] for item in slots if item.get("goal")}
@@ -0,0 +1,73 @@
+from datetime import date
+import httpx
+import pytest
+from services.timetable_engine import BLOCKS, changed_blocks, covers_blocks
+
+pytestmark = pytest.mark.anyio
+
+GOALS = ["Ship the MVP", "Learn Spanish"]
+DAY = date(2026, 3, 2)
+
+@pytest.fixture
+async def llm_client(monkeypatch):
+    """App client with the LLM timetable engine, recording each fake provider call's operation"""
+    monkeypatch.setenv("TIMETABLE_ENGINE", "llm")
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        backend = app.state.llm_service.backend
+        complete = backend.complete
+        backend.calls = []
+
+        async def recorded(provider, model, system_message, text, session_id, operation):
+            backend.calls.append((operation, text))
+            return await complete(provider, model, system_message, text, session_id, operation)
+
+        backend.complete = recorded
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            client.calls = backend.calls
+            yield client
+
+def block_slots(timetable, block):
+    return [(item["start"], item["end"], item["activity"]) for item in timetable["slots"] if item["block"] == block]
+
+def test_only_the_blocks_a_change_touches_are_listed():
+    from services.timetable_engine import build_timetable
+
+    previous = build_timetable(GOALS, "", DAY)["slots"]
+    assert changed_blocks(previous, GOALS, "", GOALS, "", DAY) == []
+    assert changed_blocks(previous, GOALS, "", GOALS + ["Get fit"], "", DAY) == ["Evening"]
+    # A preference the local layout doesn't reflect could change anything
+    assert changed_blocks(previous, GOALS, "", GOALS, "I like music", DAY) == [name for name, *_ in BLOCKS]
+
+async def test_adding_a_goal_rewrites_only_the_evening(llm_client):
+    first = (await llm_client.post("/api/generate-timetable", json={"user_id": "tweaker", "goals": GOALS})).json()["timetable"]
+    assert [operation for operation, _ in llm_client.calls] == ["timetable"]
+
+    response = await llm_client.post("/api/generate-timetable", json={"user_id": "tweaker", "goals": GOALS + ["Get fit"]})
+    second = response.json()["timetable"]
+
+    assert [operation for operation, _ in llm_client.calls] == ["timetable", "timetable_blocks"]
+    prompt = llm_client.calls[1][1]
+    assert "(Evening)" in prompt and "(Morning)" not in prompt
+    assert second["regenerated_blocks"] == ["Evening"]
+    for block in ("Morning", "Afternoon", "Night"):
+        assert block_slots(second, block) == block_slots(first, block)
+    assert covers_blocks(second["slots"])
+
+    stats = (await llm_client.get("/api/llm/stats")).json()["incremental_timetables"]
+    assert stats == {"runs": 1, "blocks": 1}
+
+async def test_force_refresh_regenerates_the_whole_day(llm_client):
+    await llm_client.post("/api/generate-timetable", json={"user_id": "tweaker", "goals": GOALS})
+    await llm_client.post("/api/generate-timetable", json={"user_id": "tweaker", "goals": GOALS + ["Get fit"], "force_refresh": True})
+
+    assert [operation for operation, _ in llm_client.calls] == ["timetable", "timetable"]
+
+async def test_unchanged_inputs_rewrite_nothing(llm_client):
+    await llm_client.post("/api/generate-timetable", json={"user_id": "tweaker", "goals": GOALS})
+    again = (await llm_client.post("/api/generate-timetable", json={"user_id": "tweaker", "goals": GOALS})).json()["timetable"]
+
+    assert [operation for operation, _ in llm_client.calls] == ["timetable"]
+    assert again["cached"] is True
@@ -0,0 +1,59 @@
+import pytest
+from services import IndexManager
+from services.index_manager import REQUIRED_INDEXES
+
+pytestmark = pytest.mark.anyio
+
+async def test_ensure_indexes_creates_every_required_index(db_service):
+    result = await IndexManager(db_service).ensure_indexes()
+    assert result["failed"] == {}
+    for collection, indexes in REQUIRED_INDEXES.items():
+        assert set(result["created"][collection]) == {index.document["name"] for index in indexes}
+
+async def test_one_failing_index_does_not_block_the_others(db_service):
+    await db_service.db.timetables.insert_many([
+        {"user_id": "u1", "timetable_id": "same"},
+        {"user_id": "u2", "timetable_id": "same"}
+    ])
+
+    result = await IndexManager(db_service).ensure_indexes()
+
+    assert list(result["failed"]) == ["timetables"]
+    assert result["failed"]["timetables"][0].startswith("timetable_id_unique:")
+    assert set(result["created"]["timetables"]) == {"user_id_created_at_id", "user_id_date_created_at"}
+    # Collections after the failing one still get their indexes
+    assert "expires_at_ttl" in await db_service.db.jobs.index_information()
+    assert "job_unique" in await db_service.db.precompute_checkpoints.index_information()
+
+async def test_duplicate_users_are_reported_and_degrade_health(db_service, monkeypatch):
+    import httpx
+    import main
+
+    await db_service.db.users.insert_many([
+        {"user_id": "u1", "bro_name": "A"},
+        {"user_id": "u1", "bro_name": "B"},
+        {"user_id": "u2", "bro_name": "C"}
+    ])
+
+    result = await IndexManager(db_service).ensure_indexes()
+    assert result["failed"]["users"][0].startswith("user_id_unique:")
+    assert result["duplicates"] == {"users": {"user_id_unique": [{"key": {"user_id": "u1"}, "count": 2}]}}
+
+    monkeypatch.setattr(main, "create_database_service", lambda: db_service)
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            health = (await client.get("/api/health")).json()
+    assert health["status"] == "degraded"
+    assert health["indexes"]["duplicates"]["users"]["user_id_unique"][0]["key"] == {"user_id": "u1"}
+
+async def test_health_is_healthy_when_indexes_build():
+    import httpx
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            health = (await client.get("/api/health")).json()
+    assert health["status"] == "healthy"
+    assert "indexes" not in health
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime
+import pytest
+from services import JobQueue, JobQueueFullError
+
+pytestmark = pytest.mark.anyio
+
+async def test_concurrent_submits_never_overfill_the_queue(db_service, monkeypatch):
+    monkeypatch.setenv("JOB_QUEUE_SIZE", "2")
+    job_queue = JobQueue(db_service)
+    job_queue.register("noop", lambda payload: asyncio.sleep(0, {}))
+    create_job = db_service.create_job
+
+    async def slow_create_job(*args, **kwargs):
+        # A real insert yields to the event loop, letting other submits run in between
+        await asyncio.sleep(0.01)
+        return await create_job(*args, **kwargs)
+
+    monkeypatch.setattr(db_service, "create_job", slow_create_job)
+
+    results = await asyncio.gather(*[job_queue.submit("noop", {"n": index}) for index in range(5)], return_exceptions=True)
+
+    accepted = [result for result in results if isinstance(result, dict)]
+    rejected = [result for result in results if not isinstance(result, dict)]
+    assert len(accepted) == 2
+    assert all(isinstance(error, JobQueueFullError) for error in rejected)
+    assert await db_service.db.jobs.count_documents({}) == 2
+    assert job_queue.queue.qsize() == 2
+
+async def test_running_jobs_keep_their_lease(db_service, monkeypatch):
+    monkeypatch.setenv("JOB_LEASE_SECONDS", "0.3")
+    monkeypatch.setenv("JOB_WORKERS", "1")
+    job_queue = JobQueue(db_service)
+    release = asyncio.Event()
+
+    async def slow(payload):
+        await release.wait()
+        return {"done": True}
+
+    job_queue.register("slow", slow)
+    await job_queue.start()
+    try:
+        job = await job_queue.submit("slow", {})
+        await asyncio.sleep(0.6)
+        stored = await db_service.db.jobs.find_one({"job_id": job["job_id"]})
+        assert stored["status"] == "running"
+        assert stored["lease_expires_at"] > datetime.utcnow()
+        assert await db_service.get_recoverable_jobs(10) == []
+
+        release.set()
+        await asyncio.wait_for(job_queue.queue.join(), 2)
+        assert (await job_queue.get(job["job_id"]))["status"] == "succeeded"
+    finally:
+        await job_queue.close()
+
+async def test_jobs_interrupted_by_shutdown_run_after_a_restart(db_service, monkeypatch):
+    monkeypatch.setenv("JOB_WORKERS", "1")
+    started = asyncio.Event()
+
+    async def blocked(payload):
+        started.set()
+        await asyncio.Event().wait()
+
+    job_queue = JobQueue(db_service)
+    job_queue.register("timetable", blocked)
+    await job_queue.start()
+    job = await job_queue.submit("timetable", {})
+    await asyncio.wait_for(started.wait(), 2)
+    await job_queue.close()
+
+    stored = await db_service.db.jobs.find_one({"job_id": job["job_id"]})
+    assert stored["status"] == "queued"
+    assert "lease_expires_at" not in stored
+
+    restarted = JobQueue(db_service)
+    restarted.register("timetable", lambda payload: asyncio.sleep(0, {"done": True}))
+    await restarted.start()
+    try:
+        await asyncio.wait_for(restarted.queue.join(), 2)
+        assert (await restarted.get(job["job_id"]))["status"] == "succeeded"
+    finally:
+        await restarted.close()
+
+async def test_sweep_requeues_jobs_whose_lease_expired(db_service, monkeypatch):
+    monkeypatch.setenv("JOB_SWEEP_INTERVAL_SECONDS", "0.05")
+    job_queue = JobQueue(db_service)
+    job_queue.register("timetable", lambda payload: asyncio.sleep(0, {"done": True}))
+    await job_queue.start()
+    try:
+        # Claimed by a worker in another process that died after start-up recovery ran
+        await db_service.create_job("orphan", "timetable", {})
+        await db_service.claim_job("orphan", lease_seconds=0.1)
+        for _ in range(40):
+            if (await job_queue.get("orphan"))["status"] == "succeeded":
+                break
+            await asyncio.sleep(0.05)
+        assert (await job_queue.get("orphan"))["status"] == "succeeded"
+        assert job_queue.stats()["recovered"] == 1
+    finally:
+        await job_queue.close()
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from services import LLMService
+from services.llm_resilience import CircuitBreaker
+from services.llm_scheduler import Priority
+
+pytestmark = pytest.mark.anyio
+
+def cooled_down_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("fake/primary", failure_threshold=1, cooldown_seconds=60)
+    breaker.record_failure()
+    breaker.opened_at -= 60
+    return breaker
+
+def test_half_open_allows_a_single_probe():
+    breaker = cooled_down_breaker()
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = cooled_down_breaker()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+def test_abandoned_probe_is_replaced_after_a_cooldown():
+    breaker = cooled_down_breaker()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.probe_started_at -= 60
+    assert breaker.allow()
+
+async def test_concurrent_calls_send_one_probe_to_a_half_open_primary(monkeypatch):
+    monkeypatch.setenv("LLM_FALLBACK_MODEL", "fallback-model")
+    llm_service = LLMService()
+    primary = llm_service.router.route("summary")
+    breaker = llm_service.breaker(primary)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.cooldown_seconds
+    calls = []
+
+    async def call(provider, model, *args):
+        calls.append((provider, model))
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    monkeypatch.setattr(llm_service, "_call", call)
+    await asyncio.gather(*[
+        llm_service._send("system", "text", f"session-{index}", Priority.BACKGROUND, 100, "summary", primary)
+        for index in range(5)
+    ])
+    assert calls.count(primary) == 1
+    assert calls.count(llm_service.fallback) == 4
+    assert breaker.state == "closed"
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from services.llm_scheduler import LLMScheduler, Priority, ProviderLane, TokenBucket
+
+pytestmark = pytest.mark.anyio
+
+def lane(max_concurrency: int = 1) -> ProviderLane:
+    return ProviderLane("fake/test", max_concurrency, 0, 0)
+
+async def test_waiters_are_served_by_priority_then_arrival():
+    provider = lane()
+    await provider.acquire(Priority.STANDARD)
+    order = []
+
+    async def worker(name, priority):
+        await provider.acquire(priority)
+        order.append(name)
+        provider.release()
+
+    tasks = [
+        asyncio.create_task(worker("background", Priority.BACKGROUND)),
+        asyncio.create_task(worker("standard", Priority.STANDARD)),
+        asyncio.create_task(worker("interactive", Priority.INTERACTIVE))
+    ]
+    await asyncio.sleep(0)
+    provider.release()
+    await asyncio.gather(*tasks)
+    assert order == ["interactive", "standard", "background"]
+    assert provider.active == 0
+
+async def test_cancelled_waiter_skipped_by_release_raises_cancelled_error():
+    provider = lane()
+    await provider.acquire(Priority.STANDARD)
+    waiter = asyncio.create_task(provider.acquire(Priority.INTERACTIVE))
+    await asyncio.sleep(0)
+
+    # The hedge loser is cancelled, and the slot is released before it gets to run again
+    waiter.cancel()
+    provider.release()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert provider.active == 0
+    assert provider._waiters == []
+    await asyncio.wait_for(provider.acquire(Priority.STANDARD), 1)
+    assert provider.active == 1
+
+async def test_slot_handed_to_a_cancelled_waiter_is_passed_on():
+    provider = lane()
+    await provider.acquire(Priority.STANDARD)
+    cancelled = asyncio.create_task(provider.acquire(Priority.INTERACTIVE))
+    successor = asyncio.create_task(provider.acquire(Priority.BACKGROUND))
+    await asyncio.sleep(0)
+
+    provider.release()
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    await asyncio.wait_for(successor, 1)
+    assert provider.active == 1
+
+async def test_budget_goes_to_the_highest_priority_waiter_first():
+    provider = ProviderLane("fake/test", 4, requests_per_minute=600, tokens_per_minute=0)
+    provider.requests.tokens = 0
+    order = []
+
+    async def worker(name, priority):
+        await provider.wait_for_budget(1, priority)
+        order.append(name)
+
+    tasks = [
+        asyncio.create_task(worker("background", Priority.BACKGROUND)),
+        asyncio.create_task(worker("standard", Priority.STANDARD))
+    ]
+    # Arrives while the others are already waiting for the bucket to refill
+    await asyncio.sleep(0.02)
+    tasks.append(asyncio.create_task(worker("interactive", Priority.INTERACTIVE)))
+    await asyncio.wait_for(asyncio.gather(*tasks), 2)
+    assert order == ["interactive", "standard", "background"]
+    assert provider._budget_waiters == []
+
+async def test_requests_waiting_for_budget_do_not_hold_slots():
+    scheduler = LLMScheduler()
+    provider = scheduler.lane("fake", "test")
+    provider.max_concurrency = 1
+    provider.requests = TokenBucket(600)
+    provider.requests.tokens = 0
+
+    async def call(priority):
+        async with scheduler.reserve("fake", "test", priority):
+            return priority
+
+    waiting = asyncio.create_task(call(Priority.BACKGROUND))
+    await asyncio.sleep(0.02)
+    assert provider.active == 0
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert await asyncio.wait_for(call(Priority.INTERACTIVE), 2) == Priority.INTERACTIVE
@@ -0,0 +1,54 @@
+import pytest
+from services import ConversationContextManager, LLMService
+
+pytestmark = pytest.mark.anyio
+
+QUESTION = "how do i stay focused while studying"
+CACHED = "Cached generic answer"
+CONTEXT = "Recent conversation:\nUser: exams start next week\nYou: Let's plan for them."
+
+async def test_semantic_cache_answers_generic_questions_with_or_without_context():
+    llm_service = LLMService()
+    llm_service.semantic_cache.store(QUESTION, CACHED, "Bro")
+    for context in ("", CONTEXT):
+        assert await llm_service.get_llm_response(QUESTION, "u1", context=context) == CACHED
+        tokens = [token async for token in llm_service.stream_llm_response(QUESTION, "u1", context=context)]
+        assert "".join(tokens) == CACHED
+
+async def test_generic_questions_are_answered_without_context_and_shared(monkeypatch):
+    llm_service = LLMService()
+    prompts = []
+
+    async def send(system_message, text, *args):
+        prompts.append(text)
+        return "Fresh answer"
+
+    monkeypatch.setattr(llm_service, "_send", send)
+    assert await llm_service.get_llm_response(QUESTION, "u1", context=CONTEXT) == "Fresh answer"
+    assert prompts == [QUESTION]
+    # The next user asking the same thing is served from the cache
+    assert await llm_service.get_llm_response(QUESTION, "u2", context=CONTEXT) == "Fresh answer"
+    assert len(prompts) == 1
+
+async def test_follow_ups_skip_the_semantic_cache_and_keep_their_context(monkeypatch):
+    llm_service = LLMService()
+    llm_service.semantic_cache.store(QUESTION, CACHED, "Bro")
+    prompts = []
+
+    async def send(system_message, text, *args):
+        prompts.append(text)
+        return "Follow-up answer"
+
+    monkeypatch.setattr(llm_service, "_send", send)
+    for follow_up in ("what about tomorrow?", "and how do i stay focused while studying", "can you explain that again"):
+        assert llm_service.needs_context(follow_up)
+        assert await llm_service.get_llm_response(follow_up, "u1", context=CONTEXT) == "Follow-up answer"
+    assert all(prompt.startswith(CONTEXT) for prompt in prompts)
+    assert llm_service.semantic_cache.stats()["stores"] == 1
+
+async def test_context_is_only_built_for_messages_that_need_it(db_service):
+    await db_service.save_chat_history({"user_id": "u1", "message": "exams start next week", "response": "Let's plan."})
+    await db_service.flush_writes()
+    manager = ConversationContextManager(db_service, LLMService())
+    assert await manager.build_context("u1", QUESTION) == ""
+    assert "exams start next week" in await manager.build_context("u1", "what about tomorrow?")
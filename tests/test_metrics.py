@@ -0,0 +1,64 @@
+import pytest
+from prometheus_client import REGISTRY
+from services.metrics import render_metrics, track_db, track_llm
+
+pytestmark = pytest.mark.anyio
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+async def test_requests_are_counted_by_route_template(client):
+    route = {"method": "GET", "route": "/api/user/{user_id}", "status": "200"}
+    before = sample("brolife_http_requests_total", **route)
+    unmatched = sample("brolife_http_requests_total", method="GET", route="unmatched", status="404")
+
+    await client.get("/api/user/metrics-a")
+    await client.get("/api/user/metrics-b")
+    await client.get("/no/such/route")
+
+    assert sample("brolife_http_requests_total", **route) == before + 2
+    assert sample("brolife_http_requests_total", method="GET", route="unmatched", status="404") == unmatched + 1
+    assert sample("brolife_http_request_duration_seconds_count", method="GET", route="/api/user/{user_id}") >= 2
+
+async def test_metrics_endpoint_serves_the_exposition_format(client):
+    await client.post("/api/chat", json={"user_id": "metrics", "message": "what should I do first today?"})
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for name in ("brolife_http_requests_total", "brolife_db_operation_duration_seconds_count", "brolife_llm_request_duration_seconds_count", "brolife_llm_tokens_total"):
+        assert f"{name}{{" in response.text
+
+async def test_track_db_times_calls_and_counts_failures():
+    @track_db("metrics_test")
+    async def operation(fail: bool):
+        if fail:
+            raise RuntimeError("boom")
+        return "ok"
+
+    calls = sample("brolife_db_operation_duration_seconds_count", operation="metrics_test")
+    errors = sample("brolife_db_operation_errors_total", operation="metrics_test")
+    assert await operation(False) == "ok"
+    with pytest.raises(RuntimeError):
+        await operation(True)
+    assert sample("brolife_db_operation_duration_seconds_count", operation="metrics_test") == calls + 2
+    assert sample("brolife_db_operation_errors_total", operation="metrics_test") == errors + 1
+
+def test_track_llm_keeps_the_in_flight_gauge_and_counts_errors():
+    labels = {"provider": "test", "model": "m", "operation": "metrics"}
+    with track_llm(*labels.values()):
+        assert sample("brolife_llm_in_flight_requests", **labels) == 1
+    with pytest.raises(TimeoutError):
+        with track_llm(*labels.values()):
+            raise TimeoutError()
+
+    assert sample("brolife_llm_in_flight_requests", **labels) == 0
+    assert sample("brolife_llm_request_errors_total", **labels) == 1
+    assert sample("brolife_llm_request_duration_seconds_count", **labels) == 2
+
+def test_multiprocess_exposition_reads_the_shared_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    body, content_type = render_metrics()
+    # Nothing was written to the directory, so this process's own metrics are not in it
+    assert b"brolife_http_requests_total" not in body
+    assert content_type.startswith("text/plain")
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from services import LLMService
+from services.model_router import ModelRouter
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setenv("LLM_SMALL_MODEL", "small-model")
+    return ModelRouter("fake", "large-model")
+
+@pytest.mark.parametrize("message, decision", [
+    ("hey bro", ("small", "small_talk")),
+    ("thanks man", ("small", "small_talk")),
+    ("what should i eat before the gym", ("small", "short")),
+    ("can you plan my study week", ("large", "complex")),
+    ("why do i keep procrastinating", ("large", "complex")),
+    ("how do i? what do i? where do i?", ("large", "long")),
+    (" ".join(["word"] * 21), ("large", "long"))
+])
+def test_chat_messages_are_classified_by_tier(router, message, decision):
+    assert router.classify(message) == decision
+
+def test_routes_follow_the_table_and_record_each_decision(router):
+    assert router.route("chat", "hey bro") == ("fake", "small-model")
+    assert router.route("chat", "plan my week") == ("fake", "large-model")
+    assert router.route("timetable") == ("fake", "large-model")
+    assert router.route("timetable_narrative") == ("fake", "small-model")
+    assert router.route("unknown_operation") == ("fake", "large-model")
+    assert router.stats()["decisions"] == {
+        "chat:small:small_talk": 1,
+        "chat:large:complex": 1,
+        "timetable:large:table": 1,
+        "timetable_narrative:small:table": 1,
+        "unknown_operation:large:table": 1
+    }
+
+def test_without_a_small_model_everything_falls_back_to_the_large_one(monkeypatch):
+    monkeypatch.delenv("LLM_SMALL_MODEL", raising=False)
+    router = ModelRouter("fake", "large-model")
+    assert router.route("chat", "hey bro") == ("fake", "large-model")
+    assert router.route("timetable_narrative") == ("fake", "large-model")
+    assert set(router.stats()["decisions"]) == {"chat:large:small_talk_no_small_model", "timetable_narrative:large:table_no_small_model"}
+
+def test_route_table_overrides_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("LLM_SMALL_MODEL", "small-model")
+    monkeypatch.setenv("LLM_ROUTES", '{"chat": "large", "summary": "small"}')
+    router = ModelRouter("fake", "large-model")
+    assert router.route("chat", "hey bro") == ("fake", "large-model")
+    assert router.route("summary") == ("fake", "small-model")
+
+async def test_coalesced_chat_requests_record_one_routing_decision(monkeypatch):
+    monkeypatch.setenv("LLM_SMALL_MODEL", "small-model")
+    llm_service = LLMService()
+    targets = []
+
+    async def call(provider, model, *args):
+        targets.append((provider, model))
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    monkeypatch.setattr(llm_service, "_call", call)
+    message = "my legs are sore after leg day"
+    responses = await asyncio.gather(*[llm_service.get_llm_response(message, "u1") for _ in range(3)])
+    assert responses == ["ok"] * 3
+    assert targets == [("fake", "small-model")]
+    assert llm_service.router.stats()["decisions"] == {"chat:small:short": 1}
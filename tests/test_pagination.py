@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def seed(db_service, count: int) -> None:
+    start = datetime(2026, 1, 1)
+    for index in range(count):
+        await db_service.save_chat_history({
+            "user_id": "u1",
+            "message": f"message {index}",
+            "response": "ok",
+            "timestamp": start + timedelta(minutes=index)
+        })
+    await db_service.flush_writes()
+
+def messages(page) -> list:
+    return [int(item["message"].split()[1]) for item in page["items"]]
+
+async def test_pages_walk_back_and_forth_through_history(db_service):
+    await seed(db_service, 8)
+
+    first = await db_service.get_chat_history("u1", 4)
+    assert messages(first) == [7, 6, 5, 4]
+    assert first["prev_cursor"] is None
+    assert first["next_cursor"]
+
+    # The last page holds exactly `limit` items and must not advertise an empty next page
+    last = await db_service.get_chat_history("u1", 4, before=first["next_cursor"])
+    assert messages(last) == [3, 2, 1, 0]
+    assert last["next_cursor"] is None
+    assert last["prev_cursor"]
+
+    back = await db_service.get_chat_history("u1", 4, after=last["prev_cursor"])
+    assert messages(back) == [7, 6, 5, 4]
+    assert back["prev_cursor"] is None
+    assert back["next_cursor"]
+
+async def test_partial_after_page_still_links_to_older_items(db_service):
+    await seed(db_service, 8)
+    first = await db_service.get_chat_history("u1", 4)
+
+    newer = await db_service.get_chat_history("u1", 5, after=first["next_cursor"])
+    assert messages(newer) == [7, 6, 5]
+    assert newer["prev_cursor"] is None
+    assert newer["next_cursor"]
+    following = await db_service.get_chat_history("u1", 5, before=newer["next_cursor"])
+    assert messages(following) == [4, 3, 2, 1, 0]
+    assert following["next_cursor"] is None
+
+async def test_after_page_with_more_newer_items_links_forward(db_service):
+    await seed(db_service, 8)
+    oldest = await db_service.get_chat_history("u1", 2, before=(await db_service.get_chat_history("u1", 6))["next_cursor"])
+    assert messages(oldest) == [1, 0]
+    newer = await db_service.get_chat_history("u1", 2, after=oldest["prev_cursor"])
+    assert messages(newer) == [3, 2]
+    assert newer["prev_cursor"] and newer["next_cursor"]
@@ -0,0 +1,45 @@
+from datetime import date, datetime, timedelta
+import pytest
+from models import Timetable
+from services import LLMService, TimetablePrecomputer
+
+pytestmark = pytest.mark.anyio
+
+async def add_user_with_timetable(db_service, days_ago: int) -> datetime:
+    await db_service.upsert_user({"user_id": "u1", "bro_name": "Bro", "goals": ["Learn Python"], "preferences": ""})
+    created_at = datetime.utcnow() - timedelta(days=days_ago)
+    timetable = Timetable(user_id="u1", date=created_at.date().isoformat(), schedule={}, created_at=created_at)
+    await db_service.save_timetables([timetable.model_dump()])
+    return created_at
+
+@pytest.fixture
+def precomputer(db_service, monkeypatch):
+    monkeypatch.setenv("PRECOMPUTE_RATE_PER_MINUTE", "0")
+    return TimetablePrecomputer(db_service, LLMService())
+
+async def test_precomputed_timetables_do_not_count_as_activity(db_service, precomputer):
+    last_active = await add_user_with_timetable(db_service, days_ago=13)
+    tomorrow = date.today() + timedelta(days=1)
+
+    first = await precomputer.run_once(tomorrow)
+    assert first["generated"] == 1
+    assert abs(await db_service.get_latest_timetable_time("u1") - last_active) < timedelta(milliseconds=1)
+
+    page = await db_service.get_user_timetables("u1", 10)
+    assert [item["precomputed"] for item in page["items"]] == [False]
+
+    # Two days later the user has gone quiet for longer than the active window
+    precomputer.active_days = 12
+    await db_service.save_precompute_checkpoint("tomorrow_timetables", {"target_date": None})
+    second = await precomputer.run_once(tomorrow + timedelta(days=1))
+    assert second["generated"] == 0 and second["skipped"] == 1
+
+async def test_served_precomputed_timetables_join_the_history(db_service, precomputer):
+    await add_user_with_timetable(db_service, days_ago=1)
+    await precomputer.run_once(date.today() + timedelta(days=1))
+    precomputed = await db_service.db.timetables.find_one({"precomputed": True})
+
+    await db_service.mark_timetable_served(precomputed["timetable_id"])
+    page = await db_service.get_user_timetables("u1", 10)
+    assert page["items"][0]["timetable_id"] == precomputed["timetable_id"]
+    assert page["items"][0]["precomputed"] is True
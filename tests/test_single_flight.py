@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from services.single_flight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+async def test_concurrent_calls_with_one_key_share_one_run():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(True)
+        await asyncio.sleep(0.01)
+        return len(runs)
+
+    results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)), flight.do("other", work))
+
+    assert results[:5] == [results[0]] * 5
+    assert len(runs) == 2
+    assert flight.stats() == {"calls": 2, "coalesced": 4, "in_flight": 0}
+    # Once the call finished the key runs again
+    await flight.do("k", work)
+    assert len(runs) == 3
+
+async def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("provider down")
+
+    results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+    assert [str(result) for result in results] == ["provider down", "provider down"]
+    assert flight.stats()["in_flight"] == 0
+
+async def test_a_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("k", work))
+    second = asyncio.ensure_future(flight.do("k", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == "done"
+    assert first.cancelled()
+
+async def test_duplicate_chat_posts_make_one_llm_call_and_one_history_row(client):
+    from main import app
+
+    llm_service = app.state.llm_service
+    # Slow the fake provider down enough for the requests to overlap
+    llm_service.backend.latency = lambda: 0.05
+    payload = {"user_id": "clicker", "message": "plan my deep work block"}
+
+    responses = await asyncio.gather(*(client.post("/api/chat", json=payload) for _ in range(3)))
+
+    assert [response.status_code for response in responses] == [200] * 3
+    assert len({response.json()["response"] for response in responses}) == 1
+    history = (await client.get("/api/chat-history/clicker")).json()["history"]
+    assert len(history) == 1
+    stats = (await client.get("/api/llm/stats")).json()["single_flight"]
+    assert stats["coalesced"] == 2
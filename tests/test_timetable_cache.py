@@ -0,0 +1,55 @@
+from datetime import date
+import pytest
+from services import LLMService
+
+pytestmark = pytest.mark.anyio
+
+DAY = date(2026, 3, 2)
+
+@pytest.fixture
+def llm_service(monkeypatch):
+    monkeypatch.setenv("TIMETABLE_ENGINE", "llm")
+    service = LLMService()
+    calls = []
+    complete = service.backend.complete
+
+    async def counted(*args):
+        calls.append(args)
+        return await complete(*args)
+
+    monkeypatch.setattr(service.backend, "complete", counted)
+    service.calls = calls
+    return service
+
+async def test_equivalent_inputs_are_served_from_the_cache(llm_service):
+    first = await llm_service.generate_timetable(["Ship the MVP", "gym"], "early  starts", "u1", "Ace", day=DAY)
+    # Goal order, case and whitespace don't change the key
+    second = await llm_service.generate_timetable(["GYM", " ship the  mvp"], "Early starts", "u2", "Ace", day=DAY)
+
+    assert len(llm_service.calls) == 1
+    assert first["source"] == "llm" and "cached" not in first
+    assert second["cached"] is True
+    assert second["slots"] == first["slots"]
+    stats = llm_service.timetable_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+async def test_other_days_and_bro_names_miss_the_cache(llm_service):
+    await llm_service.generate_timetable(["gym"], "", "u1", "Ace", day=DAY)
+    await llm_service.generate_timetable(["gym"], "", "u1", "Ace", day=date(2026, 3, 3))
+    await llm_service.generate_timetable(["gym"], "", "u1", "Chief", day=DAY)
+    assert len(llm_service.calls) == 3
+
+async def test_force_refresh_skips_and_replaces_the_cached_timetable(llm_service):
+    await llm_service.generate_timetable(["gym"], "", "u1", day=DAY)
+    refreshed = await llm_service.generate_timetable(["gym"], "", "u1", force_refresh=True, day=DAY)
+    assert len(llm_service.calls) == 2
+    assert "cached" not in refreshed
+
+    cached = await llm_service.generate_timetable(["gym"], "", "u1", day=DAY)
+    assert len(llm_service.calls) == 2
+    assert cached["generated_at"] == refreshed["generated_at"]
+
+async def test_cache_stats_endpoint(client):
+    stats = (await client.get("/api/timetable-cache/stats")).json()
+    assert stats["name"] == "timetables"
+    assert {"hits", "misses", "hit_rate"} <= set(stats)
@@ -0,0 +1,45 @@
+from datetime import date
+from services.llm_backends import FakeLLMBackend
+from services.timetable_engine import build_timetable, covers_blocks, parse_slots
+
+def spans(slots) -> list:
+    return [(item["start"], item["end"], item["block"]) for item in slots]
+
+def test_twelve_hour_times_follow_the_block_heading():
+    text = "\n".join([
+        "**Afternoon (12:00-17:00)**",
+        "- 12:00-1:00: Lunch",
+        "- 1:00-3:00: Work on Learn Rust",
+        "**Night (21:00-00:30)**",
+        "- 9:00-11:30: Side hustle session",
+        "- 11:30-12:30: Wind down"
+    ])
+    assert spans(parse_slots(text, ["Learn Rust"])) == [
+        ("12:00", "13:00", "Afternoon"),
+        ("13:00", "15:00", "Afternoon"),
+        ("21:00", "23:30", "Night"),
+        ("23:30", "0:30", "Night")
+    ]
+
+def test_twelve_hour_times_without_headings_follow_the_previous_slot():
+    text = "- 11:00-12:00: Deep work\n- 12:00-1:00: Lunch\n- 2:00-4:00: Study"
+    assert spans(parse_slots(text, [])) == [
+        ("11:00", "12:00", "Morning"),
+        ("12:00", "13:00", "Afternoon"),
+        ("14:00", "16:00", "Afternoon")
+    ]
+
+def test_backwards_and_overlong_slots_are_dropped():
+    text = "- 10:00-9:00: Backwards\n- 8:00 AM-11:00 PM: All day\n- 8:00-9:00: Planning"
+    assert spans(parse_slots(text, [])) == [("8:00", "9:00", "Morning")]
+
+def test_partial_parses_do_not_cover_the_day():
+    assert not covers_blocks(parse_slots("- 12:00-1:00: Lunch", []))
+    assert covers_blocks(build_timetable(["Learn Rust"], "", date(2026, 1, 5))["slots"])
+
+def test_fake_llm_timetable_parses_into_a_full_day():
+    backend = FakeLLMBackend()
+    text = backend.timetable_reply("User's goals: Learn Rust, Get fit\nNight focus for today: Side Hustle", seed=3)
+    slots = parse_slots(text, ["Learn Rust", "Get fit"])
+    assert covers_blocks(slots)
+    assert spans(slots)[-1] == ("23:30", "0:30", "Night")
@@ -0,0 +1,37 @@
+import pytest
+from bson import ObjectId
+from services import IndexManager
+from services.timetable_migration import TimetableMigration
+
+pytestmark = pytest.mark.anyio
+
+async def test_duplicate_timetable_ids_are_reassigned_before_the_unique_index(db_service):
+    oldest, newer, newest, other = ObjectId(), ObjectId(), ObjectId(), ObjectId()
+    await db_service.db.timetables.insert_many([
+        {"_id": newest, "user_id": "u1", "timetable_id": "baseline", "slots": []},
+        {"_id": oldest, "user_id": "u1", "timetable_id": "baseline", "slots": []},
+        {"_id": newer, "user_id": "u2", "timetable_id": "baseline", "slots": []},
+        {"_id": other, "user_id": "u2", "timetable_id": "unique", "slots": []}
+    ])
+
+    result = await TimetableMigration(db_service).run()
+
+    assert result["reassigned_ids"] == 2
+    docs = {doc["_id"]: doc["timetable_id"] async for doc in db_service.db.timetables.find({}, {"timetable_id": 1})}
+    assert docs[oldest] == "baseline"
+    assert docs[other] == "unique"
+    assert len(set(docs.values())) == 4
+    indexes = await IndexManager(db_service).ensure_indexes()
+    assert indexes["failed"] == {}
+    assert await TimetableMigration(db_service).reassign_duplicate_ids() == 0
+
+async def test_large_duplicate_groups_are_reassigned_in_batches(db_service):
+    ids = [ObjectId() for _ in range(25)]
+    await db_service.db.timetables.insert_many([
+        {"_id": doc_id, "user_id": "u1", "timetable_id": "worker-default", "slots": []} for doc_id in ids
+    ])
+
+    assert await TimetableMigration(db_service, batch_size=10).reassign_duplicate_ids() == 24
+    docs = {doc["_id"]: doc["timetable_id"] async for doc in db_service.db.timetables.find({}, {"timetable_id": 1})}
+    assert docs[min(ids)] == "worker-default"
+    assert len(set(docs.values())) == 25
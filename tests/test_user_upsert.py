@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime
+import pytest
+from pymongo.errors import BulkWriteError
+from services import IndexManager
+
+pytestmark = pytest.mark.anyio
+
+def profile(user_id: str, bro_name: str = "Bro", **extra):
+    return {"user_id": user_id, "bro_name": bro_name, "goals": ["ship"], "preferences": "", **extra}
+
+async def test_upsert_creates_then_updates_and_keeps_created_at(db_service):
+    created_at = datetime(2026, 1, 1)
+    assert await db_service.upsert_user(profile("u1", "Ace", created_at=created_at)) is True
+    assert await db_service.upsert_user(profile("u1", "Chief", created_at=datetime(2026, 6, 1))) is False
+
+    users = await db_service.db.users.find({"user_id": "u1"}).to_list(None)
+    assert len(users) == 1
+    assert users[0]["bro_name"] == "Chief"
+    assert users[0]["created_at"] == created_at
+
+async def test_concurrent_setups_leave_one_user(db_service):
+    await IndexManager(db_service).ensure_indexes()
+    results = await asyncio.gather(*(db_service.upsert_user(profile("u1", f"Bro {n}")) for n in range(5)))
+    assert results.count(True) == 1
+    assert await db_service.db.users.count_documents({"user_id": "u1"}) == 1
+
+async def test_upsert_invalidates_the_cached_profile(db_service):
+    await db_service.upsert_user(profile("u1", "Ace"))
+    assert (await db_service.get_user("u1"))["bro_name"] == "Ace"
+    await db_service.bulk_upsert_users([profile("u1", "Chief")])
+    assert (await db_service.get_user("u1"))["bro_name"] == "Chief"
+
+async def test_bulk_upsert_reports_a_status_per_row_across_chunks(db_service):
+    created_at = datetime(2026, 1, 1)
+    await db_service.upsert_user(profile("u4", created_at=created_at))
+
+    # The existing user comes last: mongomock numbers upserts by their own count, MongoDB by operation index
+    results = await db_service.bulk_upsert_users([profile(f"u{n}", "New") for n in range(5)], chunk_size=2)
+
+    assert [(row["index"], row["user_id"], row["status"]) for row in results] == [
+        (0, "u0", "created"), (1, "u1", "created"), (2, "u2", "created"), (3, "u3", "created"), (4, "u4", "updated")
+    ]
+    assert await db_service.db.users.count_documents({"bro_name": "New"}) == 5
+    assert (await db_service.db.users.find_one({"user_id": "u4"}))["created_at"] == created_at
+
+async def test_bulk_write_errors_fail_only_their_rows(db_service, monkeypatch):
+    collection_type = type(db_service.db.users)
+    bulk_write = collection_type.bulk_write
+
+    async def failing_second_row(self, operations, ordered=True):
+        await bulk_write(self, operations[:1] + operations[2:], ordered=ordered)
+        raise BulkWriteError({
+            "writeErrors": [{"index": 1, "errmsg": "document too large"}],
+            "upserted": [{"index": 0}, {"index": 2}]
+        })
+
+    monkeypatch.setattr(collection_type, "bulk_write", failing_second_row)
+    results = await db_service.bulk_upsert_users([profile("u0"), profile("u1"), profile("u2")])
+
+    assert [row["status"] for row in results] == ["created", "error", "created"]
+    assert results[1]["error"] == "document too large"
+
+async def test_user_endpoints(client):
+    first = await client.post("/api/user/setup", json=profile("u1", "Ace"))
+    again = await client.post("/api/user/setup", json=profile("u1", "Ace"))
+    assert first.json()["message"].startswith("Welcome")
+    assert again.json()["message"].startswith("Updated")
+
+    response = await client.post("/api/users/bulk", json={"users": [profile("u2"), profile("u3"), profile("u1")]})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["updated"], body["failed"]) == (2, 1, 0)
+    assert [row["status"] for row in body["results"]] == ["created", "created", "updated"]
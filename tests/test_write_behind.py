@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from services.write_behind import WriteBehindQueue
+
+pytestmark = pytest.mark.anyio
+
+class SlowCollection:
+    """Collection stand-in whose inserts take a fixed time"""
+
+    name = "slow"
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.documents = []
+
+    async def insert_many(self, documents, ordered=False):
+        await asyncio.sleep(self.delay)
+        self.documents.extend(documents)
+
+async def test_flush_waits_only_for_documents_queued_before_it():
+    collection = SlowCollection(0.01)
+    queue = WriteBehindQueue(collection, batch_size=10, flush_interval=0.001)
+    for index in range(30):
+        await queue.put({"n": index})
+
+    async def produce():
+        index = 30
+        while True:
+            # Faster than the writer drains, so the queue never empties
+            for _ in range(20):
+                await queue.put({"n": index})
+                index += 1
+            await asyncio.sleep(0.005)
+
+    producer = asyncio.create_task(produce())
+    try:
+        await asyncio.wait_for(queue.flush(), 2)
+        assert {document["n"] for document in collection.documents} >= set(range(30))
+        assert queue.stats()["queued"] > 0
+    finally:
+        producer.cancel()
+        await queue.close()
+
+class FlakyCollection:
+    """Collection stand-in that fails the first `failures` inserts"""
+
+    name = "flaky"
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.documents = []
+
+    async def insert_many(self, documents, ordered=False):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("primary stepped down")
+        self.documents.extend(documents)
+
+async def test_failed_batches_are_retried_with_backoff():
+    collection = FlakyCollection(failures=2)
+    queue = WriteBehindQueue(collection, flush_interval=0.001, retry_base_delay=0.001)
+    for index in range(5):
+        await queue.put({"n": index})
+    await asyncio.wait_for(queue.flush(), 2)
+    await queue.close()
+
+    assert sorted(document["n"] for document in collection.documents) == list(range(5))
+    stats = queue.stats()
+    assert stats["documents_retried"] == 10
+    assert stats["documents_dropped"] == 0
+
+async def test_documents_are_dropped_and_counted_once_out_of_retries():
+    collection = FlakyCollection(failures=10)
+    queue = WriteBehindQueue(collection, flush_interval=0.001, max_retries=2, retry_base_delay=0.001)
+    await queue.put({"n": 1})
+    await asyncio.wait_for(queue.flush(), 2)
+    await queue.close()
+
+    assert collection.documents == []
+    assert queue.stats()["documents_retried"] == 2
+    assert queue.stats()["documents_dropped"] == 1
+
+async def test_chat_history_is_readable_right_after_posting_a_chat():
+    import httpx
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/chat", json={"user_id": "reader", "message": "what should I focus on?"})
+            assert response.status_code == 200
+            history = (await client.get("/api/chat-history/reader")).json()["history"]
+    assert [turn["message"] for turn in history] == ["what should I focus on?"]